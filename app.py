@@ -1,6 +1,14 @@
-from flask import Flask, render_template, request, jsonify, send_file
-from data_processor import UMKMDataProcessor
-from fuzzy_logic import UMKMFuzzyLogic
+from flask import Flask, render_template, request, jsonify, send_file, url_for, Response, stream_with_context
+from data_processor import MISSING_FIELDS_ERROR, UMKMDataProcessor
+from data_store import DatasetStore
+from fuzzy_logic import UMKMFuzzyLogic, _no_rule_fires
+from fuzzy_model import coverage_gaps, rule_warnings
+from audit_log import AuditLog, decision_record, resolve_rule_activations
+from model_registry import DEFAULT_VARIANT
+from compression import install_compression
+from werkzeug.http import generate_etag
+import atexit
+import io
 import json
 import os
 import logging
@@ -12,20 +20,133 @@ logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 
+# Applications validated and scored together by /api/calculate_batch
+BATCH_BLOCK_SIZE = 256
+
+# Top-level fields of an /api/calculate response, selectable with 'fields'
+CALCULATE_FIELDS = ('approval_score', 'approval_category', 'approval_color', 'recommendations', 'input_values',
+                    'analysis', 'timestamp', 'visualization_url', 'visualization', 'variants')
+
+# Fields of an /api/calculate response only returned when selected; without 'analysis' the score
+# comes from the compiled surface when there is one, so the default request costs the same for any rule base
+OPT_IN_FIELDS = ('analysis', 'visualization', 'variants')
+
+# Responses smaller than this many bytes are sent uncompressed; negative disables compression
+COMPRESSION_MIN_SIZE = int(os.environ.get('FUZZY_COMPRESSION_MIN_SIZE', 1024))
+
+# (endpoint, dataset) -> (payload, JSON bytes, ETag) of the data endpoints, see precomputed_json()
+_serialized_payloads = {}
+
+# Largest number of values per swept input accepted by /api/sensitivity
+SENSITIVITY_MAX_POINTS = 201
+
+# Seconds between checks of the model definition file for changes
+MODEL_RELOAD_INTERVAL = float(os.environ.get('FUZZY_MODEL_RELOAD_INTERVAL', 5))
+
+# How risk, priority and scale inputs are derived from the data: 'continuous' or the fixed 'buckets'
+FEATURE_MODE = os.environ.get('FUZZY_FEATURES', 'buckets')
+
+# Further BPS tables selectable per request with "dataset", only when FUZZY_DATASETS names a manifest
+dataset_store = None
+
+# Prometheus metrics at /metrics, only when FUZZY_METRICS is set; otherwise no hooks are installed
+metrics = None
+
+# Every /api/calculate decision is appended to this log when FUZZY_AUDIT_LOG is set
+audit_log = None
+
 # Initialize components
 try:
     csv_file = 'Posisi Kredit Usaha Mikro, Kecil, dan Menengah (UMKM) pada Bank Umum__, 2023.csv'
     if not os.path.exists(csv_file):
         raise FileNotFoundError(f"CSV file not found: {csv_file}")
     
-    data_processor = UMKMDataProcessor(csv_file)
-    fuzzy_logic = UMKMFuzzyLogic()
+    data_processor = UMKMDataProcessor(csv_file, feature_mode=FEATURE_MODE)
+    dataset_manifest = os.environ.get('FUZZY_DATASETS')
+    if dataset_manifest:
+        memory_budget = int(float(os.environ.get('FUZZY_DATASET_MEMORY_MB', 64)) * 1024 * 1024)
+        dataset_store = DatasetStore.from_manifest(dataset_manifest, memory_budget=memory_budget,
+                                                   feature_mode=FEATURE_MODE)
+        logger.info(f"Registered {len(dataset_store.keys())} datasets from {dataset_manifest}")
+    # Inference-only workers never import skfuzzy or matplotlib (no visualization)
+    inference_only = os.environ.get('FUZZY_INFERENCE_ONLY', '').lower() in ('1', 'true', 'yes')
+    # Rules and membership functions from the definition file, the bundled fuzzy_model.json by default
+    fuzzy_logic = UMKMFuzzyLogic(inference_only=inference_only, model_path=os.environ.get('FUZZY_MODEL_PATH'))
+    model_path = fuzzy_logic.model_path
+    gaps = coverage_gaps(fuzzy_logic.model)
+    logger.info(f"Loaded model {model_path} ({fuzzy_logic.engine.n_rules} rules, "
+                f"{len(gaps)} term combinations without a firing rule)")
+    for warning in rule_warnings(fuzzy_logic.model):
+        logger.warning(f"{model_path}: {warning}")
+    
+    # Challenger models as "name=path,name=path", selectable per request with "model"
+    for variant in filter(None, os.environ.get('FUZZY_MODEL_VARIANTS', '').split(',')):
+        name, _, path = variant.partition('=')
+        model = fuzzy_logic.load_variant(name.strip(), path.strip())
+        logger.info(f"Loaded model variant {name.strip()} from {path.strip()} ({model.engine.n_rules} rules)")
+        for warning in rule_warnings(model):
+            logger.warning(f"{path.strip()}: {warning}")
+    
+    # Optional compiled surface, shared between workers through a memory-mapped .npy
+    surface_path = os.environ.get('FUZZY_SURFACE_PATH')
+    if surface_path:
+        resolution = int(os.environ.get('FUZZY_SURFACE_RESOLUTION', 101))
+        surface = fuzzy_logic.compile_surface(resolution=resolution, path=surface_path)
+        logger.info(f"Using compiled surface {surface_path} (max error {surface.max_error:.3f})")
+    
+    # Optionally pre-fill the scoring cache with every selectable combination
+    if os.environ.get('FUZZY_CACHE_WARMUP', '').lower() in ('1', 'true', 'yes'):
+        count = fuzzy_logic.warm_up(
+            [fuzzy_logic.scale_to_fuzzy_value(data_processor.get_scale_level(scale))
+             for scale in data_processor.get_all_scales()],
+            [fuzzy_logic.risk_to_fuzzy_value(data_processor.get_business_field_risk(field))
+             for field in data_processor.get_all_business_fields()],
+            [fuzzy_logic.priority_to_fuzzy_value(data_processor.get_usage_priority(usage))
+             for usage in data_processor.get_all_usage_types()],
+        )
+        logger.info(f"Scoring cache warmed up with {count} combinations")
+    
+    # Decisions are queued per request and written in batches by a background thread
+    audit_path = os.environ.get('FUZZY_AUDIT_LOG')
+    if audit_path:
+        audit_log = AuditLog(audit_path, prepare=resolve_rule_activations,
+                             max_queue=int(os.environ.get('FUZZY_AUDIT_QUEUE', 10000)),
+                             flush_interval=float(os.environ.get('FUZZY_AUDIT_FLUSH_INTERVAL', 1.0)))
+        atexit.register(audit_log.close)
+        logger.info(f"Auditing decisions to {audit_path}")
+    
+    if os.environ.get('FUZZY_METRICS', '').lower() in ('1', 'true', 'yes'):
+        from metrics import Metrics
+        metrics = Metrics()
+        metrics.instrument_fuzzy_logic(fuzzy_logic)
+        metrics.instrument_app(app)
+        if audit_log is not None:
+            metrics.add_collector(audit_log.metrics)
+        logger.info("Metrics enabled at /metrics")
     logger.info("Application initialized successfully")
 except Exception as e:
     logger.error(f"Failed to initialize application: {str(e)}")
     data_processor = None
     fuzzy_logic = None
 
+if COMPRESSION_MIN_SIZE >= 0:
+    install_compression(app, min_size=COMPRESSION_MIN_SIZE)
+
+@app.before_request
+def reload_model():
+    """Swap in the model definition file when it changed; requests in flight keep the old model"""
+    if not fuzzy_logic or MODEL_RELOAD_INTERVAL <= 0:
+        return
+    try:
+        if fuzzy_logic.reload_if_changed(MODEL_RELOAD_INTERVAL):
+            update = fuzzy_logic.last_update
+            logger.info(f"Reloaded model {fuzzy_logic.model_path} (fingerprint {fuzzy_logic.model_fingerprint[:12]}, "
+                        f"kept {update['cache_kept']} cached results, dropped {update['cache_dropped']})")
+            for warning in rule_warnings(fuzzy_logic.model):
+                logger.warning(f"{fuzzy_logic.model_path}: {warning}")
+    except (OSError, ValueError) as e:
+        logger.error(f"Keeping the current model, reload failed: {str(e)}")
+
 @app.route('/')
 def index():
     """Main page with the fuzzy logic interface"""
@@ -38,97 +159,420 @@ def get_options():
         if not data_processor:
             return jsonify({'error': 'Data processor not initialized'}), 500
             
-        options = {
-            'business_fields': data_processor.get_all_business_fields(),
-            'scales': data_processor.get_all_scales(),
-            'usage_types': data_processor.get_all_usage_types()
-        }
-        return jsonify(options)
+        processor, error = select_dataset(request.args.get('dataset'))
+        if error:
+            return jsonify({'error': error}), 400
+        return precomputed_json(('options', dataset_name(processor)), processor.get_options())
     except Exception as e:
         logger.error(f"Error getting options: {str(e)}")
         return jsonify({'error': 'Failed to load options'}), 500
 
+def precomputed_json(name, payload):
+    """Conditional JSON response for ``payload``, serialized once per payload object
+    
+    The data processor computes its aggregates once per load and returns the
+    same object until the data is reloaded, so bytes and ETag are reused
+    across requests; 304 Not Modified when the client already has them.
+    """
+    cached = _serialized_payloads.get(name)
+    if cached is None or cached[0] is not payload:
+        body = app.json.response(payload).get_data()
+        cached = _serialized_payloads[name] = (payload, body, generate_etag(body))
+    _, body, etag = cached
+    response = Response(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
+def select_dataset(key):
+    """The data a request is scored against: dataset ``key`` of the store, else the default
+    
+    The default is the manifest's default dataset or, without one, the
+    built-in CSV. Returns (processor, None) or (None, error_message).
+    """
+    if key is None:
+        if dataset_store is None or dataset_store.default is None:
+            return data_processor, None
+        return dataset_store.get(), None
+    if dataset_store is None:
+        return None, 'Pemilihan dataset tidak diaktifkan (set FUZZY_DATASETS)'
+    try:
+        return dataset_store.get(key), None
+    except (TypeError, ValueError):
+        return None, f'Dataset "{key}" tidak dikenal'
+
+def dataset_name(processor):
+    """'period/region' of a store dataset, None for the default CSV"""
+    key = getattr(processor, 'key', None)
+    return '/'.join(key) if key else None
+
+def resolve_application(data):
+    """Validate one application and map it to fuzzy input values
+    
+    Returns (application, None) when valid or (None, error_message) otherwise.
+    """
+    if not hasattr(data, 'get'):
+        return None, 'Format data tidak valid'
+    
+    # Get input values
+    business_field = data.get('business_field')
+    scale = data.get('scale')
+    usage_type = data.get('usage_type')
+    
+    # Validate inputs
+    if not all([business_field, scale, usage_type]):
+        return None, MISSING_FIELDS_ERROR
+    
+    processor, error = select_dataset(data.get('dataset'))
+    if error:
+        return None, error
+    
+    # Validate that inputs exist in data
+    error = processor.application_error(business_field, scale, usage_type)
+    if error:
+        return None, error
+    
+    # Get fuzzy values
+    return {
+        'business_field': business_field,
+        'scale': scale,
+        'usage_type': usage_type,
+        'scale_value': fuzzy_logic.scale_to_fuzzy_value(processor.get_scale_level(scale)),
+        'risk_value': fuzzy_logic.risk_to_fuzzy_value(processor.get_business_field_risk(business_field)),
+        'priority_value': fuzzy_logic.priority_to_fuzzy_value(processor.get_usage_priority(usage_type)),
+        'data': processor,
+    }, None
+
+def select_model(name):
+    """Model variant a request is scored with: ``name`` or the current model for None
+    
+    Returns (model, None) or (None, error_message).
+    """
+    if name is not None and not isinstance(name, str):
+        return None, 'model harus berupa nama model'
+    try:
+        return fuzzy_logic.variant_model(name), None
+    except ValueError:
+        return None, f'Model "{name}" tidak dikenal'
+
+def variant_scores(scale_value, risk_value, priority_value):
+    """Score and category of one input under every active model variant, from one shared pass"""
+    variants = {}
+    scores = fuzzy_logic.calculate_variant_scores(scale_value, risk_value, priority_value)
+    for name, score in scores.items():
+        score = float(score[0])
+        if score != score:  # NaN: no rule of this variant fires
+            variants[name] = {'approval_score': None, 'approval_category': None}
+        else:
+            variants[name] = {'approval_score': round(score, 2),
+                              'approval_category': fuzzy_logic.get_approval_category(score)[0]}
+    return variants
+
+def input_values(application):
+    """The choices of a resolved application, as echoed in responses"""
+    values = {
+        'business_field': application['business_field'],
+        'scale': application['scale'],
+        'usage_type': application['usage_type']
+    }
+    dataset = dataset_name(application['data'])
+    if dataset:
+        values['dataset'] = dataset
+    return values
+
+if metrics is not None:
+    resolve_application = metrics.timed('validation')(resolve_application)
+
+def requested_fields(data):
+    """Top-level /api/calculate fields selected by ``fields`` (or its alias ``include``)
+    
+    Accepts a list or a comma-separated string, in the JSON body or the query
+    string. Returns (fields, None) or (None, error_message); without a
+    selection every field except the OPT_IN_FIELDS is returned.
+    """
+    fields = data.get('fields', data.get('include'))
+    if fields is None:
+        fields = request.args.get('fields', request.args.get('include'))
+    if fields is None:
+        fields = set(CALCULATE_FIELDS) - set(OPT_IN_FIELDS)
+        if data.get('include_visualization'):
+            fields.add('visualization')
+        return fields, None
+    if isinstance(fields, str):
+        fields = [field.strip() for field in fields.split(',') if field.strip()]
+    if not isinstance(fields, list) or not fields or not all(isinstance(field, str) for field in fields):
+        return None, 'fields harus berupa daftar nama field'
+    unknown = [field for field in fields if field not in CALCULATE_FIELDS]
+    if unknown:
+        return None, f'Field "{unknown[0]}" tidak dikenal, pilih dari: {", ".join(CALCULATE_FIELDS)}'
+    return set(fields), None
+
 @app.route('/api/calculate', methods=['POST'])
 def calculate():
-    """Calculate fuzzy logic approval score"""
+    """Calculate fuzzy logic approval score
+    
+    Only the requested ``fields`` are computed: the rule-by-rule analysis
+    (an exact inference pass) and the inline image are skipped unless asked
+    for. ``model`` scores with
+    a model variant; the ``variants`` field scores every active variant.
+    """
     try:
         if not data_processor or not fuzzy_logic:
             return jsonify({'error': 'System not properly initialized'}), 500
             
         data = request.get_json()
         
-        # Get input values
-        business_field = data.get('business_field')
-        scale = data.get('scale')
-        usage_type = data.get('usage_type')
-        
-        # Validate inputs
-        if not all([business_field, scale, usage_type]):
-            return jsonify({'error': 'Semua field harus diisi'}), 400
-        
-        # Validate that inputs exist in data
-        if business_field not in data_processor.get_all_business_fields():
-            return jsonify({'error': f'Lapangan usaha "{business_field}" tidak valid'}), 400
-        if scale not in data_processor.get_all_scales():
-            return jsonify({'error': f'Skala usaha "{scale}" tidak valid'}), 400
-        if usage_type not in data_processor.get_all_usage_types():
-            return jsonify({'error': f'Jenis penggunaan "{usage_type}" tidak valid'}), 400
-        
-        # Get fuzzy values
-        scale_value = fuzzy_logic.scale_to_fuzzy_value(scale)
-        risk_value = fuzzy_logic.risk_to_fuzzy_value(data_processor.get_business_field_risk(business_field))
-        priority_value = fuzzy_logic.priority_to_fuzzy_value(data_processor.get_usage_priority(usage_type))
-        
-        # Calculate approval score
-        approval_score = fuzzy_logic.calculate_approval_score(scale_value, risk_value, priority_value)
-        
-        # Get approval category and color
-        approval_category, approval_color = fuzzy_logic.get_approval_category(approval_score)
-        
-        # Get recommendations
-        recommendations = fuzzy_logic.get_recommendations(approval_score, scale_value, risk_value, priority_value)
+        application, error = resolve_application(data)
+        if error:
+            return jsonify({'error': error}), 400
+        fields, error = requested_fields(data)
+        if error:
+            return jsonify({'error': error}), 400
+        variant = data.get('model')
+        model, error = select_model(variant)
+        if error:
+            return jsonify({'error': error}), 400
+        business_field = application['business_field']
+        scale = application['scale']
+        usage_type = application['usage_type']
+        scale_value = application['scale_value']
+        risk_value = application['risk_value']
+        priority_value = application['priority_value']
         
-        # Get detailed analysis
-        detailed_analysis = fuzzy_logic.get_detailed_analysis(scale_value, risk_value, priority_value, approval_score)
-        
-        # Generate visualization
-        visualization = fuzzy_logic.generate_fuzzy_visualization(scale_value, risk_value, priority_value, approval_score)
-        
-        # Get additional info
-        credit_range = data_processor.get_scale_credit_range(scale)
-        field_credit = data_processor.business_fields.get(business_field, 0)
-        usage_credit = data_processor.usage_types.get(usage_type, 0)
+        # Score, category, recommendations and detailed analysis (cached per input triple)
+        evaluation = fuzzy_logic.evaluate(scale_value, risk_value, priority_value, detailed='analysis' in fields,
+                                          model=model)
+        approval_score = evaluation['approval_score']
         
         # Prepare response
         result = {
             'approval_score': round(approval_score, 2),
-            'approval_category': approval_category,
-            'approval_color': approval_color,
-            'recommendations': recommendations,
-            'input_values': {
-                'business_field': business_field,
-                'scale': scale,
-                'usage_type': usage_type
-            },
-            'analysis': {
+            'approval_category': evaluation['approval_category'],
+            'approval_color': evaluation['approval_color'],
+            'recommendations': evaluation['recommendations'],
+            'input_values': input_values(application),
+            'timestamp': datetime.now().isoformat()
+        }
+        if variant is not None:
+            result['input_values']['model'] = variant
+        if 'variants' in fields:
+            result['variants'] = variant_scores(scale_value, risk_value, priority_value)
+        if audit_log is not None and audit_log.record(decision_record(
+                model, (scale_value, risk_value, priority_value), result['input_values'], evaluation, variant)) is None:
+            logger.warning("Audit queue full, decision not recorded")
+        if 'analysis' in fields:
+            # Get additional info
+            processor = application['data']
+            credit_range = processor.get_scale_credit_range(scale)
+            field_credit = processor.business_fields.get(business_field, 0)
+            usage_credit = processor.usage_types.get(usage_type, 0)
+            result['analysis'] = {
                 'scale_value': round(scale_value, 2),
                 'risk_value': round(risk_value, 2),
                 'priority_value': round(priority_value, 2),
                 'credit_range_million': f"{credit_range[0]} - {credit_range[1]} Juta",
                 'field_credit_billion': f"{field_credit:,} Miliar",
                 'usage_credit_billion': f"{usage_credit:,} Miliar",
-                'detailed_analysis': detailed_analysis
-            },
-            'visualization': visualization,
-            'timestamp': datetime.now().isoformat()
-        }
+                'detailed_analysis': evaluation['detailed_analysis']
+            }
         
-        return jsonify(result)
+        if not fuzzy_logic.inference_only:
+            # Rendered on demand by /api/visualization
+            if 'visualization_url' in fields:
+                result['visualization_url'] = url_for('get_visualization', business_field=business_field,
+                                                      scale=scale, usage_type=usage_type,
+                                                      dataset=dataset_name(application['data']), model=variant)
+            
+            # Inline base64 image only for clients that ask for it
+            if 'visualization' in fields:
+                result['visualization'] = fuzzy_logic.generate_fuzzy_visualization(
+                    scale_value, risk_value, priority_value, approval_score, model)
+        
+        return jsonify({field: value for field, value in result.items() if field in fields})
         
     except Exception as e:
         logger.error(f"Error in calculation: {str(e)}")
         return jsonify({'error': f'Terjadi kesalahan dalam perhitungan: {str(e)}'}), 500
 
+def score_applications(applications):
+    """Validate and score a list of applications with one vectorized engine call
+    
+    Returns one result dict per application, in order. Invalid applications get
+    an 'error' entry with the same message /api/calculate would return.
+    """
+    results = []
+    valid = []
+    for index, data in enumerate(applications):
+        application, error = resolve_application(data)
+        result = {'index': index}
+        if hasattr(data, 'get') and data.get('id') is not None:
+            result['id'] = data.get('id')
+        if error:
+            result['error'] = error
+        else:
+            valid.append((result, application))
+        results.append(result)
+    
+    if valid:
+        scores = fuzzy_logic.calculate_approval_scores(
+            [a['scale_value'] for _, a in valid],
+            [a['risk_value'] for _, a in valid],
+            [a['priority_value'] for _, a in valid])
+        for (result, application), score in zip(valid, scores.tolist()):
+            scale_value = application['scale_value']
+            risk_value = application['risk_value']
+            priority_value = application['priority_value']
+            if score != score:  # NaN: no rule fires for this combination
+                error = _no_rule_fires(scale_value, risk_value, priority_value)
+                result['error'] = f'Terjadi kesalahan dalam perhitungan: {str(error)}'
+                continue
+            category, color = fuzzy_logic.get_approval_category(score)
+            result.update({
+                'approval_score': round(score, 2),
+                'approval_category': category,
+                'approval_color': color,
+                'recommendations': fuzzy_logic.get_recommendations(score, scale_value, risk_value, priority_value),
+                'input_values': input_values(application),
+                'analysis': {
+                    'scale_value': round(scale_value, 2),
+                    'risk_value': round(risk_value, 2),
+                    'priority_value': round(priority_value, 2)
+                }
+            })
+    return results
+
+@app.route('/api/sensitivity', methods=['POST'])
+def sensitivity():
+    """What-if sweep: score grid, derivatives and category crossings as one or two inputs vary"""
+    try:
+        if not data_processor or not fuzzy_logic:
+            return jsonify({'error': 'System not properly initialized'}), 500
+        
+        data = request.get_json(silent=True)
+        application, error = resolve_application(data)
+        if error:
+            return jsonify({'error': error}), 400
+        
+        vary = data.get('vary', 'risk_level')
+        points = data.get('points', 101)
+        ranges = data.get('range') or {}
+        if isinstance(points, bool) or not isinstance(points, int) or not 2 <= points <= SENSITIVITY_MAX_POINTS:
+            return jsonify({'error': f'points harus bilangan bulat 2-{SENSITIVITY_MAX_POINTS}'}), 400
+        if not isinstance(ranges, dict) or not all(
+                isinstance(bounds, list) and len(bounds) == 2
+                and all(isinstance(x, (int, float)) and not isinstance(x, bool) for x in bounds)
+                and bounds[0] < bounds[1] for bounds in ranges.values()):
+            return jsonify({'error': 'range harus berupa {"input": [min, max]} dengan min < max'}), 400
+        try:
+            result = fuzzy_logic.sensitivity(application['scale_value'], application['risk_value'],
+                                             application['priority_value'], vary, points, ranges)
+        except (TypeError, ValueError) as e:
+            return jsonify({'error': f'Parameter sweep tidak valid: {str(e)}'}), 400
+        
+        result['input_values'] = input_values(application)
+        return jsonify(result)
+        
+    except Exception as e:
+        logger.error(f"Error in sensitivity analysis: {str(e)}")
+        return jsonify({'error': f'Terjadi kesalahan dalam analisis sensitivitas: {str(e)}'}), 500
+
+def iter_ndjson(stream):
+    """Yield one parsed object per non-empty line; None for lines that are not valid JSON"""
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            yield None
+
+@app.route('/api/calculate_batch', methods=['POST'])
+def calculate_batch():
+    """Score many applications, streaming one NDJSON result line per application"""
+    try:
+        if not data_processor or not fuzzy_logic:
+            return jsonify({'error': 'System not properly initialized'}), 500
+        
+        # NDJSON bodies are read line by line while results stream back
+        if request.mimetype in ('application/x-ndjson', 'application/jsonl'):
+            applications = iter_ndjson(request.stream)
+        else:
+            applications = request.get_json(silent=True)
+            if isinstance(applications, dict):
+                applications = applications.get('applications')
+            if not isinstance(applications, list):
+                return jsonify({'error': 'Data harus berupa array aplikasi atau NDJSON'}), 400
+        
+        def generate():
+            block = []
+            offset = 0
+            for data in applications:
+                block.append(data)
+                if len(block) == BATCH_BLOCK_SIZE:
+                    yield from _batch_lines(block, offset)
+                    offset += len(block)
+                    block = []
+            if block:
+                yield from _batch_lines(block, offset)
+        
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+        
+    except Exception as e:
+        logger.error(f"Error in batch calculation: {str(e)}")
+        return jsonify({'error': f'Terjadi kesalahan dalam perhitungan: {str(e)}'}), 500
+
+def _batch_lines(block, offset):
+    """NDJSON lines for one block of applications, indexed from ``offset``"""
+    try:
+        results = score_applications(block)
+    except Exception as e:
+        logger.error(f"Error in batch calculation: {str(e)}")
+        results = [{'index': index, 'error': f'Terjadi kesalahan dalam perhitungan: {str(e)}'}
+                   for index in range(len(block))]
+    for result in results:
+        result['index'] += offset
+        yield json.dumps(result) + '\n'
+
+@app.route('/api/visualization')
+def get_visualization():
+    """Fuzzy visualization for one application as PNG, or membership curves as JSON (format=json)"""
+    try:
+        if not data_processor or not fuzzy_logic:
+            return jsonify({'error': 'System not properly initialized'}), 500
+        if fuzzy_logic.inference_only:
+            return jsonify({'error': 'Visualisasi tidak tersedia dalam mode inferensi'}), 404
+        
+        application, error = resolve_application(request.args)
+        if error:
+            return jsonify({'error': error}), 400
+        variant = request.args.get('model')
+        model, error = select_model(variant)
+        if error:
+            return jsonify({'error': error}), 400
+        scale_value = application['scale_value']
+        risk_value = application['risk_value']
+        priority_value = application['priority_value']
+        approval_score = fuzzy_logic.evaluate(scale_value, risk_value, priority_value, model=model)['approval_score']
+        
+        if request.args.get('format') == 'json':
+            return jsonify({
+                'variables': fuzzy_logic.get_membership_curves(model),
+                'markers': {
+                    'business_scale': scale_value,
+                    'risk_level': risk_value,
+                    'usage_priority': priority_value,
+                    'approval_score': approval_score
+                }
+            })
+        
+        png = fuzzy_logic.render_visualization_png(scale_value, risk_value, priority_value, approval_score, model)
+        return send_file(io.BytesIO(png), mimetype='image/png', max_age=3600)
+        
+    except Exception as e:
+        logger.error(f"Error in visualization: {str(e)}")
+        return jsonify({'error': f'Terjadi kesalahan dalam visualisasi: {str(e)}'}), 500
+
 @app.route('/api/statistics')
 def get_statistics():
     """Get UMKM statistics for display"""
@@ -136,32 +580,10 @@ def get_statistics():
         if not data_processor:
             return jsonify({'error': 'Data processor not initialized'}), 500
             
-        total_credit = sum(data_processor.business_fields.values())
-        
-        stats = {
-            'total_credit': f"{total_credit:,} Miliar",
-            'total_business_fields': len(data_processor.business_fields),
-            'scales_distribution': {
-                'Mikro': f"{data_processor.scales.get('Mikro', 0):,} Miliar",
-                'Kecil': f"{data_processor.scales.get('Kecil', 0):,} Miliar",
-                'Menengah': f"{data_processor.scales.get('Menengah', 0):,} Miliar"
-            },
-            'usage_distribution': {
-                'Modal Kerja': f"{data_processor.usage_types.get('Modal Kerja', 0):,} Miliar",
-                'Investasi': f"{data_processor.usage_types.get('Investasi', 0):,} Miliar"
-            },
-            'top_business_fields': sorted(data_processor.business_fields.items(),
-                                        key=lambda x: x[1], reverse=True)[:5],
-            'risk_distribution': {
-                'low_risk': sum(1 for field in data_processor.business_fields.keys()
-                              if data_processor.get_business_field_risk(field) <= 0.4),
-                'medium_risk': sum(1 for field in data_processor.business_fields.keys()
-                                 if 0.4 < data_processor.get_business_field_risk(field) <= 0.7),
-                'high_risk': sum(1 for field in data_processor.business_fields.keys()
-                               if data_processor.get_business_field_risk(field) > 0.7)
-            }
-        }
-        return jsonify(stats)
+        processor, error = select_dataset(request.args.get('dataset'))
+        if error:
+            return jsonify({'error': error}), 400
+        return precomputed_json(('statistics', dataset_name(processor)), processor.get_statistics())
     except Exception as e:
         logger.error(f"Error getting statistics: {str(e)}")
         return jsonify({'error': 'Failed to load statistics'}), 500
@@ -173,25 +595,54 @@ def get_chart_data():
         if not data_processor:
             return jsonify({'error': 'Data processor not initialized'}), 500
             
-        chart_data = {
-            'business_fields': {
-                'labels': list(data_processor.business_fields.keys()),
-                'values': list(data_processor.business_fields.values())
-            },
-            'scales': {
-                'labels': list(data_processor.scales.keys()),
-                'values': list(data_processor.scales.values())
-            },
-            'usage_types': {
-                'labels': list(data_processor.usage_types.keys()),
-                'values': list(data_processor.usage_types.values())
-            }
-        }
-        return jsonify(chart_data)
+        processor, error = select_dataset(request.args.get('dataset'))
+        if error:
+            return jsonify({'error': error}), 400
+        return precomputed_json(('chart_data', dataset_name(processor)), processor.get_chart_data())
     except Exception as e:
         logger.error(f"Error getting chart data: {str(e)}")
         return jsonify({'error': 'Failed to load chart data'}), 500
 
+@app.route('/api/features')
+def get_features():
+    """Risk, priority and scale levels of every row and the features behind them"""
+    try:
+        if not data_processor:
+            return jsonify({'error': 'Data processor not initialized'}), 500
+            
+        processor, error = select_dataset(request.args.get('dataset'))
+        if error:
+            return jsonify({'error': error}), 400
+        return precomputed_json(('features', dataset_name(processor)), processor.get_features())
+    except Exception as e:
+        logger.error(f"Error getting features: {str(e)}")
+        return jsonify({'error': 'Failed to load features'}), 500
+
+@app.route('/api/datasets')
+def get_datasets():
+    """Datasets selectable with "dataset", and which of them are loaded"""
+    if dataset_store is None:
+        return jsonify({'datasets': [], 'default': None})
+    return jsonify({
+        'datasets': [{'key': '/'.join(key), 'period': key[0], 'region': key[1]} for key in dataset_store.keys()],
+        'default': None if dataset_store.default is None else '/'.join(dataset_store.default),
+        'store': dataset_store.stats(),
+    })
+
+@app.route('/api/models')
+def get_models():
+    """Model variants selectable with "model" and scored by the "variants" field of /api/calculate"""
+    if not fuzzy_logic:
+        return jsonify({'error': 'System not properly initialized'}), 500
+    return jsonify({'models': fuzzy_logic.variants.describe(), 'default': DEFAULT_VARIANT})
+
+@app.route('/metrics')
+def get_metrics():
+    """Stage latencies, request counters and cache statistics in Prometheus text format"""
+    if metrics is None:
+        return jsonify({'error': 'Metrics tidak diaktifkan (set FUZZY_METRICS=1)'}), 404
+    return Response(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
 @app.errorhandler(404)
 def not_found(error):
     return jsonify({'error': 'Endpoint not found'}), 404
@@ -0,0 +1,331 @@
+"""
+ASGI entry point: the Flask routes of app.py behind a bounded worker pool
+
+    uvicorn asgi:app --workers 4                # or: hypercorn asgi:app --workers 4
+    python asgi.py --port 8000 --processes 4    # the same through uvicorn, with the pool options
+
+Requests run on a pool of FUZZY_ASGI_WORKERS threads, so the event loop only
+does I/O. At most FUZZY_ASGI_QUEUE further requests wait for a thread;
+beyond that the application answers 503 with Retry-After straight from the
+event loop instead of queueing without bound. On shutdown new requests get
+503 while those in flight finish, for up to FUZZY_ASGI_SHUTDOWN_TIMEOUT
+seconds.
+
+Scoring is numpy on small arrays plus Python and holds the GIL for most of a
+request, so the threads of one process do not score in parallel: the pool
+bounds waiting and keeps slow requests from blocking the loop, it adds no
+CPU. Throughput scales with server processes (``--workers`` of uvicorn or
+hypercorn), each with its own pool; benchmarks/load_test.py reports the CPU
+the server used.
+
+Request bodies are read completely before dispatch (up to
+FUZZY_ASGI_MAX_BODY bytes, 413 beyond); responses, including NDJSON
+streams, are sent as the worker produces them. When the client goes away
+mid-response the worker stops iterating the response and its thread is free
+again. Parsing HTTP, its limits and connection timeouts are left to the
+server.
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import os
+import sys
+import threading
+from concurrent.futures import CancelledError, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+# Threads share one GIL, so a few per process are enough to keep a request from waiting on another's I/O
+WORKERS = int(os.environ.get('FUZZY_ASGI_WORKERS', 4))
+QUEUE_DEPTH = int(os.environ.get('FUZZY_ASGI_QUEUE', 64))
+SHUTDOWN_TIMEOUT = float(os.environ.get('FUZZY_ASGI_SHUTDOWN_TIMEOUT', 30))
+MAX_BODY = int(os.environ.get('FUZZY_ASGI_MAX_BODY', 64 * 1024 * 1024))
+
+# Response chunks buffered per request before the worker waits for the client
+STREAM_BUFFER = 16
+
+# Seconds a worker waiting for the client sleeps between checks whether it went away
+PUT_INTERVAL = 0.5
+
+
+class ClientDisconnected(Exception):
+    """Raised in a worker passing on a response nobody reads any more"""
+
+
+class WorkerPoolASGI:
+    """ASGI application running a WSGI app on a bounded thread pool with load shedding"""
+
+    def __init__(self, wsgi_app, workers=WORKERS, queue_depth=QUEUE_DEPTH, shutdown_timeout=SHUTDOWN_TIMEOUT,
+                 max_body=MAX_BODY):
+        self.wsgi_app = wsgi_app
+        self.workers = workers
+        self.queue_depth = queue_depth
+        self.shutdown_timeout = shutdown_timeout
+        self.max_body = max_body
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='asgi-worker')
+        # Only touched from the event loop thread
+        self.in_flight = 0
+        self.closing = False
+        self.rejected = 0
+        self.completed = 0
+        self._drained = None
+
+    @property
+    def capacity(self):
+        """Requests accepted at once: one per worker plus the queue"""
+        return self.workers + self.queue_depth
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self._http(scope, receive, send)
+        else:
+            raise RuntimeError(f"Unsupported ASGI scope type {scope['type']!r}")
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.shutdown()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def shutdown(self):
+        """Refuse new requests, wait for those in flight (up to shutdown_timeout), stop the pool"""
+        self.closing = True
+        if self.in_flight:
+            self._drained = asyncio.Event()
+            try:
+                await asyncio.wait_for(self._drained.wait(), self.shutdown_timeout)
+            except asyncio.TimeoutError:
+                pass
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _http(self, scope, receive, send):
+        if self.closing:
+            await _send_error(send, 503, 'Server sedang dimatikan', retry_after=1)
+            return
+        if self.in_flight >= self.capacity:
+            self.rejected += 1
+            await _send_error(send, 503, 'Server sedang sibuk, coba lagi', retry_after=1)
+            return
+
+        self.in_flight += 1
+        try:
+            body = await _read_body(receive, self.max_body)
+            if body is None:
+                await _send_error(send, 413, 'Request terlalu besar')
+                return
+            await self._dispatch(wsgi_environ(scope, body), send)
+            self.completed += 1
+        finally:
+            self.in_flight -= 1
+            if self._drained is not None and not self.in_flight:
+                self._drained.set()
+
+    async def _dispatch(self, environ, send):
+        """Run the WSGI app on the pool and relay its response as it is produced"""
+        loop = asyncio.get_running_loop()
+        messages = asyncio.Queue(STREAM_BUFFER)
+        aborted = threading.Event()
+
+        def put(message):
+            # Blocks the worker while the client is slower than the response, until it goes away
+            future = None
+            if not aborted.is_set():
+                try:
+                    future = asyncio.run_coroutine_threadsafe(messages.put(message), loop)
+                except RuntimeError:
+                    pass  # Event loop closed
+            while future is not None:
+                try:
+                    future.result(PUT_INTERVAL)
+                    return
+                except FutureTimeoutError:
+                    if aborted.is_set():
+                        future.cancel()
+                        break
+                except CancelledError:
+                    break
+            if message is not None:
+                raise ClientDisconnected()
+
+        worker = loop.run_in_executor(self.executor, run_wsgi, self.wsgi_app, environ, put)
+        started = False
+        try:
+            while True:
+                message = await messages.get()
+                if message is None:
+                    break
+                if message['type'] == 'http.response.start':
+                    started = True
+                await send(message)
+            await worker
+        except Exception:
+            if not started:
+                await _send_error(send, 500, 'Internal server error')
+                return
+            raise
+        finally:
+            # Also on cancellation or a failed send: the worker stops at its next chunk
+            aborted.set()
+        await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+
+    def metrics(self):
+        """Collector output for metrics.Metrics.add_collector()"""
+        return [
+            ('asgi_in_flight_requests', 'gauge', 'Requests running or waiting for a worker', [({}, self.in_flight)]),
+            ('asgi_capacity', 'gauge', 'Workers plus queue depth', [({}, self.capacity)]),
+            ('asgi_rejected_total', 'counter', 'Requests answered 503 because the pool was saturated',
+             [({}, self.rejected)]),
+        ]
+
+
+def run_wsgi(wsgi_app, environ, put):
+    """Call the WSGI app on this thread and pass its response to ``put`` as ASGI messages, then None
+
+    The whole response is iterated on one thread, so generators using the
+    request context (stream_with_context) keep working. When ``put`` raises
+    ClientDisconnected the iterable is closed and the rest is dropped.
+    """
+    try:
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            if exc_info and response.get('sent'):
+                raise exc_info[1].with_traceback(exc_info[2])
+            response['status'] = int(status.split(' ', 1)[0])
+            response['headers'] = [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                                   for name, value in headers]
+            return _no_write
+
+        iterable = wsgi_app(environ, start_response)
+        try:
+            for chunk in iterable:
+                if not response.get('sent'):
+                    put({'type': 'http.response.start', 'status': response['status'],
+                         'headers': response['headers']})
+                    response['sent'] = True
+                if chunk:
+                    put({'type': 'http.response.body', 'body': bytes(chunk), 'more_body': True})
+            if not response.get('sent'):
+                put({'type': 'http.response.start', 'status': response['status'], 'headers': response['headers']})
+        finally:
+            if hasattr(iterable, 'close'):
+                iterable.close()
+    except ClientDisconnected:
+        pass
+    finally:
+        put(None)
+
+
+def _no_write(data):
+    raise RuntimeError("The write() callable of start_response is not supported")
+
+
+def wsgi_environ(scope, body):
+    """WSGI environ for an ASGI http scope and its complete body"""
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': client[0],
+        'REMOTE_PORT': str(client[1]),
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name == 'CONTENT_TYPE':
+            environ['CONTENT_TYPE'] = value
+            continue
+        if name == 'CONTENT_LENGTH':
+            continue
+        key = 'HTTP_' + name
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+async def _read_body(receive, limit):
+    """The complete request body, or None when it exceeds ``limit`` bytes"""
+    chunks = []
+    size = 0
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            break
+        chunk = message.get('body', b'')
+        size += len(chunk)
+        if size > limit:
+            return None
+        chunks.append(chunk)
+        if not message.get('more_body'):
+            break
+    return b''.join(chunks)
+
+
+async def _send_error(send, status, message, retry_after=None):
+    body = json.dumps({'error': message}).encode()
+    headers = [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())]
+    if retry_after is not None:
+        headers.append((b'retry-after', str(retry_after).encode()))
+    await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+def create_app(**options):
+    """The Flask app of app.py wrapped in a WorkerPoolASGI; its pool shows up in /metrics when enabled"""
+    import app as app_module
+    asgi_app = WorkerPoolASGI(app_module.app, **options)
+    if app_module.metrics is not None:
+        app_module.metrics.add_collector(asgi_app.metrics)
+    return asgi_app
+
+
+def __getattr__(name):
+    # ``uvicorn asgi:app`` imports the Flask app only when the server asks for it
+    if name == 'app':
+        globals()['app'] = create_app()
+        return globals()['app']
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the scoring API with uvicorn and a bounded worker pool")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--processes', type=int, default=1, help="Server processes, each with its own pool")
+    parser.add_argument('--workers', type=int, default=WORKERS, help=f"Worker threads per process (default {WORKERS})")
+    parser.add_argument('--queue', type=int, default=QUEUE_DEPTH,
+                        help=f"Requests that may wait for a worker before 503 (default {QUEUE_DEPTH})")
+    args = parser.parse_args(argv)
+
+    try:
+        import uvicorn
+    except ImportError:
+        raise SystemExit("Serving requires an ASGI server (pip install uvicorn), or run: hypercorn asgi:app")
+    # Every server process builds its own app from the environment
+    os.environ['FUZZY_ASGI_WORKERS'] = str(args.workers)
+    os.environ['FUZZY_ASGI_QUEUE'] = str(args.queue)
+    uvicorn.run('asgi:app', host=args.host, port=args.port, workers=args.processes, lifespan='on')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
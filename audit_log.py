@@ -0,0 +1,515 @@
+#!/usr/bin/env python3
+"""
+Append-only audit log of scoring decisions
+
+record() only appends a decision to a bounded in-memory queue; a background
+thread serializes the queued records and writes them in batches, so requests
+never wait for the disk. Two stores, chosen by the path:
+
+- a directory: JSON lines in append-only segment files
+  ``audit-<first ts>-<pid>.jsonl``, rotated at ``segment_bytes``, each with
+  an ``.idx`` sidecar holding the first timestamp and offset of every batch,
+  so a time-range query seeks to the first batch it needs instead of reading
+  whole segments. Every process writes its own segments; queries merge them.
+- a ``.db``, ``.sqlite`` or ``.sqlite3`` file: SQLite in WAL mode, one
+  transaction per batch, indexed by timestamp; processes share the file.
+
+A batch counts as written once it is fsync-ed. A log never appends to an
+existing segment, so a crash leaves at most a torn last line, which readers
+skip; a batch whose write failed is cut off the segment before it is
+retried, so no record is written twice. When the queue is full, record()
+drops the record straight away, counted in ``stats()['dropped']``, so a
+stalled disk never holds up a request; ``block_timeout`` lets it wait for
+room instead.
+
+Timestamps (``ts``, nanoseconds since the epoch) are assigned when a record
+is queued and strictly increase within a log.
+
+    python audit_log.py audit/ --since 2026-10-01 --until 2026-10-02 --category "Sangat Disetujui"
+"""
+
+import argparse
+import bisect
+import heapq
+import json
+import logging
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Segment size at which the next batch starts a new segment
+DEFAULT_SEGMENT_BYTES = 64 * 1024 * 1024
+
+SQLITE_SUFFIXES = ('.db', '.sqlite', '.sqlite3')
+
+SEGMENT_NAME = re.compile(r'^audit-(\d{20})-(\d+)\.jsonl$')
+
+# Larger than any timestamp in nanoseconds that SQLite can store
+MAX_TS = 2 ** 63 - 1
+
+
+class AuditLog:
+    """Bounded queue of records written in batches by a background thread"""
+
+    def __init__(self, path, prepare=None, batch_size=512, flush_interval=1.0, max_queue=10000,
+                 block_timeout=0.0, segment_bytes=DEFAULT_SEGMENT_BYTES, fsync=True):
+        """Open (or create) the log at ``path`` and start its writer
+
+        ``prepare`` is called on the writer thread with each batch (a list of
+        record dicts, ``ts`` included) before it is serialized, to fill in
+        what is too costly to compute while the request waits. Keys starting
+        with ``_`` are for ``prepare`` only and never written. Records that do
+        not serialize to JSON are left out and counted in ``stats()['invalid']``.
+        """
+        self.path = path
+        self.store = open_store(path, segment_bytes, fsync)
+        self.prepare = prepare
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self.block_timeout = block_timeout
+        self.recorded = 0
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+        self.write_errors = 0
+        self.invalid = 0
+        self._queue = deque()
+        self._condition = threading.Condition()
+        self._last_ts = 0
+        self._flushing = False
+        self._closing = False
+        self._thread = threading.Thread(target=self._run, name='audit-log', daemon=True)
+        self._thread.start()
+
+    def record(self, record):
+        """Queue a JSON-serializable dict; returns its timestamp, or None if it was dropped
+
+        A full queue drops the record at once unless ``block_timeout`` allows
+        waiting that many seconds for room.
+        """
+        with self._condition:
+            if self._closing:
+                raise RuntimeError("Audit log is closed")
+            deadline = None
+            while len(self._queue) >= self.max_queue:
+                if deadline is None:
+                    deadline = time.monotonic() + self.block_timeout
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.dropped += 1
+                    return None
+                self._condition.wait(remaining)
+            ts = max(time.time_ns(), self._last_ts + 1)
+            self._last_ts = ts
+            self._queue.append((ts, record))
+            self.recorded += 1
+            if len(self._queue) >= self.batch_size:
+                self._condition.notify_all()
+            return ts
+
+    def flush(self, timeout=None):
+        """Write everything queued so far now; True once it is on disk, False on timeout"""
+        with self._condition:
+            target = self.recorded
+            self._flushing = True
+            self._condition.notify_all()
+            return self._condition.wait_for(
+                lambda: self.written + self.invalid >= target or not self._thread.is_alive(), timeout)
+
+    def close(self, timeout=None):
+        """Write the remaining records and stop the writer; records after this raise RuntimeError"""
+        with self._condition:
+            if self._closing and not self._thread.is_alive():
+                return
+            self._closing = True
+            self._condition.notify_all()
+        self._thread.join(timeout)
+        self.store.close()
+
+    def query(self, start=None, end=None):
+        """Records with ``start`` <= ts < ``end`` (see parse_time), oldest first; flushes first"""
+        self.flush()
+        return self.store.scan(parse_time(start), parse_time(end))
+
+    def stats(self):
+        """Queue depth and record/batch counters"""
+        with self._condition:
+            return {
+                'queued': len(self._queue),
+                'max_queue': self.max_queue,
+                'recorded': self.recorded,
+                'written': self.written,
+                'dropped': self.dropped,
+                'batches': self.batches,
+                'write_errors': self.write_errors,
+                'invalid': self.invalid,
+            }
+
+    def metrics(self):
+        """Collector output for metrics.Metrics.add_collector()"""
+        stats = self.stats()
+        return [
+            ('audit_queued_records', 'gauge', 'Audit records waiting to be written', [({}, stats['queued'])]),
+            ('audit_written_total', 'counter', 'Audit records written to disk', [({}, stats['written'])]),
+            ('audit_dropped_total', 'counter', 'Audit records dropped because the queue stayed full',
+             [({}, stats['dropped'])]),
+            ('audit_write_errors_total', 'counter', 'Failed audit batch writes (retried)',
+             [({}, stats['write_errors'])]),
+            ('audit_invalid_total', 'counter', 'Audit records left out because they do not serialize to JSON',
+             [({}, stats['invalid'])]),
+        ]
+
+    def _next_batch(self):
+        """Wait for a full batch, a flush, close or the flush interval; pop up to one batch"""
+        with self._condition:
+            deadline = time.monotonic() + self.flush_interval
+            while len(self._queue) < self.batch_size and not (self._flushing or self._closing):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            batch = [self._queue.popleft() for _ in range(min(len(self._queue), self.batch_size))]
+            if not self._queue:
+                self._flushing = False
+            # Room for callers blocked in record()
+            self._condition.notify_all()
+            return batch, self._closing and not self._queue
+
+    def _run(self):
+        batch, done = [], False
+        while True:
+            if not batch:
+                if done:
+                    return
+                batch, done = self._next_batch()
+                if not batch:
+                    continue
+            try:
+                written = self._write(batch)
+            except Exception as e:
+                with self._condition:
+                    self.write_errors += 1
+                logger.error(f"Audit batch of {len(batch)} records not written, retrying: {str(e)}")
+                if done:
+                    logger.error(f"Audit log closing, {len(batch)} records lost")
+                    with self._condition:
+                        self.dropped += len(batch)
+                        self._condition.notify_all()
+                    return
+                time.sleep(self.flush_interval)
+                continue
+            with self._condition:
+                self.written += written
+                self.invalid += len(batch) - written
+                self.batches += 1
+                self._condition.notify_all()
+            batch = []
+
+    def _write(self, batch):
+        """Serialize and store one batch; returns the number of records written"""
+        records = [{'ts': ts, **record} for ts, record in batch]
+        if self.prepare is not None:
+            try:
+                self.prepare(records)
+            except Exception as e:
+                # Keep the decisions themselves even if their extra detail cannot be computed
+                logger.error(f"Preparing audit records failed: {str(e)}")
+        lines = []
+        for record in records:
+            try:
+                lines.append((record['ts'], json.dumps({key: value for key, value in record.items()
+                                                        if not key.startswith('_')},
+                                                       ensure_ascii=False, separators=(',', ':'),
+                                                       default=_json_default)))
+            except (TypeError, ValueError) as e:
+                logger.error(f"Audit record {record['ts']} left out, not serializable: {str(e)}")
+        if lines:
+            self.store.write(lines)
+        return len(lines)
+
+
+class SegmentStore:
+    """Append-only JSON-lines segments in a directory, with a batch offset index per segment"""
+
+    def __init__(self, directory, segment_bytes=DEFAULT_SEGMENT_BYTES, fsync=True):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.fsync = fsync
+        self.skipped = 0
+        self._data = None
+        self._index = None
+        # Bytes of the current segment holding complete, durable batches
+        self._size = 0
+
+    def write(self, batch):
+        """Append [(ts, JSON line)], rotating first when the segment is full; durable on return
+
+        If a write fails part of the way, the next one first cuts the
+        segment back to its last complete batch, so a retried batch is not
+        stored twice.
+        """
+        data = ''.join(line + '\n' for _, line in batch).encode('utf-8')
+        if self._data is None or self._size >= self.segment_bytes:
+            self._rotate(batch[0][0])
+        elif self._data.tell() != self._size:
+            self._data.seek(self._size)
+            self._data.truncate()
+        offset = self._size
+        # Unbuffered, so the file position is what reached the file
+        view = memoryview(data)
+        while view:
+            view = view[self._data.write(view):]
+        if self.fsync:
+            os.fsync(self._data.fileno())
+        self._size += len(data)
+        # Only a hint for readers, written after the data it points to; a batch
+        # without an entry is still found from the previous one
+        if self._index is not None:
+            try:
+                self._index.write(f"{batch[0][0]} {offset}\n")
+                self._index.flush()
+            except OSError as e:
+                logger.error(f"Audit index {self._index.name} not updated, no more entries: {str(e)}")
+                self._index = None
+
+    def _rotate(self, ts):
+        self.close()
+        name = os.path.join(self.directory, f"audit-{ts:020d}-{os.getpid()}")
+        # 'x': never append to a segment another log left behind
+        self._data = open(name + '.jsonl', 'xb', buffering=0)
+        self._index = open(name + '.idx', 'x', encoding='utf-8')
+        self._size = 0
+        if self.fsync and hasattr(os, 'O_DIRECTORY'):
+            # Make the new file's directory entry durable too
+            descriptor = os.open(self.directory, os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(descriptor)
+            finally:
+                os.close(descriptor)
+
+    def close(self):
+        for f in (self._data, self._index):
+            if f is not None:
+                f.close()
+        self._data = self._index = None
+
+    def segments(self):
+        """(first ts, upper ts bound, path) of every segment, oldest first
+
+        A segment holds records up to the first one of the same writer's next
+        segment (same process id); the last segment of a writer is unbounded.
+        """
+        found = sorted((int(match.group(1)), int(match.group(2)), entry)
+                       for entry in os.listdir(self.directory) for match in [SEGMENT_NAME.match(entry)] if match)
+        segments = []
+        for i, (first, pid, entry) in enumerate(found):
+            upper = next((later for later, other, _ in found[i + 1:] if other == pid), MAX_TS)
+            segments.append((first, upper, os.path.join(self.directory, entry)))
+        return segments
+
+    def scan(self, start=None, end=None):
+        """(ts, record) with start <= ts < end across all segments, oldest first"""
+        start = 0 if start is None else start
+        end = MAX_TS if end is None else end
+        readers = [self._read_segment(path, start, end) for first, upper, path in self.segments()
+                   if first < end and upper > start]
+        for _, record in heapq.merge(*readers, key=lambda item: item[0]):
+            yield record
+
+    def _read_segment(self, path, start, end):
+        with open(path, 'rb') as f:
+            f.seek(self._start_offset(path[:-len('.jsonl')] + '.idx', start))
+            for line in f:
+                if not line.endswith(b'\n'):
+                    self.skipped += 1  # Torn write at a crash
+                    break
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    self.skipped += 1
+                    continue
+                if record['ts'] >= end:
+                    break
+                if record['ts'] >= start:
+                    yield record['ts'], record
+
+    def _start_offset(self, index_path, start):
+        """Offset of the last batch starting at or before ``start``; 0 without a usable index"""
+        starts, offsets = [], []
+        try:
+            with open(index_path, encoding='utf-8') as f:
+                for line in f:
+                    parts = line.split()
+                    if len(parts) == 2 and line.endswith('\n'):
+                        starts.append(int(parts[0]))
+                        offsets.append(int(parts[1]))
+        except (OSError, ValueError):
+            return 0
+        position = bisect.bisect_right(starts, start) - 1
+        return offsets[position] if position >= 0 else 0
+
+
+class SQLiteStore:
+    """One SQLite table of (ts, record JSON) in WAL mode, written one transaction per batch"""
+
+    def __init__(self, path, fsync=True):
+        self.path = path
+        self.fsync = fsync
+        self._connection = None
+        connection = sqlite3.connect(path)
+        try:
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('CREATE TABLE IF NOT EXISTS audit (ts INTEGER NOT NULL, record TEXT NOT NULL)')
+            connection.execute('CREATE INDEX IF NOT EXISTS audit_ts ON audit (ts)')
+            connection.commit()
+        finally:
+            connection.close()
+
+    def write(self, batch):
+        """Insert [(ts, JSON line)] in one transaction; durable on return with ``fsync``"""
+        if self._connection is None:
+            # Only the writer thread uses it; close() runs after that thread has stopped
+            self._connection = sqlite3.connect(self.path, timeout=30, isolation_level=None,
+                                               check_same_thread=False)
+            self._connection.execute(f"PRAGMA synchronous={'FULL' if self.fsync else 'NORMAL'}")
+        with self._connection:
+            self._connection.execute('BEGIN')
+            self._connection.executemany('INSERT INTO audit (ts, record) VALUES (?, ?)', batch)
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def scan(self, start=None, end=None):
+        """Records with start <= ts < end, oldest first"""
+        connection = sqlite3.connect(self.path)
+        try:
+            rows = connection.execute('SELECT record FROM audit WHERE ts >= ? AND ts < ? ORDER BY ts',
+                                      (0 if start is None else start, MAX_TS if end is None else end))
+            for (record,) in rows:
+                yield json.loads(record)
+        finally:
+            connection.close()
+
+
+def open_store(path, segment_bytes=DEFAULT_SEGMENT_BYTES, fsync=True):
+    """SQLiteStore for .db/.sqlite/.sqlite3 paths, a SegmentStore directory otherwise"""
+    if path.lower().endswith(SQLITE_SUFFIXES):
+        return SQLiteStore(path, fsync)
+    return SegmentStore(path, segment_bytes, fsync)
+
+
+def read_audit(path, start=None, end=None):
+    """Records of the log at ``path`` with ``start`` <= ts < ``end``, oldest first, without a writer"""
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Audit log not found: {path}")
+    store = SQLiteStore(path) if path.lower().endswith(SQLITE_SUFFIXES) else SegmentStore(path)
+    return store.scan(parse_time(start), parse_time(end))
+
+
+def parse_time(value):
+    """Nanoseconds since the epoch of None, an int (ns), a datetime or an ISO 8601 string (local time if naive)"""
+    if value is None or isinstance(value, int):
+        return value
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if isinstance(value, datetime):
+        return int(value.timestamp()) * 10 ** 9 + value.microsecond * 1000
+    raise ValueError(f"Cannot read {value!r} as a time")
+
+
+def decision_record(model, fuzzy_values, input_values, evaluation, variant=None):
+    """Audit record of one decision; its rule activations are filled in by resolve_rule_activations()"""
+    return {
+        'inputs': input_values,
+        'fuzzy_values': dict(zip(model.input_labels, (float(value) for value in fuzzy_values))),
+        'approval_score': evaluation['approval_score'],
+        'approval_category': evaluation['approval_category'],
+        'model': model.fingerprint,
+        'variant': variant,
+        '_model': model,
+    }
+
+
+def resolve_rule_activations(records):
+    """Fill in ``rules`` ([[rule id, strength]] of the rules that fire) of decision records
+
+    AuditLog ``prepare`` hook: fires each model's rules once for all of its
+    records in the batch, and drops the model object from the records.
+    """
+    by_model = {}
+    for record in records:
+        model = record.pop('_model', None)
+        if model is not None:
+            by_model.setdefault(id(model), (model, []))[1].append(record)
+    for model, group in by_model.values():
+        engine = model.engine
+        inputs = [[record['fuzzy_values'][label] for record in group] for label in model.input_labels]
+        strengths = engine.fire(engine.fuzzify(inputs))
+        for record, row in zip(group, strengths.tolist()):
+            record['rules'] = [[rule_id, strength] for rule_id, strength in zip(model.rule_ids, row) if strength > 0]
+
+
+def _json_default(value):
+    """NumPy scalars and arrays as numbers and lists; anything else is a TypeError"""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query an audit log by time range and fields")
+    parser.add_argument('path', help="Segment directory or SQLite file")
+    parser.add_argument('--since', help="ISO 8601 start time (inclusive)")
+    parser.add_argument('--until', help="ISO 8601 end time (exclusive)")
+    parser.add_argument('--category', help="Only decisions with this approval category")
+    parser.add_argument('--model', help="Only decisions of models whose fingerprint starts with this")
+    parser.add_argument('--variant', help="Only decisions scored with this model variant")
+    parser.add_argument('--business-field', help="Only decisions for this business field")
+    parser.add_argument('--limit', type=int, help="Stop after this many records")
+    parser.add_argument('--count', action='store_true', help="Print the number of matching records only")
+    args = parser.parse_args(argv)
+
+    try:
+        records = read_audit(args.path, args.since, args.until)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+    count = 0
+    for record in records:
+        if args.category is not None and record.get('approval_category') != args.category:
+            continue
+        if args.model is not None and not str(record.get('model', '')).startswith(args.model):
+            continue
+        if args.variant is not None and record.get('variant') != args.variant:
+            continue
+        if args.business_field is not None and (record.get('inputs') or {}).get('business_field') != \
+                args.business_field:
+            continue
+        count += 1
+        if not args.count:
+            print(json.dumps(record, ensure_ascii=False))
+        if args.limit is not None and count >= args.limit:
+            break
+    if args.count:
+        print(count)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Bulk scoring of UMKM credit applications from CSV or Parquet files
+
+Reads applicants (business_field, scale, usage_type per row) in chunks, maps
+them through the UMKMDataProcessor lookups and scores each chunk with the
+vectorized fuzzy engine. Results are streamed to CSV or Parquet so memory use
+stays constant regardless of file size.
+
+    python batch_score.py applicants.csv -o scores.csv
+    python batch_score.py applicants.parquet -o scores.parquet --workers 4
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from data_processor import MISSING_FIELDS_ERROR, UMKMDataProcessor
+from features import FEATURE_MODES
+from fuzzy_logic import UMKMFuzzyLogic, _no_rule_fires
+
+DEFAULT_DATA_FILE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    'Posisi Kredit Usaha Mikro, Kecil, dan Menengah (UMKM) pada Bank Umum__, 2023.csv')
+
+INPUT_COLUMNS = ['business_field', 'scale', 'usage_type']
+
+# Scorer of the current process, created once per worker by _init_worker
+_scorer = None
+
+
+class ApplicationScorer:
+    """Maps categorical applications to fuzzy inputs and scores them in bulk"""
+
+    def __init__(self, data_file, model_path=None, feature_mode='buckets'):
+        processor = self.processor = UMKMDataProcessor(data_file, feature_mode=feature_mode)
+        self.fuzzy = UMKMFuzzyLogic(model_path=model_path)
+
+        # Same lookups /api/calculate uses, precomputed per valid choice
+        self.scale_values = {scale: self.fuzzy.scale_to_fuzzy_value(processor.get_scale_level(scale))
+                             for scale in processor.get_all_scales()}
+        self.risk_values = {field: self.fuzzy.risk_to_fuzzy_value(processor.get_business_field_risk(field))
+                            for field in processor.get_all_business_fields()}
+        self.priority_values = {usage: self.fuzzy.priority_to_fuzzy_value(processor.get_usage_priority(usage))
+                                for usage in processor.get_all_usage_types()}
+
+    def score(self, chunk):
+        """Score a DataFrame chunk; returns it with fuzzy values, score, category and error"""
+        missing = [column for column in INPUT_COLUMNS if column not in chunk.columns]
+        if missing:
+            raise ValueError(f"Input is missing columns: {', '.join(missing)}")
+
+        result = chunk[INPUT_COLUMNS].copy()
+        result['scale_value'] = result['scale'].map(self.scale_values)
+        result['risk_value'] = result['business_field'].map(self.risk_values)
+        result['priority_value'] = result['usage_type'].map(self.priority_values)
+
+        valid = result[['scale_value', 'risk_value', 'priority_value']].notna().all(axis=1).to_numpy()
+        scores = np.full(len(result), np.nan)
+        if valid.any():
+            scores[valid] = self.fuzzy.calculate_approval_scores(
+                result['scale_value'].to_numpy()[valid],
+                result['risk_value'].to_numpy()[valid],
+                result['priority_value'].to_numpy()[valid])
+
+        result['approval_score'] = np.round(scores, 2)
+        result['approval_category'] = self.fuzzy.get_approval_categories(scores)
+
+        # Once per distinct failing application
+        error = np.full(len(result), '', dtype=object)
+        choices = result[INPUT_COLUMNS].to_numpy(dtype=object)
+        messages = {}
+        for row in np.flatnonzero(np.isnan(scores)):
+            application = tuple(choices[row])
+            if application not in messages:
+                messages[application] = self.application_error(*application)
+            error[row] = messages[application]
+        result['error'] = error
+        return result
+
+    def application_error(self, business_field, scale, usage_type):
+        """Error /api/calculate returns for an application that does not score"""
+        if not all(not pd.isna(value) and value for value in (business_field, scale, usage_type)):
+            return MISSING_FIELDS_ERROR
+        error = self.processor.application_error(business_field, scale, usage_type)
+        if error:
+            return error
+        error = _no_rule_fires(float(self.scale_values[scale]), float(self.risk_values[business_field]),
+                               float(self.priority_values[usage_type]))
+        return f'Terjadi kesalahan dalam perhitungan: {str(error)}'
+
+
+def _init_worker(data_file, model_path, feature_mode):
+    """Build this process's scorer once"""
+    global _scorer
+    _scorer = ApplicationScorer(data_file, model_path, feature_mode)
+
+
+def _score_in_worker(chunk):
+    return _scorer.score(chunk)
+
+
+def read_chunks(path, chunksize):
+    """Yield DataFrame chunks of the input file (CSV or Parquet)"""
+    if path.endswith('.parquet'):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise SystemExit("Reading Parquet requires pyarrow (pip install pyarrow)")
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize, columns=INPUT_COLUMNS):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunksize, dtype=str, keep_default_na=False,
+                               na_values=[''], usecols=INPUT_COLUMNS)
+
+
+class ChunkWriter:
+    """Appends scored chunks to a CSV or Parquet file"""
+
+    def __init__(self, path):
+        self.path = path
+        self.parquet = path.endswith('.parquet')
+        self._writer = None
+        self._first = True
+
+    def write(self, chunk):
+        if self.parquet:
+            try:
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+            except ImportError:
+                raise SystemExit("Writing Parquet requires pyarrow (pip install pyarrow)")
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if self._writer is None:
+                self._writer = pq.ParquetWriter(self.path, table.schema)
+            self._writer.write_table(table)
+        else:
+            chunk.to_csv(self.path, mode='w' if self._first else 'a', header=self._first, index=False)
+        self._first = False
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+def score_file(input_path, output_path, data_file=DEFAULT_DATA_FILE, chunksize=100000,
+               workers=1, progress=None, model_path=None, feature_mode='buckets'):
+    """Score ``input_path`` into ``output_path``; returns (rows, seconds)
+
+    ``model_path`` is a model definition file (see fuzzy_model.py); the
+    bundled fuzzy_model.json is used without one, as by the API.
+    ``feature_mode`` picks how inputs are derived from the data (see
+    features.py).
+
+    With ``workers`` > 1 chunks are scored in a process pool. At most two
+    chunks per worker are in flight, so memory stays bounded, and results are
+    written in input order.
+    """
+    writer = ChunkWriter(output_path)
+    rows = 0
+    start = time.perf_counter()
+
+    def report(chunk):
+        nonlocal rows
+        writer.write(chunk)
+        rows += len(chunk)
+        if progress:
+            elapsed = time.perf_counter() - start
+            progress(rows, elapsed)
+
+    try:
+        if workers <= 1:
+            scorer = ApplicationScorer(data_file, model_path, feature_mode)
+            for chunk in read_chunks(input_path, chunksize):
+                report(scorer.score(chunk))
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(data_file, model_path, feature_mode)) as pool:
+                pending = deque()
+                for chunk in read_chunks(input_path, chunksize):
+                    pending.append(pool.submit(_score_in_worker, chunk))
+                    if len(pending) >= 2 * workers:
+                        report(pending.popleft().result())
+                while pending:
+                    report(pending.popleft().result())
+    finally:
+        writer.close()
+
+    return rows, time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score UMKM credit applications in bulk")
+    parser.add_argument('input', help="CSV or Parquet file with business_field, scale, usage_type columns")
+    parser.add_argument('-o', '--output', required=True, help="Output file (.csv or .parquet)")
+    parser.add_argument('--data', default=DEFAULT_DATA_FILE, help="BPS credit position CSV")
+    parser.add_argument('--model', help="Model definition file (JSON or YAML); the bundled fuzzy_model.json if omitted")
+    parser.add_argument('--features', choices=FEATURE_MODES, default='buckets',
+                        help="The fixed buckets, or continuous inputs from the data (default buckets)")
+    parser.add_argument('--chunksize', type=int, default=100000, help="Rows per chunk (default 100000)")
+    parser.add_argument('--workers', type=int, default=1, help="Scoring processes (default 1)")
+    parser.add_argument('--quiet', action='store_true', help="No progress output")
+    args = parser.parse_args(argv)
+
+    def progress(rows, elapsed):
+        print(f"\r{rows:,} rows scored ({rows / max(elapsed, 1e-9):,.0f} rows/s)",
+              end='', file=sys.stderr, flush=True)
+
+    rows, elapsed = score_file(args.input, args.output, args.data, args.chunksize,
+                               args.workers, None if args.quiet else progress, args.model, args.features)
+    if not args.quiet:
+        print(file=sys.stderr)
+    print(f"Scored {rows:,} rows in {elapsed:.2f}s ({rows / max(elapsed, 1e-9):,.0f} rows/s) -> {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Benchmark: cost of auditing a decision on the request path
+
+Compares writing each record synchronously (append + fsync per decision, as
+a naive audit would) with AuditLog.record(), which only queues the record,
+for the segment and SQLite stores. Reports the per-record latency seen by
+the caller and the time until everything is durable.
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from audit_log import AuditLog
+
+RECORDS = 5000
+SYNC_RECORDS = 500
+
+
+def decision(n):
+    """A record the size of an /api/calculate decision"""
+    return {
+        'inputs': {'business_field': 'Perdagangan Besar dan Eceran', 'scale': 'Kecil', 'usage_type': 'Modal Kerja'},
+        'fuzzy_values': {'business_scale': 37.2, 'risk_level': 24.6, 'usage_priority': 61.3},
+        'approval_score': 61.83 + n % 7,
+        'approval_category': 'Disetujui',
+        'model': 'f0525f72be8037d067e8b3a69cf122959260a770',
+        'variant': None,
+        'rules': [[3, 0.42], [7, 0.18], [11, 0.65]],
+    }
+
+
+def synchronous(path):
+    """Per-record microseconds: append one line and fsync it before returning"""
+    latencies = []
+    with open(path, 'ab') as f:
+        for n in range(SYNC_RECORDS):
+            start = time.perf_counter()
+            f.write((json.dumps(dict(decision(n), ts=time.time_ns())) + '\n').encode())
+            f.flush()
+            os.fsync(f.fileno())
+            latencies.append(time.perf_counter() - start)
+    return np.array(latencies) * 1e6
+
+
+def queued(path):
+    """Per-record microseconds of record(), and seconds until all records are durable"""
+    log = AuditLog(path, max_queue=RECORDS)
+    records = [decision(n) for n in range(RECORDS)]
+    latencies = []
+    start_all = time.perf_counter()
+    for record in records:
+        start = time.perf_counter()
+        log.record(record)
+        latencies.append(time.perf_counter() - start)
+    log.flush()
+    durable = time.perf_counter() - start_all
+    batches = log.stats()['batches']
+    log.close()
+    return np.array(latencies) * 1e6, durable, batches
+
+
+def main():
+    print(f"Audit log benchmark ({RECORDS:,} decisions, synchronous baseline on {SYNC_RECORDS:,})")
+    print("=" * 78)
+    print(f"{'mode':<22} {'p50 us':>9} {'p99 us':>9} {'records/s durable':>19} {'batches':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        latencies = synchronous(os.path.join(tmp, 'sync.jsonl'))
+        print(f"{'fsync per record':<22} {np.percentile(latencies, 50):>9.1f} {np.percentile(latencies, 99):>9.1f} "
+              f"{SYNC_RECORDS / (latencies.sum() / 1e6):>19,.0f} {SYNC_RECORDS:>9}")
+        for label, path in (('queued, segments', os.path.join(tmp, 'segments')),
+                            ('queued, SQLite WAL', os.path.join(tmp, 'audit.db'))):
+            latencies, durable, batches = queued(path)
+            print(f"{label:<22} {np.percentile(latencies, 50):>9.1f} {np.percentile(latencies, 99):>9.1f} "
+                  f"{RECORDS / durable:>19,.0f} {batches:>9}")
+    print("=" * 78)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
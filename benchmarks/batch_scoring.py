@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Benchmark: per-row cost of vectorized batch scoring vs. the scalar skfuzzy path
+"""
+
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from fuzzy_engine import SKFUZZY_TOLERANCE
+from fuzzy_logic import UMKMFuzzyLogic
+
+
+def random_inputs(n, seed=0):
+    """Uniform random (scale, risk, priority) rows over the 0-100 universes"""
+    rng = np.random.default_rng(seed)
+    return rng.uniform(0, 100, size=(3, n))
+
+
+def time_scalar(fuzzy, scale, risk, priority):
+    """Seconds spent scoring each row through skfuzzy's ControlSystemSimulation"""
+    start = time.perf_counter()
+    for s, r, p in zip(scale, risk, priority):
+        try:
+            fuzzy.reference_approval_score(s, r, p)
+        except ValueError:
+            pass  # No rule fires for this row
+    return time.perf_counter() - start
+
+
+def time_batch(fuzzy, scale, risk, priority, repeat=3):
+    """Best-of-N seconds for one calculate_approval_scores call"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fuzzy.calculate_approval_scores(scale, risk, priority)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def max_error(fuzzy, n=2000):
+    """Largest |batch - scalar| difference over random rows"""
+    scale, risk, priority = random_inputs(n, seed=1)
+    batch = fuzzy.calculate_approval_scores(scale, risk, priority)
+    worst = 0.0
+    for s, r, p, b in zip(scale, risk, priority, batch):
+        try:
+            exact = fuzzy.reference_approval_score(s, r, p)
+        except ValueError:
+            exact = np.nan
+        if np.isnan(exact) or np.isnan(b):
+            if not (np.isnan(exact) and np.isnan(b)):
+                return float('inf')
+            continue
+        worst = max(worst, abs(exact - b))
+    return worst
+
+
+def main():
+    fuzzy = UMKMFuzzyLogic()
+
+    print("Batch scoring benchmark")
+    print("=" * 60)
+    print(f"{'rows':>10} {'scalar us/row':>16} {'batch us/row':>16} {'speedup':>10}")
+
+    for n in (1, 1000, 1000000):
+        scale, risk, priority = random_inputs(n)
+        batch = time_batch(fuzzy, scale, risk, priority, repeat=1 if n >= 1000000 else 3)
+
+        # The scalar path is far too slow for a million rows; extrapolate from 1k
+        sample = min(n, 1000)
+        scalar = time_scalar(fuzzy, scale[:sample], risk[:sample], priority[:sample]) / sample * n
+
+        print(f"{n:>10} {scalar / n * 1e6:>16.2f} {batch / n * 1e6:>16.2f} {scalar / batch:>9.1f}x")
+
+    error = max_error(fuzzy)
+    print("=" * 60)
+    print(f"Max |batch - scalar| over 2000 random rows: {error:.2e} (tolerance {SKFUZZY_TOLERANCE:.0e})")
+    return 0 if error <= SKFUZZY_TOLERANCE else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
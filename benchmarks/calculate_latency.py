@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Benchmark: /api/calculate latency as the rule base grows
+
+Rule bases with 3 to 15 terms per input (27 to 3,375 rules, one per term
+combination) are loaded into the app with a compiled surface. Each request
+is uncached; the default request (score from the surface) is timed against
+one that asks for the rule-by-rule analysis (an exact inference pass).
+"""
+
+import itertools
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+TERMS_PER_INPUT = (3, 5, 9, 15)
+OUTPUT_TERMS = ['sangat_rendah', 'rendah', 'sedang', 'tinggi', 'sangat_tinggi']
+SURFACE_RESOLUTION = 51
+REQUESTS = 300
+
+
+def definition(terms_per_input):
+    """Model definition with evenly spaced triangles and a rule for every term combination"""
+    peaks = np.linspace(0, 100, terms_per_input)
+    width = peaks[1] - peaks[0]
+    terms = {f"t{i}": [round(max(peak - width, 0), 3), round(peak, 3), round(min(peak + width, 100), 3)]
+             for i, peak in enumerate(peaks)}
+    inputs = ['business_scale', 'risk_level', 'usage_priority']
+    rules = []
+    for scale, risk, priority in itertools.product(range(terms_per_input), repeat=3):
+        # Larger business, lower risk and higher priority lean towards approval
+        level = (scale + (terms_per_input - 1 - risk) + priority) / (3 * (terms_per_input - 1))
+        rules.append({'if': dict(zip(inputs, (f"t{scale}", f"t{risk}", f"t{priority}"))),
+                      'then': OUTPUT_TERMS[min(int(level * len(OUTPUT_TERMS)), len(OUTPUT_TERMS) - 1)]})
+    return {
+        'universe': {'min': 0, 'max': 100, 'step': 1},
+        'inputs': [{'name': name, 'terms': terms} for name in inputs],
+        'output': {'name': 'approval_score', 'terms': {
+            'sangat_rendah': [0, 0, 20], 'rendah': [10, 30, 50], 'sedang': [40, 60, 80],
+            'tinggi': [70, 90, 100], 'sangat_tinggi': [90, 100, 100]}},
+        'rules': rules,
+    }
+
+
+def request_times(client, fuzzy, applications, fields):
+    """Microseconds of each uncached request"""
+    times = []
+    for application in itertools.islice(itertools.cycle(applications), REQUESTS):
+        fuzzy.cache.clear()
+        start = time.perf_counter()
+        response = client.post('/api/calculate', json=dict(application, fields=fields) if fields else application)
+        times.append((time.perf_counter() - start) * 1e6)
+        assert response.status_code == 200, response.get_json()
+    return times
+
+
+def main():
+    import app as app_module
+    from fuzzy_logic import UMKMFuzzyLogic
+
+    client = app_module.app.test_client()
+    processor = app_module.data_processor
+    applications = [{'business_field': field, 'scale': scale, 'usage_type': usage}
+                    for field, scale, usage in itertools.product(processor.get_all_business_fields(),
+                                                                 processor.get_all_scales(),
+                                                                 processor.get_all_usage_types())]
+    previous = app_module.fuzzy_logic
+
+    print(f"/api/calculate latency, {REQUESTS} uncached requests, surface resolution {SURFACE_RESOLUTION}")
+    print("=" * 66)
+    print(f"{'terms':>5} {'rules':>6} {'default p50 us':>15} {'p99 us':>8} {'analysis p50 us':>16} {'p99 us':>8}")
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            for terms_per_input in TERMS_PER_INPUT:
+                path = os.path.join(tmp, f"model_{terms_per_input}.json")
+                with open(path, 'w') as f:
+                    json.dump(definition(terms_per_input), f)
+                fuzzy = UMKMFuzzyLogic(inference_only=True, model_path=path)
+                fuzzy.compile_surface(resolution=SURFACE_RESOLUTION)
+                app_module.fuzzy_logic = fuzzy
+
+                default = request_times(client, fuzzy, applications, None)
+                analysis = request_times(client, fuzzy, applications, ['approval_score', 'analysis'])
+                print(f"{terms_per_input:>5} {fuzzy.engine.n_rules:>6} {statistics.median(default):>15.0f} "
+                      f"{np.percentile(default, 99):>8.0f} {statistics.median(analysis):>16.0f} "
+                      f"{np.percentile(analysis, 99):>8.0f}")
+    finally:
+        app_module.fuzzy_logic = previous
+    print("=" * 66)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Benchmark: UMKMDataProcessor.process_data on large synthetic BPS files
+
+Compares the single-pass csv parser with the previous pandas
+iterrows()/iloc implementation and checks both produce identical dicts.
+"""
+
+import sys
+import os
+import random
+import tempfile
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+from data_processor import UMKMDataProcessor
+
+
+def legacy_process_data(csv_file):
+    """The previous process_data; returns (business_fields, usage_types, scales)"""
+    data = pd.read_csv(csv_file, header=None, skiprows=2)
+    business_fields, usage_types, scales = {}, {}, {}
+    lapangan_usaha_start = jenis_penggunaan_start = skala_usaha_start = None
+
+    for idx, row in data.iterrows():
+        if pd.notna(row[0]) and 'Lapangan Usaha' in str(row[0]):
+            lapangan_usaha_start = idx + 1
+        elif pd.notna(row[0]) and 'Jenis Penggunaan' in str(row[0]):
+            jenis_penggunaan_start = idx + 1
+        elif pd.notna(row[0]) and 'Skala Usaha' in str(row[0]):
+            skala_usaha_start = idx + 1
+
+    sections = [
+        (lapangan_usaha_start, business_fields, lambda name: name.strip('"'), 'Jenis Penggunaan'),
+        (jenis_penggunaan_start, usage_types, str.strip, 'Skala Usaha'),
+        (skala_usaha_start, scales, str.strip, None),
+    ]
+    for start, values, clean, next_header in sections:
+        if not start:
+            continue
+        for idx in range(start, len(data)):
+            if pd.notna(data.iloc[idx, 0]) and pd.notna(data.iloc[idx, 1]):
+                amount = data.iloc[idx, 1]
+                if amount != '-' and pd.notna(amount):
+                    values[clean(data.iloc[idx, 0])] = int(amount)
+            elif next_header and pd.notna(data.iloc[idx, 0]) and next_header in str(data.iloc[idx, 0]):
+                break
+    return business_fields, usage_types, scales
+
+
+def write_synthetic(path, rows, seed=0):
+    """BPS-shaped file: title lines, then sections with ``rows`` rows in total"""
+    rng = random.Random(seed)
+    fields = rows - 12
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('\ufeffUMKM,\n,"Posisi Kredit UMKM pada Bank Umum (Milyar Rupiah)"\n,2023\n')
+        f.write(f'UMKM,{rows * 1000}\n')
+        f.write(f'Lapangan Usaha,{rows * 1000}\n')
+        for i in range(fields):
+            amount = '-' if rng.random() < 0.01 else rng.randint(1, 10 ** 6)
+            f.write(f'"Lapangan {i}, sektor {i % 97}",{amount}\n')
+        f.write('Bukan Lapangan Usaha Lainnya,-\n')
+        f.write('Jenis Penggunaan,1457132\nModal Kerja,1053972\nInvestasi,403160\n  Tidak Teridentifikasi,-\n')
+        f.write(' Skala Usaha,1457132\n Mikro,662293\nKecil,460773\nMenengah,334066\n')
+
+
+def edge_case_files(directory):
+    """Small files exercising the parser's corner cases"""
+    cases = {
+        'no_sections.csv': 'a,b\nc,d\nx,1\ny,2\n',
+        'headers_without_amount.csv': (
+            't\nt\nLapangan Usaha,\nA,1\nB,-\nJenis Penggunaan,\nModal Kerja, 5\n'
+            'Skala Usaha,\n Mikro ,3\n\n,\n  \nKecil,NA\nMenengah,4\n'),
+        'float_column.csv': 't\nt\nLapangan Usaha,10\nA,1.5\nB,2\nJenis Penggunaan,\nC,3\n',
+        'quoted.csv': 't\nt\nLapangan Usaha,9\n"""Q"" field",4\n"Comma, inside",5\nSkala Usaha,1\nMikro,1\n',
+    }
+    for name, content in cases.items():
+        path = os.path.join(directory, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        yield path
+
+
+def parse(csv_file):
+    processor = UMKMDataProcessor(csv_file)
+    return processor.business_fields, processor.usage_types, processor.scales
+
+
+def main():
+    bundled = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                           'Posisi Kredit Usaha Mikro, Kecil, dan Menengah (UMKM) pada Bank Umum__, 2023.csv')
+    identical = parse(bundled) == legacy_process_data(bundled)
+
+    print("Data ingestion benchmark")
+    print("=" * 60)
+    print(f"{'rows':>10} {'legacy s':>12} {'csv s':>12} {'speedup':>10}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for path in edge_case_files(tmp):
+            identical &= parse(path) == legacy_process_data(path)
+
+        for rows in (10000, 100000, 1000000):
+            path = os.path.join(tmp, f'synthetic_{rows}.csv')
+            write_synthetic(path, rows)
+
+            start = time.perf_counter()
+            result = parse(path)
+            fast = time.perf_counter() - start
+
+            # iterrows() over a million rows takes minutes; extrapolate from 100k
+            sample = min(rows, 100000)
+            if sample < rows:
+                sample_path = os.path.join(tmp, f'synthetic_{sample}.csv')
+                start = time.perf_counter()
+                legacy_process_data(sample_path)
+                legacy = (time.perf_counter() - start) / sample * rows
+            else:
+                start = time.perf_counter()
+                identical &= result == legacy_process_data(path)
+                legacy = time.perf_counter() - start
+
+            print(f"{rows:>10} {legacy:>12.2f} {fast:>12.2f} {legacy / fast:>9.1f}x")
+
+    print("=" * 60)
+    print(f"Identical to legacy parser: {'yes' if identical else 'NO'}")
+    return 0 if identical else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
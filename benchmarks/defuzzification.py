@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Benchmark: sampled vs. analytic output sets across universe resolutions
+
+The analytic output set is built from the output triangles and is exact, so
+it serves as ground truth for the precision of the sampled set at each step.
+Also times every defuzzifier on the analytic set.
+"""
+
+import copy
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from fuzzy_engine import DEFUZZIFIERS
+from fuzzy_logic import UMKMFuzzyLogic
+from fuzzy_model import compile_definition
+
+ROWS = 20000
+STEPS = (1, 0.5, 0.1, 0.05)
+
+
+def engine(step, method='centroid', output_set='sampled'):
+    """Engine of the built-in model with every universe sampled at ``step``"""
+    definition = copy.deepcopy(UMKMFuzzyLogic.default_definition())
+    for spec in definition['inputs'] + [definition['output']]:
+        spec['universe'] = {'min': 0.0, 'max': 100.0, 'step': float(step)}
+    definition['defuzzification'] = {'method': method, 'output_set': output_set}
+    return compile_definition(definition).engine
+
+
+def time_evaluate(engine, inputs, repeat=3):
+    """Best-of-N microseconds per row of one evaluate() call"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        engine.evaluate(*inputs)
+        best = min(best, time.perf_counter() - start)
+    return best / len(inputs[0]) * 1e6
+
+
+def main():
+    inputs = np.random.default_rng(0).uniform(0, 100, size=(3, ROWS))
+    exact = engine(1, output_set='analytic').evaluate(*inputs)
+    covered = ~np.isnan(exact)
+
+    print(f"Defuzzification benchmark ({ROWS:,} random rows, {covered.mean():.0%} covered by a rule)")
+    print("=" * 70)
+    print(f"{'step':>6} {'points':>8} {'sampled us/row':>16} {'analytic us/row':>17} {'max sampled error':>19}")
+    consistent = True
+    for step in STEPS:
+        sampled, analytic = engine(step), engine(step, output_set='analytic')
+        scores = sampled.evaluate(*inputs)
+        consistent &= bool(np.array_equal(np.isnan(scores), ~covered))
+        consistent &= bool(np.allclose(analytic.evaluate(*inputs), exact, equal_nan=True, atol=1e-9))
+        error = np.abs(scores - exact)[covered].max()
+        print(f"{step:>6} {len(sampled.output_universe):>8} {time_evaluate(sampled, inputs):>16.2f} "
+              f"{time_evaluate(analytic, inputs):>17.2f} {error:>19.2e}")
+
+    print("=" * 70)
+    print(f"{'defuzzifier':>12} {'analytic us/row':>17} {'max |sampled - analytic|':>26}  (step 1)")
+    for method in DEFUZZIFIERS:
+        analytic = engine(1, method, 'analytic')
+        difference = np.abs(engine(1, method).evaluate(*inputs) - analytic.evaluate(*inputs))[covered].max()
+        print(f"{method:>12} {time_evaluate(analytic, inputs):>17.2f} {difference:>26.2e}")
+    print("=" * 70)
+    print(f"Analytic result independent of the step: {'yes' if consistent else 'NO'}")
+    return 0 if consistent else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Load test: throughput and tail latency of /api/calculate under concurrent clients
+
+Starts the app locally as the threaded WSGI server (what ``python app.py``
+runs) and under uvicorn through asgi.py, then drives each with the same
+closed-loop clients. Use --url to test a deployment that is already running.
+
+The cpu column is the CPU time of the server processes divided by the run
+time. Scoring holds the GIL, so one process stays near 1.0 however many
+threads it has; --processes runs the ASGI server with that many processes.
+"""
+
+import argparse
+import http.client
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from urllib.parse import urlsplit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+import numpy as np
+
+SERVERS = {
+    'wsgi': "from werkzeug.serving import run_simple; from app import app; "
+            "run_simple('127.0.0.1', {port}, app, threaded=True)",
+    'asgi': "import sys, asgi; sys.exit(asgi.main(['--port', '{port}', '--workers', '{workers}', "
+            "'--queue', '{queue}', '--processes', '{processes}']))",
+}
+
+
+def applications(n, seed=0):
+    """Request bodies for /api/calculate with random valid inputs that some rule scores"""
+    from app import data_processor, fuzzy_logic, resolve_application
+    rng = np.random.default_rng(seed)
+    fields = data_processor.get_all_business_fields()
+    usages = data_processor.get_all_usage_types()
+    scales = data_processor.get_all_scales()
+    bodies = []
+    while len(bodies) < n:
+        data = {
+            'business_field': fields[rng.integers(len(fields))],
+            'usage_type': usages[rng.integers(len(usages))],
+            'scale': scales[rng.integers(len(scales))],
+            'fields': ['approval_score', 'approval_category'],
+        }
+        application, _ = resolve_application(data)
+        score = fuzzy_logic.engine.evaluate(application['scale_value'], application['risk_value'],
+                                            application['priority_value'])
+        if np.isfinite(score).all():
+            bodies.append(json.dumps(data).encode())
+    return bodies
+
+
+def client(url, bodies, deadline, results, offset):
+    """One closed-loop client on a keep-alive connection, appending (status, seconds) to results"""
+    parts = urlsplit(url)
+    connection = http.client.HTTPConnection(parts.hostname, parts.port, timeout=30)
+    path = parts.path.rstrip('/') + '/api/calculate'
+    i = offset
+    while time.perf_counter() < deadline:
+        body = bodies[i % len(bodies)]
+        i += 1
+        start = time.perf_counter()
+        try:
+            connection.request('POST', path, body, {'Content-Type': 'application/json'})
+            response = connection.getresponse()
+            response.read()
+            status = response.status
+            if response.getheader('Connection', '').lower() == 'close':
+                connection.close()
+            if status == 503:
+                # Back off as asked, like a well-behaved client; the time still counts against throughput
+                time.sleep(float(response.getheader('Retry-After', 1)))
+        except (OSError, http.client.HTTPException):
+            status = 0
+            connection.close()
+        results.append((status, time.perf_counter() - start))
+    connection.close()
+
+
+def cpu_seconds(pid):
+    """CPU time of process ``pid`` and its descendants; None where /proc is not available"""
+    try:
+        stats = {}
+        for entry in os.listdir('/proc'):
+            if entry.isdigit():
+                try:
+                    with open(f"/proc/{entry}/stat") as f:
+                        # Fields after the parenthesised command name: state ppid ... utime stime
+                        fields = f.read().rsplit(')', 1)[1].split()
+                except OSError:
+                    continue  # Exited meanwhile
+                stats[int(entry)] = (int(fields[1]), int(fields[11]) + int(fields[12]))
+    except OSError:
+        return None
+    tree, size = {pid}, 0
+    while len(tree) > size:
+        size = len(tree)
+        tree |= {child for child, (parent, _) in stats.items() if parent in tree}
+    return sum(stats[member][1] for member in tree if member in stats) / os.sysconf('SC_CLK_TCK')
+
+
+def run(url, concurrency, duration, bodies, pid=None):
+    """Summary of ``concurrency`` clients posting for ``duration`` seconds"""
+    results = []
+    cpu_start = cpu_seconds(pid) if pid else None
+    deadline = time.perf_counter() + duration
+    threads = [threading.Thread(target=client, args=(url, bodies, deadline, results, i * 7919))
+               for i in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    cpu_end = cpu_seconds(pid) if pid else None
+
+    statuses = np.array([status for status, _ in results])
+    latencies = np.array([seconds for status, seconds in results if status == 200]) * 1000
+    summary = {
+        'requests': len(results),
+        'ok_per_second': len(latencies) / elapsed,
+        'rejected': int(np.sum(statuses == 503)),
+        'errors': int(np.sum((statuses != 200) & (statuses != 503))),
+        'cpu': (cpu_end - cpu_start) / elapsed if cpu_start is not None and cpu_end is not None else float('nan'),
+    }
+    for name, q in (('p50', 50), ('p95', 95), ('p99', 99), ('max', 100)):
+        summary[name] = float(np.percentile(latencies, q)) if latencies.size else float('nan')
+    return summary
+
+
+def wait_until_up(url, timeout=60):
+    parts = urlsplit(url)
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            connection = http.client.HTTPConnection(parts.hostname, parts.port, timeout=5)
+            connection.request('GET', '/api/get_options')
+            connection.getresponse().read()
+            connection.close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Server at {url} did not come up within {timeout}s")
+
+
+def start_server(kind, port, workers, queue, processes):
+    code = SERVERS[kind].format(port=port, workers=workers, queue=queue, processes=processes)
+    process = subprocess.Popen([sys.executable, '-c', code], cwd=ROOT,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return process
+
+
+def print_row(label, concurrency, summary):
+    print(f"{label:<6}{concurrency:>6}{summary['requests']:>9}{summary['ok_per_second']:>10.0f}"
+          f"{summary['p50']:>9.1f}{summary['p95']:>9.1f}{summary['p99']:>9.1f}{summary['max']:>9.1f}"
+          f"{summary['rejected']:>8}{summary['errors']:>8}{summary['cpu']:>6.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--url', help="Test this running deployment instead of starting servers")
+    parser.add_argument('--servers', default='wsgi,asgi', help="Local servers to compare (default wsgi,asgi)")
+    parser.add_argument('--concurrency', default='8,32,128', help="Comma-separated client counts")
+    parser.add_argument('--duration', type=float, default=5.0, help="Seconds per run")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--workers', type=int, default=4, help="ASGI worker threads per process")
+    parser.add_argument('--processes', type=int, default=1, help="ASGI server processes")
+    parser.add_argument('--queue', type=int, default=32, help="ASGI queue depth before 503")
+    args = parser.parse_args()
+
+    concurrencies = [int(c) for c in args.concurrency.split(',')]
+    bodies = applications(500)
+
+    print(f"{args.duration:g}s closed-loop runs of POST /api/calculate, latency of 200 responses in ms")
+    print(f"{'':<6}{'conc':>6}{'requests':>9}{'ok/s':>10}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}"
+          f"{'503':>8}{'errors':>8}{'cpu':>6}")
+    if args.url:
+        wait_until_up(args.url)
+        for concurrency in concurrencies:
+            print_row('url', concurrency, run(args.url, concurrency, args.duration, bodies))
+        return
+
+    for kind in args.servers.split(','):
+        if kind == 'asgi' and importlib.util.find_spec('uvicorn') is None:
+            print("asgi  skipped: uvicorn is not installed")
+            continue
+        process = start_server(kind, args.port, args.workers, args.queue, args.processes)
+        url = f"http://127.0.0.1:{args.port}"
+        try:
+            wait_until_up(url)
+            run(url, 4, 1.0, bodies)  # Warm-up: caches, lazy imports
+            for concurrency in concurrencies:
+                print_row(kind, concurrency, run(url, concurrency, args.duration, bodies, process.pid))
+        finally:
+            process.terminate()
+            process.wait(timeout=60)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite: per-stage latency percentiles and memory peaks of the scoring pipeline
+
+Each stage is timed separately. Results can be written as JSON and compared
+against a stored baseline; stages that got slower (or use more memory) than
+the baseline by more than --threshold are flagged and the exit code is 1.
+
+    python benchmarks/pipeline.py --output results.json
+    python benchmarks/pipeline.py --save-baseline
+    python benchmarks/pipeline.py --baseline benchmarks/baseline.json
+"""
+
+import argparse
+import itertools
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+import numpy as np
+
+from data_processor import UMKMDataProcessor
+from fuzzy_logic import UMKMFuzzyLogic
+
+CSV_FILE = os.path.join(ROOT, 'Posisi Kredit Usaha Mikro, Kecil, dan Menengah (UMKM) pada Bank Umum__, 2023.csv')
+DEFAULT_BASELINE = os.path.join(ROOT, 'benchmarks', 'baseline.json')
+
+# Differences below these are noise, whatever the ratio
+MIN_TIME_DELTA_MS = 0.1
+MIN_MEMORY_DELTA_KIB = 64
+
+
+def build_stages():
+    """(name, function, setup, share of --repeat) for every stage; setup runs untimed before each call"""
+    import app as app_module
+
+    client = app_module.app.test_client()
+    fuzzy = UMKMFuzzyLogic()
+    fuzzy.load_control_system()
+
+    # Inputs the web form can produce and the rule base covers
+    processor = UMKMDataProcessor(CSV_FILE)
+    inputs = []
+    for scale, field, usage in itertools.product(processor.get_all_scales(), processor.get_all_business_fields(),
+                                                 processor.get_all_usage_types()):
+        values = (fuzzy.scale_to_fuzzy_value(processor.get_scale_level(scale)),
+                  fuzzy.risk_to_fuzzy_value(processor.get_business_field_risk(field)),
+                  fuzzy.priority_to_fuzzy_value(processor.get_usage_priority(usage)))
+        if not np.isnan(fuzzy.calculate_approval_scores(*values)[0]):
+            inputs.append((values, {'business_field': field, 'scale': scale, 'usage_type': usage}))
+    cycle = itertools.cycle(inputs)
+    current = {}
+
+    def next_input():
+        current['values'], current['application'] = next(cycle)
+
+    def next_uncached_input():
+        next_input()
+        fuzzy.cache.clear()
+        fuzzy.image_cache.clear()
+        app_module.fuzzy_logic.cache.clear()
+
+    def detailed_analysis():
+        values = current['values']
+        fuzzy.get_detailed_analysis(*values, fuzzy.calculate_approval_score(*values))
+
+    def visualization():
+        values = current['values']
+        fuzzy.generate_fuzzy_visualization(*values, fuzzy.calculate_approval_score(*values))
+
+    def api_calculate():
+        response = client.post('/api/calculate', json=current['application'])
+        assert response.status_code == 200, response.get_json()
+
+    return [
+        ('data_processor_csv', lambda: UMKMDataProcessor(CSV_FILE, snapshot_path=False), None, 0.2),
+        ('data_processor_snapshot', lambda: UMKMDataProcessor(CSV_FILE), None, 0.2),
+        ('fuzzy_logic_init', UMKMFuzzyLogic, None, 0.2),
+        ('control_system_init', lambda: UMKMFuzzyLogic().load_control_system(), None, 0.1),
+        ('calculate_approval_score', lambda: fuzzy.calculate_approval_score(*current['values']), next_input, 1.0),
+        ('get_detailed_analysis', detailed_analysis, next_input, 1.0),
+        ('generate_fuzzy_visualization', visualization, next_uncached_input, 0.2),
+        ('api_calculate', api_calculate, next_uncached_input, 0.5),
+        ('api_calculate_cached', api_calculate, next_input, 1.0),
+    ]
+
+
+def time_stage(func, setup, repeat, warmup=2):
+    """Wall time in milliseconds of ``repeat`` calls, after ``warmup`` untimed calls"""
+    samples = []
+    for i in range(warmup + repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        if i >= warmup:
+            samples.append(elapsed * 1000)
+    return np.array(samples)
+
+
+def peak_memory(func, setup, repeat=3):
+    """Largest tracemalloc peak, in KiB, over a few calls"""
+    peak = 0
+    tracemalloc.start()
+    try:
+        for _ in range(repeat):
+            if setup:
+                setup()
+            tracemalloc.reset_peak()
+            baseline, _ = tracemalloc.get_traced_memory()
+            func()
+            peak = max(peak, tracemalloc.get_traced_memory()[1] - baseline)
+    finally:
+        tracemalloc.stop()
+    return peak / 1024
+
+
+def run_suite(repeat=50, only=None, progress=None):
+    """Run every stage (or those named in ``only``); returns the JSON-serialisable results"""
+    stages = {}
+    for name, func, setup, share in build_stages():
+        if only and name not in only:
+            continue
+        samples = time_stage(func, setup, max(2, int(repeat * share)))
+        stages[name] = {
+            'n': len(samples),
+            'mean_ms': float(samples.mean()),
+            'min_ms': float(samples.min()),
+            'p50_ms': float(np.percentile(samples, 50)),
+            'p90_ms': float(np.percentile(samples, 90)),
+            'p99_ms': float(np.percentile(samples, 99)),
+            'max_ms': float(samples.max()),
+            'peak_memory_kib': float(peak_memory(func, setup)),
+        }
+        if progress:
+            progress(name, stages[name])
+    return {'meta': environment(), 'stages': stages}
+
+
+def environment():
+    """Where and on what the results were measured"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                                text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        'timestamp': datetime.now().isoformat(),
+        'commit': commit,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'processor': platform.processor() or platform.machine(),
+    }
+
+
+def compare(results, baseline, threshold=0.2):
+    """Stages slower or hungrier than the baseline by more than ``threshold``
+
+    Returns a list of (stage, metric, baseline value, current value).
+    """
+    regressions = []
+    for name, current in results['stages'].items():
+        previous = baseline.get('stages', {}).get(name)
+        if previous is None:
+            continue
+        for metric, min_delta in (('p50_ms', MIN_TIME_DELTA_MS), ('p90_ms', MIN_TIME_DELTA_MS),
+                                  ('peak_memory_kib', MIN_MEMORY_DELTA_KIB)):
+            old, new = previous[metric], current[metric]
+            if new > old * (1 + threshold) and new - old > min_delta:
+                regressions.append((name, metric, old, new))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time each stage of the scoring pipeline")
+    parser.add_argument('--repeat', type=int, default=50, help="Timed calls for the fast stages (default 50)")
+    parser.add_argument('--stage', action='append', help="Only run this stage (repeatable)")
+    parser.add_argument('--output', help="Write the results to this JSON file")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="Baseline JSON to compare against")
+    parser.add_argument('--save-baseline', action='store_true', help="Store the results as the new baseline")
+    parser.add_argument('--threshold', type=float, default=0.2, help="Allowed slowdown ratio (default 0.2)")
+    args = parser.parse_args(argv)
+
+    print("Pipeline benchmark")
+    print("=" * 88)
+    print(f"{'stage':<30} {'n':>4} {'p50 ms':>10} {'p90 ms':>10} {'p99 ms':>10} {'max ms':>10} {'peak KiB':>10}")
+
+    def progress(name, stage):
+        print(f"{name:<30} {stage['n']:>4} {stage['p50_ms']:>10.3f} {stage['p90_ms']:>10.3f} "
+              f"{stage['p99_ms']:>10.3f} {stage['max_ms']:>10.3f} {stage['peak_memory_kib']:>10.1f}")
+
+    results = run_suite(args.repeat, args.stage, progress)
+    print("=" * 88)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    status = 0
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        print(f"Compared with baseline from {baseline['meta'].get('timestamp')} "
+              f"(commit {baseline['meta'].get('commit')}, threshold {args.threshold:.0%})")
+        for name, metric, old, new in regressions:
+            print(f"  REGRESSION {name} {metric}: {old:.3f} -> {new:.3f} ({new / old - 1:+.0%})")
+        if not regressions:
+            print("  No regressions")
+        status = 1 if regressions else 0
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Benchmark: large rule bases with and without rule pruning
+
+Rule bases of a few hundred rules over 3 to 5 inputs of 5 terms each: one
+rule per combination of three inputs' terms plus general two-input rules,
+repeated and more specific copies of some rules (which redundant_rules()
+finds). Compares engines compiled with prune=False and prune=True on single
+rows (the /api/calculate path) and on a batch of random rows, and checks
+that the scores are identical.
+"""
+
+import itertools
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from fuzzy_engine import trimf
+from fuzzy_model import compile_model
+
+TERMS = {'t0': [0, 0, 25], 't1': [0, 25, 50], 't2': [25, 50, 75], 't3': [50, 75, 100], 't4': [75, 100, 100]}
+OUTPUT = {'rendah': [0, 0, 50], 'sedang': [25, 50, 75], 'tinggi': [50, 100, 100]}
+INPUTS = (3, 4, 5)
+SINGLE_ROWS = 500
+BATCH_ROWS = 100000
+
+
+def rule_base(inputs, rng):
+    """Variables and rules in compile_model()'s format; about a fifth of the rules are redundant"""
+    universe = np.arange(0, 101, 1.0)
+    variables = [(f"x{i}", universe, {term: trimf(universe, abc) for term, abc in TERMS.items()})
+                 for i in range(inputs)]
+    variables.append(('y', universe, {term: trimf(universe, abc) for term, abc in OUTPUT.items()}))
+    outputs, terms = list(OUTPUT), list(TERMS)
+
+    rules = []
+    for used in itertools.combinations(range(inputs), 2):
+        for combination in itertools.product(terms, repeat=2):
+            antecedent = [None] * inputs
+            for i, term in zip(used, combination):
+                antecedent[i] = term
+            rules.append([antecedent, outputs[rng.integers(len(outputs))], 1.0])
+    for combination in itertools.product(terms, repeat=3):
+        rules.append([list(combination) + [None] * (inputs - 3), outputs[rng.integers(len(outputs))], 0.8])
+    # Repeats, and copies with an extra term and a lower weight
+    for index in rng.choice(len(rules), size=len(rules) // 5, replace=False):
+        antecedent, consequent, weight = rules[index]
+        antecedent = list(antecedent)
+        if rng.random() < 0.5:
+            free = [i for i, term in enumerate(antecedent) if term is None]
+            if free:
+                antecedent[free[0]] = terms[rng.integers(len(terms))]
+                weight = weight / 2
+        rules.append([antecedent, consequent, weight])
+    return variables, [(rule_id, *rule) for rule_id, rule in enumerate(rules, start=1)]
+
+
+def best_of(function, repeat=3):
+    """Best-of-N seconds of one call"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    rng = np.random.default_rng(0)
+
+    print(f"Rule pruning benchmark ({SINGLE_ROWS} single rows, batch of {BATCH_ROWS:,} rows)")
+    print("=" * 78)
+    print(f"{'inputs':>6} {'rules':>6} {'scoring':>8} {'single us':>10} {'pruned us':>10} "
+          f"{'batch s':>8} {'pruned s':>9} {'identical':>10}")
+    identical = True
+    for inputs in INPUTS:
+        variables, rules = rule_base(inputs, rng)
+        full = compile_model(variables, rules, prune=False).engine
+        pruned = compile_model(variables, rules).engine
+        singles = rng.uniform(0, 100, size=(SINGLE_ROWS, inputs))
+        batch = rng.uniform(0, 100, size=(inputs, BATCH_ROWS))
+
+        single_full = best_of(lambda: [full.evaluate(*row) for row in singles]) / SINGLE_ROWS
+        single_pruned = best_of(lambda: [pruned.evaluate(*row) for row in singles]) / SINGLE_ROWS
+        batch_full = best_of(lambda: full.evaluate(*batch))
+        batch_pruned = best_of(lambda: pruned.evaluate(*batch))
+        same = (np.array_equal(full.evaluate(*batch), pruned.evaluate(*batch), equal_nan=True)
+                and np.array_equal(full.evaluate(*singles.T), pruned.evaluate(*singles.T), equal_nan=True))
+        identical &= bool(same)
+        print(f"{inputs:>6} {full.n_rules:>6} {len(pruned.scoring_rules):>8} {single_full * 1e6:>10.0f} "
+              f"{single_pruned * 1e6:>10.0f} {batch_full:>8.3f} {batch_pruned:>9.3f} {'yes' if same else 'NO':>10}")
+    print("=" * 78)
+    return 0 if identical else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Benchmark: cold-start time of UMKMDataProcessor from the CSV vs. its snapshot
+
+Each measurement is a fresh interpreter, as on a serverless cold start.
+"""
+
+import sys
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+from data_ingestion import write_synthetic
+
+BUNDLED_CSV = os.path.join(ROOT, 'Posisi Kredit Usaha Mikro, Kecil, dan Menengah (UMKM) pada Bank Umum__, 2023.csv')
+
+STARTUP = """
+import sys
+from data_processor import UMKMDataProcessor
+processor = UMKMDataProcessor(sys.argv[1], snapshot_path=sys.argv[2] if sys.argv[2] != '-' else False)
+assert processor.from_snapshot == (sys.argv[2] != '-')
+print('pandas' in sys.modules)
+"""
+
+
+def cold_start(csv_file, snapshot_path, repeat=5):
+    """Best-of-N wall time of a new interpreter loading the data; and whether pandas was imported"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output = subprocess.run([sys.executable, '-c', STARTUP, csv_file, snapshot_path or '-'],
+                                cwd=ROOT, check=True, capture_output=True, text=True).stdout
+        best = min(best, time.perf_counter() - start)
+    return best, output.strip() == 'True'
+
+
+def main():
+    print("Startup benchmark (fresh interpreter per run, best of 5)")
+    print("=" * 82)
+    print(f"{'file':>14} {'csv ms':>10} {'snapshot ms':>13} {'rehash ms':>11} {'speedup':>9} {'pandas':>8}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        bundled = os.path.join(tmp, 'bundled_2023.csv')
+        shutil.copyfile(BUNDLED_CSV, bundled)
+        synthetic = os.path.join(tmp, 'synthetic_1000000.csv')
+        write_synthetic(synthetic, 1000000)
+
+        for label, csv_file in (('bundled 2023', bundled), ('synthetic 1M', synthetic)):
+            snapshot = os.path.join(tmp, os.path.basename(csv_file) + '.snapshot')
+            subprocess.run([sys.executable, '-c',
+                            'import sys; from data_processor import UMKMDataProcessor; '
+                            'UMKMDataProcessor(sys.argv[1], sys.argv[2]).save_snapshot()',
+                            csv_file, snapshot], cwd=ROOT, check=True)
+
+            from_csv, _ = cold_start(csv_file, None)
+            from_snapshot, pandas_imported = cold_start(csv_file, snapshot)
+
+            # A new mtime with unchanged content (fresh checkout) is validated by hash
+            os.utime(csv_file)
+            rehash, _ = cold_start(csv_file, snapshot)
+            print(f"{label:>14} {from_csv * 1000:>10.1f} {from_snapshot * 1000:>13.1f} {rehash * 1000:>11.1f} "
+                  f"{from_csv / from_snapshot:>8.1f}x {'yes' if pandas_imported else 'no':>8}")
+
+    print("=" * 82)
+    print("csv: parse the CSV; snapshot: size and mtime match; rehash: mtime changed, SHA-256 matches")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Benchmark: scoring N model variants separately vs. in one shared pass
+
+Variants of the built-in model differ in one rule weight each (the usual
+champion/challenger setup), plus one with other output terms. Compares N
+engine.evaluate() calls with one SharedEngine.evaluate() over the same rows
+and checks that the scores are identical.
+"""
+
+import copy
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from fuzzy_engine import SharedEngine
+from fuzzy_logic import UMKMFuzzyLogic
+from fuzzy_model import compile_definition
+
+ROWS = 100000
+COUNTS = (2, 4, 8)
+
+
+def variants(count):
+    """Built-in model, then variants with one rule weight halved each; the last also with other output terms"""
+    engines = []
+    for index in range(count):
+        definition = copy.deepcopy(UMKMFuzzyLogic.default_definition())
+        if index:
+            definition['rules'][index - 1]['weight'] = 0.5
+        if index == count - 1 and count > 2:
+            definition['output']['terms']['sedang'] = [35, 55, 75]
+        engines.append(compile_definition(definition).engine)
+    return engines
+
+
+def best_of(function, repeat=3):
+    """Best-of-N seconds of one call"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    inputs = np.random.default_rng(0).uniform(0, 100, size=(3, ROWS))
+
+    print(f"Model variant benchmark ({ROWS:,} random rows)")
+    print("=" * 70)
+    print(f"{'variants':>9} {'separate s':>11} {'shared s':>10} {'speedup':>8} {'antecedents':>12} {'identical':>10}")
+    identical = True
+    for count in COUNTS:
+        engines = variants(count)
+        shared = SharedEngine(engines)
+        separate_time = best_of(lambda: [engine.evaluate(*inputs) for engine in engines])
+        shared_time = best_of(lambda: shared.evaluate(*inputs))
+        same = np.array_equal(shared.evaluate(*inputs), np.stack([engine.evaluate(*inputs) for engine in engines]),
+                              equal_nan=True)
+        identical &= bool(same)
+        rules = sum(engine.n_rules for engine in engines)
+        print(f"{count:>9} {separate_time:>11.3f} {shared_time:>10.3f} {separate_time / shared_time:>7.1f}x "
+              f"{f'{shared.n_antecedents}/{rules}':>12} {'yes' if same else 'NO':>10}")
+    print("=" * 70)
+    return 0 if identical else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
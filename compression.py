@@ -0,0 +1,55 @@
+import gzip
+
+# Content types worth compressing; images and archives are already compressed
+COMPRESSIBLE_TYPES = ('application/json', 'application/javascript', 'image/svg+xml', 'text/')
+
+
+def install_compression(app, min_size=1024, gzip_level=6, brotli_quality=5):
+    """Compress responses of a Flask app with brotli or gzip, as the client accepts
+
+    Only complete (not streamed) responses of COMPRESSIBLE_TYPES with at
+    least ``min_size`` bytes are compressed. Brotli is used when the
+    ``brotli`` package is installed and the client prefers it at least as
+    much as gzip. Strong ETags become weak ones, since the compressed bytes
+    differ from the representation they were computed from; If-None-Match
+    still matches them because it compares weakly.
+    """
+    from flask import request
+
+    try:
+        import brotli
+    except ImportError:
+        brotli = None
+
+    @app.after_request
+    def compress_response(response):
+        response.vary.add('Accept-Encoding')
+        if (response.status_code != 200 or response.is_streamed or response.direct_passthrough
+                or 'Content-Encoding' in response.headers
+                or not response.mimetype.startswith(COMPRESSIBLE_TYPES)):
+            return response
+
+        data = response.get_data()
+        if len(data) < min_size:
+            return response
+        encoding = choose_encoding(request.accept_encodings, brotli is not None)
+        if encoding is None:
+            return response
+
+        if encoding == 'br':
+            response.set_data(brotli.compress(data, quality=brotli_quality))
+        else:
+            response.set_data(gzip.compress(data, compresslevel=gzip_level, mtime=0))
+        response.headers['Content-Encoding'] = encoding
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
+
+
+def choose_encoding(accept_encodings, brotli_available=False):
+    """'br', 'gzip' or None for a parsed Accept-Encoding header"""
+    gzip_quality = accept_encodings['gzip']
+    if brotli_available and accept_encodings['br'] and accept_encodings['br'] >= gzip_quality:
+        return 'br'
+    return 'gzip' if gzip_quality else None
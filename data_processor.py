@@ -1,89 +1,209 @@
-import pandas as pd
-import numpy as np
+import csv
+import hashlib
+import marshal
+import os
+import sys
+
+from features import FeatureTable
+
+# Cells pandas.read_csv treats as missing by default
+NA_VALUES = frozenset([
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+    '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null',
+])
+
+# Bumped whenever the parsed data or snapshot layout changes
+SNAPSHOT_VERSION = 2
+
+# Error of an application without a business field, scale or usage type
+MISSING_FIELDS_ERROR = 'Semua field harus diisi'
 
 class UMKMDataProcessor:
-    def __init__(self, csv_file):
+    def __init__(self, csv_file, snapshot_path=None, feature_mode='buckets', history=()):
+        """Load the parsed data from a snapshot when it matches the CSV, else parse the CSV
+        
+        ``snapshot_path`` defaults to ``csv_file + '.snapshot'``; pass False to
+        always parse the CSV. ``feature_mode`` and ``history`` (processors of
+        earlier periods, oldest first) shape the feature table, see features.py.
+        """
         self.csv_file = csv_file
-        self.data = None
-        self.process_data()
+        self.snapshot_path = csv_file + '.snapshot' if snapshot_path is None else snapshot_path
+        self.feature_mode = feature_mode
+        self.history = tuple(history)
+        self._data = None
+        self._aggregates = {}
+        self.from_snapshot = self.load_snapshot()
+        if not self.from_snapshot:
+            self.process_data()
+            self.save_snapshot()
+    
+    @property
+    def data(self):
+        """Raw CSV as a DataFrame, read on first access"""
+        if self._data is None:
+            import pandas as pd
+            self._data = pd.read_csv(self.csv_file, header=None, skiprows=2)
+        return self._data
     
     def process_data(self):
-        """Process the UMKM credit data from CSV"""
-        # Read CSV with proper handling
-        self.data = pd.read_csv(self.csv_file, header=None, skiprows=2)
+        """Process the UMKM credit data from CSV
         
-        # Extract relevant data
-        self.business_fields = {}
-        self.scales = {}
-        self.usage_types = {}
+        The file is scanned once with the csv module. Each section (business
+        fields, usage types, scales) starts after the last row mentioning its
+        header and, for the first two, ends at a header row without amount
+        for the next section.
+        """
+        names, amounts, starts, to_int = self._read_rows()
+        self._aggregates = {}
         
-        # Find the sections in the CSV
-        lapangan_usaha_start = None
-        jenis_penggunaan_start = None
-        skala_usaha_start = None
+        # Rows that end the business field and usage type sections
+        def section_end(start, next_header):
+            for idx in range(start, len(names)):
+                if amounts[idx] is None and names[idx] is not None and next_header in names[idx]:
+                    return idx
+            return len(names)
         
-        for idx, row in self.data.iterrows():
-            if pd.notna(row[0]) and 'Lapangan Usaha' in str(row[0]):
-                lapangan_usaha_start = idx + 1
-            elif pd.notna(row[0]) and 'Jenis Penggunaan' in str(row[0]):
-                jenis_penggunaan_start = idx + 1
-            elif pd.notna(row[0]) and 'Skala Usaha' in str(row[0]):
-                skala_usaha_start = idx + 1
+        def section(start, stop, clean):
+            values = {}
+            for idx in range(start, stop):
+                name, amount = names[idx], amounts[idx]
+                if name is not None and amount is not None and amount != '-':
+                    values[clean(name)] = to_int(amount)
+            return values
         
-        # Process business fields
-        if lapangan_usaha_start:
-            for idx in range(lapangan_usaha_start, len(self.data)):
-                if pd.notna(self.data.iloc[idx, 0]) and pd.notna(self.data.iloc[idx, 1]):
-                    field = self.data.iloc[idx, 0].strip('"')
-                    amount = self.data.iloc[idx, 1]
-                    if amount != '-' and pd.notna(amount):
-                        self.business_fields[field] = int(amount)
-                elif pd.notna(self.data.iloc[idx, 0]) and 'Jenis Penggunaan' in str(self.data.iloc[idx, 0]):
-                    break
+        lapangan_usaha_start = starts.get('Lapangan Usaha')
+        jenis_penggunaan_start = starts.get('Jenis Penggunaan')
+        skala_usaha_start = starts.get('Skala Usaha')
         
-        # Process usage types
+        self.business_fields = {}
+        self.usage_types = {}
+        self.scales = {}
+        if lapangan_usaha_start:
+            self.business_fields = section(lapangan_usaha_start,
+                                           section_end(lapangan_usaha_start, 'Jenis Penggunaan'),
+                                           lambda name: name.strip('"'))
         if jenis_penggunaan_start:
-            for idx in range(jenis_penggunaan_start, len(self.data)):
-                if pd.notna(self.data.iloc[idx, 0]) and pd.notna(self.data.iloc[idx, 1]):
-                    usage = self.data.iloc[idx, 0].strip()
-                    amount = self.data.iloc[idx, 1]
-                    if amount != '-' and pd.notna(amount):
-                        self.usage_types[usage] = int(amount)
-                elif pd.notna(self.data.iloc[idx, 0]) and 'Skala Usaha' in str(self.data.iloc[idx, 0]):
-                    break
-        
-        # Process business scales
+            self.usage_types = section(jenis_penggunaan_start,
+                                       section_end(jenis_penggunaan_start, 'Skala Usaha'), str.strip)
         if skala_usaha_start:
-            for idx in range(skala_usaha_start, len(self.data)):
-                if pd.notna(self.data.iloc[idx, 0]) and pd.notna(self.data.iloc[idx, 1]):
-                    scale = self.data.iloc[idx, 0].strip()
-                    amount = self.data.iloc[idx, 1]
-                    if amount != '-' and pd.notna(amount):
-                        self.scales[scale] = int(amount)
+            self.scales = section(skala_usaha_start, len(names), str.strip)
         
         # Calculate risk levels based on credit amounts
         self.calculate_risk_levels()
     
-    def calculate_risk_levels(self):
-        """Calculate risk levels for business fields"""
-        total_credit = sum(self.business_fields.values())
+    def _read_rows(self):
+        """Read the first two columns of the CSV in one pass, as pandas would see them
         
-        # Risk level: Lower credit amount = Higher risk (less established)
-        # Higher credit amount = Lower risk (more established)
-        self.risk_levels = {}
+        Returns the names and raw amounts (None where missing), the row after
+        the last occurrence of each section header, and the function turning
+        an amount into int. Like read_csv, amounts become numbers only when
+        the whole column is numeric, so '12.5' fails in a text column but is
+        truncated in a numeric one.
+        """
+        names = []
+        amounts = []
+        starts = {}
+        all_int = True
+        all_float = True
         
-        for field, amount in self.business_fields.items():
-            percentage = (amount / total_credit) * 100
-            if percentage > 20:  # Very established
-                risk = 0.2  # Low risk
-            elif percentage > 10:  # Well established
-                risk = 0.4  # Medium-low risk
-            elif percentage > 5:  # Moderately established
-                risk = 0.6  # Medium-high risk
-            else:  # Less established
-                risk = 0.8  # High risk
+        with open(self.csv_file, newline='', encoding='utf-8-sig') as f:
+            # Title lines, skipped like skiprows=2
+            for _ in range(2):
+                f.readline()
             
-            self.risk_levels[field] = risk
+            for row in csv.reader(f):
+                if not row or (len(row) == 1 and not row[0].strip()):
+                    continue  # Blank line
+                name = row[0] if row[0] not in NA_VALUES else None
+                amount = row[1] if len(row) > 1 and row[1] not in NA_VALUES else None
+                
+                if name is not None:
+                    for header in ('Lapangan Usaha', 'Jenis Penggunaan', 'Skala Usaha'):
+                        if header in name:
+                            starts[header] = len(names) + 1
+                            break
+                
+                if amount is not None and all_float:
+                    try:
+                        int(amount)
+                    except ValueError:
+                        all_int = False
+                        try:
+                            float(amount)
+                        except ValueError:
+                            all_float = False
+                
+                names.append(name)
+                amounts.append(amount)
+        
+        def to_int(amount):
+            return int(amount) if all_int or not all_float else int(float(amount))
+        return names, amounts, starts, to_int
+    
+    def load_snapshot(self):
+        """Restore the parsed dicts from the snapshot file; False if missing or stale
+        
+        A snapshot is current when the CSV has the recorded size and mtime or,
+        failing that (e.g. a fresh checkout), the recorded SHA-256.
+        """
+        if not self.snapshot_path:
+            return False
+        try:
+            with open(self.snapshot_path, 'rb') as f:
+                snapshot = marshal.load(f)
+            stat = os.stat(self.csv_file)
+        except (OSError, EOFError, ValueError, TypeError):
+            return False
+        
+        if not isinstance(snapshot, dict) or snapshot.get('version') != _snapshot_version():
+            return False
+        if snapshot['size'] != stat.st_size:
+            return False
+        if snapshot['mtime_ns'] != stat.st_mtime_ns and snapshot['sha256'] != _file_sha256(self.csv_file):
+            return False
+        
+        self._aggregates = {}
+        self.business_fields = snapshot['business_fields']
+        self.usage_types = snapshot['usage_types']
+        self.scales = snapshot['scales']
+        self.calculate_risk_levels()
+        return True
+    
+    def save_snapshot(self):
+        """Write the parsed dicts next to the CSV fingerprint; returns False if not writable"""
+        if not self.snapshot_path:
+            return False
+        stat = os.stat(self.csv_file)
+        snapshot = {
+            'version': _snapshot_version(),
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'sha256': _file_sha256(self.csv_file),
+            'business_fields': self.business_fields,
+            'usage_types': self.usage_types,
+            'scales': self.scales,
+        }
+        temp_path = f"{self.snapshot_path}.{os.getpid()}.tmp"
+        try:
+            with open(temp_path, 'wb') as f:
+                marshal.dump(snapshot, f)
+            os.replace(temp_path, self.snapshot_path)
+        except OSError:
+            # Read-only deployments (e.g. serverless) keep working from the CSV
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            return False
+        return True
+    
+    def calculate_risk_levels(self):
+        """Build the feature table and take the risk level of every business field from it
+        
+        Lower credit share = higher risk (less established), see features.py.
+        """
+        self.features = FeatureTable.build(self, self.history, self.feature_mode)
+        self.risk_levels = self.features.levels('business_field')
     
     def get_business_field_risk(self, field):
         """Get risk level for a specific business field"""
@@ -101,13 +221,75 @@ class UMKMDataProcessor:
             return (0, 100)  # Default range
     
     def get_usage_priority(self, usage_type):
-        """Get approval priority for usage type"""
-        if usage_type == "Modal Kerja":
-            return 0.7  # Higher priority (working capital)
-        elif usage_type == "Investasi":
-            return 0.5  # Medium priority (investment)
-        else:
-            return 0.3  # Lower priority
+        """Get approval priority (0-1) for usage type"""
+        return self.features.level('usage_type', usage_type)
+    
+    def get_scale_level(self, scale):
+        """Get position (0-1) of a business scale among all scales"""
+        return self.features.level('scale', scale)
+    
+    def get_statistics(self):
+        """Totals, distributions and top business fields for the dashboard
+        
+        Computed once per load and shared between callers, so treat the
+        result as read-only.
+        """
+        statistics = self._aggregates.get('statistics')
+        if statistics is None:
+            risks = [self.get_business_field_risk(field) for field in self.business_fields]
+            statistics = self._aggregates['statistics'] = {
+                'total_credit': f"{sum(self.business_fields.values()):,} Miliar",
+                'total_business_fields': len(self.business_fields),
+                'scales_distribution': {
+                    'Mikro': f"{self.scales.get('Mikro', 0):,} Miliar",
+                    'Kecil': f"{self.scales.get('Kecil', 0):,} Miliar",
+                    'Menengah': f"{self.scales.get('Menengah', 0):,} Miliar"
+                },
+                'usage_distribution': {
+                    'Modal Kerja': f"{self.usage_types.get('Modal Kerja', 0):,} Miliar",
+                    'Investasi': f"{self.usage_types.get('Investasi', 0):,} Miliar"
+                },
+                'top_business_fields': sorted(self.business_fields.items(), key=lambda x: x[1], reverse=True)[:5],
+                'risk_distribution': {
+                    'low_risk': sum(1 for risk in risks if risk <= 0.4),
+                    'medium_risk': sum(1 for risk in risks if 0.4 < risk <= 0.7),
+                    'high_risk': sum(1 for risk in risks if risk > 0.7)
+                }
+            }
+        return statistics
+    
+    def get_chart_data(self):
+        """Labels and values of every section for the charts; computed once per load, read-only"""
+        chart_data = self._aggregates.get('chart_data')
+        if chart_data is None:
+            chart_data = self._aggregates['chart_data'] = {
+                section: {'labels': list(values.keys()), 'values': list(values.values())}
+                for section, values in (('business_fields', self.business_fields), ('scales', self.scales),
+                                        ('usage_types', self.usage_types))
+            }
+        return chart_data
+    
+    def get_options(self):
+        """Choices of the input dropdowns; computed once per load, read-only"""
+        options = self._aggregates.get('options')
+        if options is None:
+            options = self._aggregates['options'] = {
+                'business_fields': self.get_all_business_fields(),
+                'scales': self.get_all_scales(),
+                'usage_types': self.get_all_usage_types()
+            }
+        return options
+    
+    def get_features(self):
+        """Feature table with the level of every row for display; computed once per load, read-only"""
+        features = self._aggregates.get('features')
+        if features is None:
+            features = self._aggregates['features'] = {
+                'mode': self.features.mode,
+                'concentration': self.features.concentration,
+                'rows': self.features.records(),
+            }
+        return features
     
     def get_all_business_fields(self):
         """Get list of all business fields"""
@@ -120,3 +302,26 @@ class UMKMDataProcessor:
     def get_all_usage_types(self):
         """Get list of all usage types"""
         return list(self.usage_types.keys())
+    
+    def application_error(self, business_field, scale, usage_type):
+        """Error message for the first choice not in this data, None when all are valid"""
+        if business_field not in self.get_all_business_fields():
+            return f'Lapangan usaha "{business_field}" tidak valid'
+        if scale not in self.get_all_scales():
+            return f'Skala usaha "{scale}" tidak valid'
+        if usage_type not in self.get_all_usage_types():
+            return f'Jenis penggunaan "{usage_type}" tidak valid'
+        return None
+
+
+def _snapshot_version():
+    """marshal's format may change between Python versions, so they are part of the key"""
+    return (SNAPSHOT_VERSION,) + tuple(sys.version_info[:2])
+
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
@@ -0,0 +1,222 @@
+"""
+Many BPS credit tables (periods, regions) behind one lazily loaded store
+
+Datasets are registered by (period, region) and only parsed on first
+access, through UMKMDataProcessor and its snapshot, then kept in columnar
+form. The least recently used datasets are evicted once the store exceeds
+its memory budget; evicted datasets reload from their snapshot, so the CSV
+is not parsed again. A manifest lists the datasets:
+
+    {
+      "default": "2023/Indonesia",
+      "datasets": [
+        {"period": "2023", "region": "Indonesia", "path": "kredit_umkm_2023.csv"},
+        {"period": "2024Q1", "region": "Jawa Barat", "path": "jabar/2024q1.csv"}
+      ]
+    }
+
+Relative paths are resolved against the manifest's directory. Earlier
+periods of the same region (ordered as strings, so "2023" < "2024Q1") feed
+the growth features of a dataset, see features.py.
+"""
+
+import json
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from data_processor import UMKMDataProcessor
+
+# Section of each row, as stored in Dataset.sections
+SECTIONS = ('business_field', 'usage_type', 'scale')
+
+# Memory budget of a store when none is given
+DEFAULT_MEMORY_BUDGET = 64 * 1024 * 1024
+
+
+class Dataset(UMKMDataProcessor):
+    """One parsed credit table in columnar form, indexed by field name
+
+    Rows hold every business field, usage type and scale with its section
+    code, amount (billion rupiah) and risk level (NaN outside business
+    fields). The per-section dicts of UMKMDataProcessor are built once from
+    the columns, so it stands in for one wherever applications are
+    validated and scored.
+    """
+
+    def __init__(self, key, names, sections, amounts, risks, features=None):
+        self.key = key
+        self.features = features
+        self.names = tuple(names)
+        self.sections = np.asarray(sections, dtype=np.uint8)
+        self.amounts = np.asarray(amounts, dtype=np.int64)
+        self.risks = np.asarray(risks, dtype=np.float64)
+        self.index = {(SECTIONS[section], name): row
+                      for row, (section, name) in enumerate(zip(self.sections.tolist(), self.names))}
+        by_section = {section: {} for section in SECTIONS}
+        for (section, name), row in self.index.items():
+            by_section[section][name] = int(self.amounts[row])
+        self.business_fields = by_section['business_field']
+        self.usage_types = by_section['usage_type']
+        self.scales = by_section['scale']
+        self.risk_levels = {name: float(self.risks[self.index[('business_field', name)]])
+                            for name in self.business_fields}
+        self._aggregates = {}
+
+    @classmethod
+    def from_processor(cls, key, processor):
+        """Columnar copy of a loaded UMKMDataProcessor"""
+        names, sections, amounts, risks = [], [], [], []
+        for section, values in enumerate((processor.business_fields, processor.usage_types, processor.scales)):
+            for name, amount in values.items():
+                names.append(name)
+                sections.append(section)
+                amounts.append(amount)
+                risks.append(processor.risk_levels.get(name, np.nan) if section == 0 else np.nan)
+        return cls(key, names, sections, amounts, risks, processor.features)
+
+    @property
+    def nbytes(self):
+        """Approximate memory held by this dataset, its lookup dicts and feature table included"""
+        lookups = (self.index, self.business_fields, self.usage_types, self.scales, self.risk_levels)
+        return (self.sections.nbytes + self.amounts.nbytes + self.risks.nbytes + sys.getsizeof(self.names)
+                + sum(sys.getsizeof(name) for name in self.names) + sum(sys.getsizeof(d) for d in lookups)
+                + (self.features.nbytes if self.features is not None else 0))
+
+
+class DatasetStore:
+    """Registered datasets by (period, region), loaded on first access under a memory budget"""
+
+    def __init__(self, memory_budget=DEFAULT_MEMORY_BUDGET, default=None, feature_mode='buckets'):
+        self.memory_budget = memory_budget
+        self.default = default
+        self.feature_mode = feature_mode
+        self._paths = {}
+        self._loaded = OrderedDict()
+        self._lock = threading.Lock()
+        # Bumped by register(), so a dataset parsed from replaced paths is not stored
+        self._generation = 0
+        self.loads = 0
+        self.evictions = 0
+
+    @classmethod
+    def from_manifest(cls, path, memory_budget=DEFAULT_MEMORY_BUDGET, feature_mode='buckets'):
+        """Store with the datasets listed in a manifest file; ValueError if it is malformed"""
+        with open(path, encoding='utf-8') as f:
+            try:
+                manifest = json.load(f)
+            except ValueError as e:
+                raise ValueError(f"Cannot parse dataset manifest {path}: {e}")
+        entries = manifest.get('datasets') if isinstance(manifest, dict) else None
+        if not isinstance(entries, list):
+            raise ValueError(f"Dataset manifest {path} needs a 'datasets' list")
+
+        store = cls(memory_budget, feature_mode=feature_mode)
+        base = os.path.dirname(os.path.abspath(path))
+        for number, entry in enumerate(entries, 1):
+            if not isinstance(entry, dict) or not all(isinstance(entry.get(k), str) and entry.get(k)
+                                                      for k in ('period', 'region', 'path')):
+                raise ValueError(f"Dataset {number} in {path} needs 'period', 'region' and 'path' strings")
+            store.register(entry['period'], entry['region'], os.path.join(base, entry['path']))
+        if manifest.get('default') is not None:
+            store.default = store.resolve(manifest['default'])
+        return store
+
+    def register(self, period, region, csv_file):
+        """Make the CSV available as (period, region); loaded on first access"""
+        key = (str(period), str(region))
+        if '/' in key[0]:
+            raise ValueError(f"Period {period!r} must not contain '/'")
+        with self._lock:
+            self._paths[key] = csv_file
+            self._generation += 1
+            # A dataset registered again is reloaded from the new path, and later periods
+            # of the region with it, since their growth features change
+            for loaded in list(self._loaded):
+                if loaded[1] == key[1] and loaded[0] >= key[0]:
+                    del self._loaded[loaded]
+        return key
+
+    def keys(self):
+        """Registered (period, region) keys, in registration order"""
+        return list(self._paths)
+
+    def resolve(self, key):
+        """(period, region) for a 'period/region' string or a pair; ValueError if not registered"""
+        if key is None:
+            if self.default is None:
+                raise ValueError("No dataset given and the store has no default")
+            return self.default
+        if isinstance(key, str):
+            period, _, region = key.partition('/')
+        elif isinstance(key, dict):
+            period, region = key.get('period'), key.get('region')
+        else:
+            period, region = key
+        key = (str(period), str(region))
+        if key not in self._paths:
+            raise ValueError(f"Unknown dataset {key[0]}/{key[1]}")
+        return key
+
+    def get(self, key=None):
+        """The Dataset for ``key`` (see resolve()), loading it if needed"""
+        key = self.resolve(key)
+        with self._lock:
+            dataset = self._loaded.get(key)
+            if dataset is not None:
+                self._loaded.move_to_end(key)
+                return dataset
+            paths = [self._paths[earlier] for earlier in self.history(key)] + [self._paths[key]]
+            generation = self._generation
+        # Parsed without the lock, so readers of loaded datasets never wait for a CSV
+        history = [UMKMDataProcessor(path) for path in paths[:-1]]
+        processor = UMKMDataProcessor(paths[-1], feature_mode=self.feature_mode, history=history)
+        dataset = Dataset.from_processor(key, processor)
+        with self._lock:
+            if key in self._loaded:
+                # Loaded by another thread meanwhile
+                self._loaded.move_to_end(key)
+                return self._loaded[key]
+            self.loads += 1
+            # A registration while parsing may have changed the paths; keep the result out of the store then
+            if generation == self._generation:
+                self._loaded[key] = dataset
+                self._evict()
+            return dataset
+
+    def history(self, key):
+        """Registered keys of the same region before ``key``'s period, oldest first"""
+        period, region = key
+        return sorted(other for other in self._paths if other[1] == region and other[0] < period)
+
+    def lookup(self, period, region, field):
+        """(section, amount, risk) of a field of one dataset, or None if the dataset lacks it"""
+        dataset = self.get((period, region))
+        for section in SECTIONS:
+            row = dataset.index.get((section, field))
+            if row is not None:
+                return section, int(dataset.amounts[row]), float(dataset.risks[row])
+        return None
+
+    def _evict(self):
+        """Drop least recently used datasets until within budget, keeping the newest"""
+        total = sum(dataset.nbytes for dataset in self._loaded.values())
+        while total > self.memory_budget and len(self._loaded) > 1:
+            _, dataset = self._loaded.popitem(last=False)
+            total -= dataset.nbytes
+            self.evictions += 1
+
+    def stats(self):
+        """Registered and loaded datasets, their memory and load/eviction counters"""
+        with self._lock:
+            return {
+                'registered': len(self._paths),
+                'loaded': ['/'.join(key) for key in self._loaded],
+                'bytes': sum(dataset.nbytes for dataset in self._loaded.values()),
+                'memory_budget': self.memory_budget,
+                'loads': self.loads,
+                'evictions': self.evictions,
+            }
@@ -0,0 +1,195 @@
+"""
+Continuous fuzzy inputs derived from the credit table
+
+Every business field, usage type and scale gets a level between 0 and 1
+(risk, priority and scale position) computed once when the data is loaded
+and kept in a FeatureTable indexed by (section, name), so lookups per
+request are a dict access. The features behind each level:
+
+- share: the row's part of its section's credit
+- share_percentile: mid-rank of the share within the section (ties averaged)
+- share_magnitude: log share scaled between the section's smallest and largest
+- growth: mean log growth per period over earlier periods of the same
+  region, when the DatasetStore has them; growth_percentile ranks it
+- concentration: Herfindahl-Hirschman index of the section, normalized to
+  0 (even) - 1 (one row holds all credit)
+
+Establishment blends the share features (and growth when known) with
+ESTABLISHMENT_WEIGHTS. Risk falls and priority rises with establishment,
+within RISK_RANGE and PRIORITY_RANGE, the span the old buckets covered. The
+scale position is the credit-weighted percentile of the middle of each
+scale, with scales in SCALE_ORDER. ``mode='buckets'`` keeps the previous
+four risk buckets and fixed priorities and scale positions.
+"""
+
+import math
+import sys
+
+FEATURE_MODES = ('continuous', 'buckets')
+
+# Table section -> UMKMDataProcessor attribute holding its amounts
+SECTION_ATTRIBUTES = {'business_field': 'business_fields', 'usage_type': 'usage_types', 'scale': 'scales'}
+
+# Weights of the features making up establishment; growth's weight is shared out when there is no history
+ESTABLISHMENT_WEIGHTS = {'share_percentile': 0.35, 'share_magnitude': 0.35, 'growth_percentile': 0.3}
+
+# Levels of the most and least established rows
+RISK_RANGE = (0.2, 0.8)
+PRIORITY_RANGE = (0.3, 0.7)
+
+# Scales from smallest to largest; others follow in the order of the data
+SCALE_ORDER = ('Mikro', 'Kecil', 'Menengah')
+
+# Levels for names missing from the table, as the fixed lookups had
+DEFAULT_LEVELS = {'business_field': 0.5, 'usage_type': 0.3, 'scale': 0.5}
+
+BUCKET_PRIORITIES = {'Modal Kerja': 0.7, 'Investasi': 0.5}
+BUCKET_SCALES = {'Mikro': 0.165, 'Kecil': 0.5, 'Menengah': 0.835}
+
+
+class FeatureTable:
+    """Levels (0-1) and features of every row of a dataset, indexed by (section, name)"""
+
+    def __init__(self, mode, rows, concentration):
+        self.mode = mode
+        self.rows = rows
+        self.concentration = concentration
+
+    @classmethod
+    def build(cls, processor, history=(), mode='buckets'):
+        """Table for a loaded processor; ``history`` holds earlier periods of the same region, oldest first"""
+        if mode not in FEATURE_MODES:
+            raise ValueError(f"Unknown feature mode {mode!r}, expected one of {', '.join(FEATURE_MODES)}")
+        rows = {}
+        concentration = {}
+        for section, attribute in SECTION_ATTRIBUTES.items():
+            amounts = getattr(processor, attribute)
+            features = section_features(amounts, [getattr(past, attribute) for past in history])
+            concentration[section] = herfindahl(amounts)
+            if mode == 'buckets':
+                levels = bucket_levels(section, amounts, features)
+            elif section == 'scale':
+                levels = scale_positions(amounts)
+            else:
+                low, high = RISK_RANGE if section == 'business_field' else PRIORITY_RANGE
+                for name, row in features.items():
+                    row['establishment'] = establishment(row)
+                levels = {name: (high - (high - low) * row['establishment'] if section == 'business_field'
+                                 else low + (high - low) * row['establishment'])
+                          for name, row in features.items()}
+            for name, row in features.items():
+                row['level'] = levels[name]
+                rows[(section, name)] = row
+        return cls(mode, rows, concentration)
+
+    def level(self, section, name):
+        """Level of ``name`` in ``section``, DEFAULT_LEVELS when the table lacks it"""
+        row = self.rows.get((section, name))
+        return DEFAULT_LEVELS[section] if row is None else row['level']
+
+    def levels(self, section):
+        """{name: level} of one section, in the order of the data"""
+        return {name: row['level'] for (row_section, name), row in self.rows.items() if row_section == section}
+
+    @property
+    def nbytes(self):
+        """Approximate memory held by the table; names are shared with the dataset and not counted"""
+        size = sys.getsizeof(self.rows) + sys.getsizeof(self.concentration)
+        for key, row in self.rows.items():
+            size += sys.getsizeof(key) + sys.getsizeof(row) + sum(sys.getsizeof(value) for value in row.values())
+        return size
+
+    def records(self):
+        """Rows as plain dicts with their section and name, for display and export"""
+        return [dict(row, section=section, name=name) for (section, name), row in self.rows.items()]
+
+
+def section_features(amounts, history=()):
+    """{name: {share, share_percentile, share_magnitude, growth, growth_percentile}} for one section"""
+    total = sum(amounts.values())
+    shares = {name: amount / total if total > 0 else 0.0 for name, amount in amounts.items()}
+    positive = [share for share in shares.values() if share > 0]
+    low, high = (math.log(min(positive)), math.log(max(positive))) if positive else (0.0, 0.0)
+
+    growth = {}
+    if history:
+        for name, amount in amounts.items():
+            start = history[0].get(name)
+            if start and start > 0 and amount > 0:
+                growth[name] = (math.log(amount) - math.log(start)) / len(history)
+    share_ranks = percentiles(shares)
+    growth_ranks = percentiles(growth)
+
+    return {name: {
+        'share': shares[name],
+        'share_percentile': share_ranks[name],
+        'share_magnitude': ((math.log(shares[name]) - low) / (high - low) if shares[name] > 0 and high > low
+                            else float(shares[name] > 0)),
+        'growth': growth.get(name),
+        'growth_percentile': growth_ranks.get(name),
+    } for name in amounts}
+
+
+def percentiles(values):
+    """{name: mid-rank percentile in (0, 1)} of a {name: number} dict, ties sharing their mean rank"""
+    ordered = sorted(values.items(), key=lambda item: item[1])
+    ranks = {}
+    start = 0
+    while start < len(ordered):
+        stop = start
+        while stop + 1 < len(ordered) and ordered[stop + 1][1] == ordered[start][1]:
+            stop += 1
+        for name, _ in ordered[start:stop + 1]:
+            ranks[name] = ((start + stop) / 2 + 0.5) / len(ordered)
+        start = stop + 1
+    return ranks
+
+
+def establishment(row):
+    """Weighted blend of a row's features (0-1); features that are missing do not count"""
+    weights = {feature: weight for feature, weight in ESTABLISHMENT_WEIGHTS.items() if row.get(feature) is not None}
+    return sum(row[feature] * weight for feature, weight in weights.items()) / sum(weights.values())
+
+
+def herfindahl(amounts):
+    """Normalized Herfindahl-Hirschman index of a section: 0 for even shares, 1 when one row has all credit"""
+    total = sum(amounts.values())
+    if total <= 0 or len(amounts) < 2:
+        return 0.0
+    index = sum((amount / total) ** 2 for amount in amounts.values())
+    return (index - 1 / len(amounts)) / (1 - 1 / len(amounts))
+
+
+def scale_positions(amounts):
+    """{scale: credit-weighted percentile of its middle}, scales ordered by SCALE_ORDER"""
+    order = [scale for scale in SCALE_ORDER if scale in amounts]
+    order += [scale for scale in amounts if scale not in SCALE_ORDER]
+    total = sum(amounts.values())
+    if total <= 0:
+        return {scale: (index + 0.5) / len(order) for index, scale in enumerate(order)}
+    positions = {}
+    below = 0
+    for scale in order:
+        positions[scale] = (below + amounts[scale] / 2) / total
+        below += amounts[scale]
+    return positions
+
+
+def bucket_levels(section, amounts, features):
+    """Levels of the fixed lookups: four risk buckets by share, constant priorities and scale positions"""
+    if section == 'scale':
+        return {name: BUCKET_SCALES.get(name, DEFAULT_LEVELS['scale']) for name in amounts}
+    if section == 'usage_type':
+        return {name: BUCKET_PRIORITIES.get(name, DEFAULT_LEVELS['usage_type']) for name in amounts}
+    levels = {}
+    for name, row in features.items():
+        percentage = row['share'] * 100
+        if percentage > 20:  # Very established
+            levels[name] = 0.2
+        elif percentage > 10:  # Well established
+            levels[name] = 0.4
+        elif percentage > 5:  # Moderately established
+            levels[name] = 0.6
+        else:  # Less established
+            levels[name] = 0.8
+    return levels
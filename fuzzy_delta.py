@@ -0,0 +1,145 @@
+"""
+Which results a model change can affect
+
+A score depends on a membership function only where it is non-zero at the
+input, on a rule only where the rule fires, and on an output term only
+where its cut level is non-zero. ModelDelta compares two CompiledModels term
+by term and rule by rule and tells, for any inputs, whether their result
+may differ between the two, so cached scores, surface nodes and rendered
+images of everything else are carried over instead of recomputed.
+"""
+
+from collections import Counter
+
+import numpy as np
+
+
+class ModelDelta:
+    """Changed input terms, output terms and rules between two CompiledModels
+
+    ``full`` is set when the models differ in structure (variables, term
+    names, universes, defuzzifier, output set kind): then every result is
+    affected. Otherwise ``input_terms`` lists the (input index, term index)
+    pairs whose membership function changed, ``output_terms`` the changed
+    output term indices, and ``removed_rules`` / ``added_rules`` the indices
+    of rules (compared by antecedent, consequent and weight) only found in
+    the old / new model.
+    """
+
+    def __init__(self, old, new):
+        self.old = old
+        self.new = new
+        self.input_terms = []
+        self.output_terms = []
+        self.removed_rules = []
+        self.added_rules = []
+        self.full = not same_structure(old, new)
+        if self.full:
+            return
+
+        a, b = old.engine, new.engine
+        for i, (old_mfs, new_mfs) in enumerate(zip(a.input_mfs, b.input_mfs)):
+            self.input_terms += [(i, t) for t in range(len(old_mfs)) if not np.array_equal(old_mfs[t], new_mfs[t])]
+        for t in range(len(a.output_mfs)):
+            if not np.array_equal(a.output_mfs[t], b.output_mfs[t]) or (
+                    a.output_triangles is not None and not np.array_equal(a.output_triangles[t], b.output_triangles[t])):
+                self.output_terms.append(t)
+
+        old_rules, new_rules = rule_keys(a), rule_keys(b)
+        only_old = Counter(old_rules) - Counter(new_rules)
+        only_new = Counter(new_rules) - Counter(old_rules)
+        self.removed_rules = _take(old_rules, only_old)
+        self.added_rules = _take(new_rules, only_new)
+
+    @property
+    def empty(self):
+        """True when no score can differ between the two models"""
+        return not (self.full or self.input_terms or self.output_terms or self.removed_rules or self.added_rules)
+
+    @property
+    def variables_changed(self):
+        """Whether any membership function (or the structure) changed, i.e. the plotted variables"""
+        return self.full or bool(self.input_terms or self.output_terms)
+
+    @property
+    def analysis_compatible(self):
+        """Whether a detailed analysis of an unaffected input carries over unchanged
+
+        Needs the same rule list (ids, descriptions) and output terms; input
+        term memberships of unaffected inputs are equal by definition.
+        """
+        return (not self.full and not self.output_terms and self.old.rule_ids == self.new.rule_ids
+                and self.old.rule_descriptions == self.new.rule_descriptions)
+
+    def affected(self, *inputs):
+        """Boolean array: where the result for the input arrays may differ between the models"""
+        a, b = self.old.engine, self.new.engine
+        inputs = np.broadcast_arrays(*[np.atleast_1d(np.asarray(x, dtype=np.float64)) for x in inputs])
+        shape, rows = inputs[0].shape, [x.ravel() for x in inputs]
+        if self.full:
+            return np.ones(shape, dtype=bool)
+        if self.empty:
+            return np.zeros(shape, dtype=bool)
+
+        affected = np.zeros(rows[0].size, dtype=bool)
+        for start in range(0, affected.size, a.chunk_size):
+            chunk = [x[start:start + a.chunk_size] for x in rows]
+            old_memberships, new_memberships = a.fuzzify(chunk), b.fuzzify(chunk)
+            # Same memberships everywhere means same rule strengths for unchanged rules
+            changed = np.zeros(len(chunk[0]), dtype=bool)
+            for i, t in self.input_terms:
+                changed |= old_memberships[i][:, t] != new_memberships[i][:, t]
+            if self.removed_rules or self.added_rules or self.output_terms:
+                old_strengths, new_strengths = a.fire(old_memberships), b.fire(new_memberships)
+                changed |= (old_strengths[:, self.removed_rules] > 0).any(axis=1)
+                changed |= (new_strengths[:, self.added_rules] > 0).any(axis=1)
+                if self.output_terms:
+                    changed |= (a.activate(old_strengths)[:, self.output_terms] > 0).any(axis=1)
+                    changed |= (b.activate(new_strengths)[:, self.output_terms] > 0).any(axis=1)
+            affected[start:start + a.chunk_size] = changed
+        return affected.reshape(shape)
+
+    def summary(self):
+        """Names of what changed, for logs and API responses"""
+        if self.full:
+            return {'full': True}
+        labels = self.new.input_labels
+        input_terms = [(labels[i], list(self.new.variables[labels[i]][1])[t]) for i, t in self.input_terms]
+        output_terms = list(self.new.variables[self.new.output_label][1])
+        return {
+            'full': False,
+            'input_terms': [f"{label}[{term}]" for label, term in input_terms],
+            'output_terms': [output_terms[t] for t in self.output_terms],
+            'removed_rules': [self.old.rule_descriptions[r] for r in self.removed_rules],
+            'added_rules': [self.new.rule_descriptions[r] for r in self.added_rules],
+        }
+
+
+def same_structure(old, new):
+    """Whether two models have the same variables, term names, universes and defuzzification"""
+    a, b = old.engine, new.engine
+    if list(old.variables) != list(new.variables):
+        return False
+    if any(list(old.variables[label][1]) != list(new.variables[label][1]) for label in old.variables):
+        return False
+    if a.defuzzifier != b.defuzzifier or (a.output_triangles is None) != (b.output_triangles is None):
+        return False
+    return (all(np.array_equal(u, v) for u, v in zip(a.input_universes, b.input_universes))
+            and np.array_equal(a.output_universe, b.output_universe))
+
+
+def rule_keys(engine):
+    """(antecedent term indices, consequent, weight) of every rule, in rule order"""
+    return [(tuple(antecedent), int(consequent), float(weight)) for antecedent, consequent, weight
+            in zip(engine.rule_antecedents.tolist(), engine.rule_consequents, engine.rule_weights)]
+
+
+def _take(keys, counts):
+    """Indices of ``keys`` making up the multiset ``counts``, first occurrences first"""
+    counts = Counter(counts)
+    indices = []
+    for index, key in enumerate(keys):
+        if counts[key] > 0:
+            counts[key] -= 1
+            indices.append(index)
+    return indices
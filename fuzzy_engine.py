@@ -0,0 +1,628 @@
+import hashlib
+
+import numpy as np
+
+# Largest absolute difference allowed between MamdaniEngine and skfuzzy's
+# ControlSystemSimulation for the same inputs. Both compute the same
+# piecewise-linear centroid, so only floating point rounding differs.
+SKFUZZY_TOLERANCE = 1e-6
+
+# Defuzzification methods, with skfuzzy's names
+DEFUZZIFIERS = ('centroid', 'bisector', 'mom', 'som', 'lom')
+
+# Stand-in slope of vertical triangle edges in the analytic output set
+VERTICAL_SLOPE = 1e200
+
+
+class MamdaniEngine:
+    """Vectorized Mamdani inference over a compiled rule base.
+
+    Evaluates fuzzification, min/max rule firing, clipped aggregation and
+    centroid defuzzification as array operations on many rows at once.
+    Semantics follow skfuzzy's ControlSystemSimulation: inputs are clipped to
+    their universe, memberships are interpolated from the sampled membership
+    functions and the aggregated output set is upsampled at every cut point
+    before the piecewise-linear centroid is taken.
+
+    Rules are given as index arrays: ``rule_antecedents[r, i]`` is the term
+    index of input ``i`` used by rule ``r`` (``-1`` when the rule does not use
+    that input) and ``rule_consequents[r]`` is the output term index. All
+    antecedents of a rule are AND-ed with ``min``.
+
+    Rules that can never change a score are left out of evaluate(): rules
+    using a term that is zero over its whole universe, and rules dominated by
+    a rule with the same consequent, at most the same terms and at least the
+    same weight (see redundant_rules()). Within each chunk, rules using a
+    term no row has membership in are not evaluated either. Scores are the
+    same as with every rule; ``prune=False`` evaluates every rule anyway.
+
+    ``defuzzifier`` is one of DEFUZZIFIERS. With ``output_triangles``, the
+    [a, b, c] parameters of the output terms, the aggregated output set is
+    built analytically from the triangles instead of from the sampled
+    membership functions: exact whatever the output universe's resolution,
+    and its cost does not grow with it. The sampled set reproduces skfuzzy.
+    """
+
+    def __init__(self, input_universes, input_mfs, output_universe, output_mfs,
+                 rule_antecedents, rule_consequents, rule_weights=None, chunk_size=4096,
+                 defuzzifier='centroid', output_triangles=None, prune=True):
+        self.input_universes = [np.asarray(u, dtype=np.float64) for u in input_universes]
+        self.input_mfs = [np.atleast_2d(np.asarray(m, dtype=np.float64)) for m in input_mfs]
+        self.output_universe = np.asarray(output_universe, dtype=np.float64)
+        self.output_mfs = np.atleast_2d(np.asarray(output_mfs, dtype=np.float64))
+        self.rule_antecedents = np.asarray(rule_antecedents, dtype=np.intp).reshape(-1, len(self.input_universes))
+        self.rule_consequents = np.asarray(rule_consequents, dtype=np.intp)
+        if rule_weights is None:
+            rule_weights = np.ones(len(self.rule_consequents))
+        self.rule_weights = np.asarray(rule_weights, dtype=np.float64)
+        self.chunk_size = chunk_size
+        self.defuzzifier = defuzzifier
+        self.prune = prune
+        self.output_triangles = None
+        if output_triangles is not None:
+            self.output_triangles = np.asarray(output_triangles, dtype=np.float64).reshape(-1, 3)
+
+        if len(self.rule_antecedents) != len(self.rule_consequents):
+            raise ValueError("Every rule needs exactly one consequent term")
+        if defuzzifier not in DEFUZZIFIERS:
+            raise ValueError(f"Unknown defuzzifier '{defuzzifier}', expected one of {', '.join(DEFUZZIFIERS)}")
+        if self.output_triangles is not None:
+            if len(self.output_triangles) != len(self.output_mfs):
+                raise ValueError("Need one output triangle per output membership function")
+            self._prepare_analytic_points()
+
+        # Rules grouped by the output term they activate
+        self._consequent_masks = [self.rule_consequents == t for t in range(len(self.output_mfs))]
+        self._prepare_cut_points()
+
+        # (rule, reason, other rule) of every rule that cannot change a score, and the rules evaluate() uses
+        self.redundant = redundant_rules(self.rule_antecedents, self.rule_consequents, self.rule_weights,
+                                         self.input_mfs)
+        skipped = {rule for rule, _, _ in self.redundant} if prune else set()
+        self.scoring_rules = np.array([r for r in range(self.n_rules) if r not in skipped], dtype=np.intp)
+        self._scoring_masks = [self.rule_consequents[self.scoring_rules] == t for t in range(len(self.output_mfs))]
+        self.term_counts = [len(mfs) for mfs in self.input_mfs]
+        self._index = AntecedentIndex(self.rule_antecedents, self.term_counts)
+        self._scoring_index = AntecedentIndex(self.rule_antecedents[self.scoring_rules], self.term_counts)
+
+    @property
+    def n_inputs(self):
+        return len(self.input_universes)
+
+    @property
+    def n_rules(self):
+        return len(self.rule_consequents)
+
+    @property
+    def input_bounds(self):
+        """(min, max) of every input universe"""
+        return [(float(u.min()), float(u.max())) for u in self.input_universes]
+
+    def fingerprint(self):
+        """Hash of universes, membership functions and rules identifying this model"""
+        arrays = self.input_universes + self.input_mfs + [
+            self.output_universe, self.output_mfs,
+            self.rule_antecedents, self.rule_consequents, self.rule_weights,
+        ]
+        # The defaults add nothing, so fingerprints of existing models stay valid
+        if self.output_triangles is not None:
+            arrays.append(self.output_triangles)
+        return _hash_arrays(arrays, b'' if self.defuzzifier == 'centroid' else self.defuzzifier.encode())
+
+    def input_fingerprint(self):
+        """Hash of the input universes and membership functions: engines sharing it fuzzify alike"""
+        return _hash_arrays(self.input_universes + self.input_mfs)
+
+    def output_fingerprint(self):
+        """Hash of the output set and defuzzifier: engines sharing it defuzzify the same cuts alike"""
+        arrays = [self.output_universe, self.output_mfs]
+        if self.output_triangles is not None:
+            arrays.append(self.output_triangles)
+        return _hash_arrays(arrays) + self.defuzzifier
+
+    def _prepare_cut_points(self):
+        """Precompute rising/falling edges of each output term for cut-point lookup"""
+        x = self.output_universe
+        self._rising_edges = []
+        self._falling_edges = []
+        for mf in self.output_mfs:
+            peak = int(np.argmax(mf))
+            if np.any(np.diff(mf[:peak + 1]) < 0) or np.any(np.diff(mf[peak:]) > 0):
+                raise ValueError("Output membership functions must be unimodal")
+
+            # Rising edge: from the last zero before the peak up to the peak
+            zeros = np.nonzero(mf[:peak + 1] == 0)[0]
+            start = zeros[-1] if len(zeros) else 0
+            self._rising_edges.append((mf[start:peak + 1], x[start:peak + 1]))
+
+            # Falling edge: from the peak down to the first zero after it
+            zeros = np.nonzero(mf[peak:] == 0)[0]
+            stop = peak + zeros[0] if len(zeros) else len(mf) - 1
+            self._falling_edges.append((mf[peak:stop + 1][::-1], x[peak:stop + 1][::-1]))
+
+    def _prepare_analytic_points(self):
+        """Breakpoints of the analytic output set that do not depend on the cut levels
+
+        These are the triangle vertices, the universe bounds and every crossing
+        of two sloped triangle edges, with the terms' memberships there. Where
+        a triangle edge is vertical the set jumps, so those vertices are kept
+        twice: with the limit from the left and from the right.
+        """
+        lo, hi = self.output_universe.min(), self.output_universe.max()
+        a, b, c = self.output_triangles.T
+        rising = b > a
+        falling = c > b
+
+        # Edges as lines y = slope * (x - a) + offset and y = slope * (c - x) + offset.
+        # A vertical edge is so steep a line through (a, 1) or (c, 1) that it
+        # is exact at every float, including its own x.
+        self._rising_slopes = np.where(rising, 1 / np.where(rising, b - a, 1), VERTICAL_SLOPE)
+        self._rising_offsets = np.where(rising, 0.0, 1.0)
+        self._falling_slopes = np.where(falling, 1 / np.where(falling, c - b, 1), VERTICAL_SLOPE)
+        self._falling_offsets = np.where(falling, 0.0, 1.0)
+
+        # Crossings of two sloped edges, written as y = m * x + q
+        m = np.concatenate([self._rising_slopes[rising], -self._falling_slopes[falling]])
+        q = np.concatenate([-a[rising] * self._rising_slopes[rising], c[falling] * self._falling_slopes[falling]])
+        i, j = np.triu_indices(len(m), k=1)
+        crossing = m[i] != m[j]
+        crossings = (q[j] - q[i])[crossing] / (m[i] - m[j])[crossing]
+
+        points = np.concatenate([self.output_triangles.ravel(), [lo, hi], crossings])
+        points = np.unique(points[(points >= lo) & (points <= hi)])
+        jumps = np.concatenate([a[~rising], c[~falling]])
+        jumps = np.unique(jumps[(jumps > lo) & (jumps < hi)])
+
+        # The stable sort in _analytic_set() keeps this order at equal x
+        left = self._memberships(jumps)
+        left[:, ~rising] *= jumps[:, None] > a[~rising]
+        right = self._memberships(jumps)
+        right[:, ~falling] *= jumps[:, None] < c[~falling]
+        self._static_points = np.concatenate([jumps, points, jumps])
+        self._static_memberships = np.concatenate([left, self._memberships(points), right])
+        self._n_leading = len(jumps) + len(points)
+
+    def _memberships(self, x):
+        """Exact membership of points ``x`` in every output triangle, (points, terms)"""
+        return np.stack([trimf(x, abc) for abc in self.output_triangles], axis=1)
+
+    def _analytic_set(self, cuts):
+        """aggregate_set() computed from the output triangles"""
+        rows = len(cuts)
+        lo, hi = self.output_universe.min(), self.output_universe.max()
+        a, b, c = self.output_triangles.T
+
+        # Where each term's edges reach each cut level: the clipped terms'
+        # corners and the points where one term rises above another's plateau
+        levels = cuts[:, None, :]
+        corners = np.concatenate([a[:, None] + levels * (b - a)[:, None],
+                                  c[:, None] - levels * (c - b)[:, None]], axis=1).reshape(rows, -1)
+        corners = np.clip(corners, lo, hi)
+
+        static = np.max(np.minimum(cuts[:, None, :], self._static_memberships), axis=2)
+        # Unclipped edge lines; the cut levels (<= 1) and initial=0 clip them
+        x = corners[:, :, None]
+        memberships = np.minimum((x - a) * self._rising_slopes + self._rising_offsets,
+                                 (c - x) * self._falling_slopes + self._falling_offsets)
+        dynamic = np.max(np.minimum(levels, memberships), axis=2, initial=0.0)
+        n = self._n_leading
+        # Corners go between the left and right limits of a jump at the same x
+        x = np.concatenate([np.broadcast_to(self._static_points[:n], (rows, n)), corners,
+                            np.broadcast_to(self._static_points[n:], (rows, len(self._static_points) - n))], axis=1)
+        y = np.concatenate([static[:, :n], dynamic, static[:, n:]], axis=1)
+        order = np.argsort(x, axis=1, kind='stable')
+        return np.take_along_axis(x, order, axis=1), np.take_along_axis(y, order, axis=1)
+
+    def fuzzify(self, inputs):
+        """Return one (rows, terms) membership array per input variable"""
+        memberships = []
+        for values, universe, mfs in zip(inputs, self.input_universes, self.input_mfs):
+            values = np.clip(values, universe.min(), universe.max())
+            memberships.append(np.stack([np.interp(values, universe, mf) for mf in mfs], axis=-1))
+        return memberships
+
+    def fire(self, memberships, rules=None):
+        """Return the (rows, rules) firing strength of every rule, or of the rule indices ``rules``"""
+        weights = self.rule_weights if rules is None else self.rule_weights[rules]
+        if not self.prune:
+            antecedents = self.rule_antecedents if rules is None else self.rule_antecedents[rules]
+            return antecedent_strengths(memberships, antecedents) * weights
+        if rules is None:
+            index = self._index
+        elif rules is self.scoring_rules:
+            index = self._scoring_index
+        else:
+            index = AntecedentIndex(self.rule_antecedents[rules], self.term_counts)
+        return index.strengths(memberships) * weights
+
+    def activate(self, strengths, rules=None):
+        """Return the (rows, output terms) cut level, max-accumulated over rules
+
+        ``strengths`` are those of the rule indices ``rules`` if given, as
+        returned by fire(memberships, rules).
+        """
+        if rules is None:
+            masks = self._consequent_masks
+        elif rules is self.scoring_rules:
+            masks = self._scoring_masks
+        else:
+            masks = [self.rule_consequents[rules] == t for t in range(len(self.output_mfs))]
+        cuts = np.zeros((len(strengths), len(self.output_mfs)))
+        for t, mask in enumerate(masks):
+            if mask.any():
+                cuts[:, t] = strengths[:, mask].max(axis=1)
+        return cuts
+
+    def aggregate(self, cuts, points):
+        """Evaluate the clipped, max-aggregated output set at ``points`` (rows, k)"""
+        result = np.zeros(points.shape)
+        for t, mf in enumerate(self.output_mfs):
+            clipped = np.minimum(cuts[:, t:t + 1], np.interp(points, self.output_universe, mf))
+            np.maximum(result, clipped, out=result)
+        return result
+
+    def aggregate_set(self, cuts):
+        """Sorted (x, y) points of the clipped, max-aggregated output set per row
+
+        Linear interpolation between the points is exact: they are the universe
+        grid plus every point where a clipped term leaves its slope, which is
+        where skfuzzy upsamples the output universe. With output triangles
+        they are the breakpoints of the exact set instead (see _analytic_set).
+        """
+        if self.output_triangles is not None:
+            return self._analytic_set(cuts)
+        rows = len(cuts)
+        grid = self.output_universe
+
+        # Aggregated set on the universe grid
+        on_grid = np.max(np.minimum(cuts[:, :, None], self.output_mfs[None, :, :]), axis=1)
+
+        # Points where each clipped term leaves its slope
+        edges = []
+        for t in range(len(self.output_mfs)):
+            edges.append(np.interp(cuts[:, t], *self._rising_edges[t]))
+            edges.append(np.interp(cuts[:, t], *self._falling_edges[t]))
+        edges = np.stack(edges, axis=1)
+
+        x = np.concatenate([np.broadcast_to(grid, (rows, len(grid))), edges], axis=1)
+        y = np.concatenate([on_grid, self.aggregate(cuts, edges)], axis=1)
+        order = np.argsort(x, axis=1, kind='stable')
+        return np.take_along_axis(x, order, axis=1), np.take_along_axis(y, order, axis=1)
+
+    def defuzzify(self, cuts):
+        """Crisp value of the aggregated output set for each row; NaN if it is empty"""
+        return _DEFUZZIFY[self.defuzzifier](*self.aggregate_set(cuts))
+
+    def _as_rows(self, inputs):
+        """Broadcast input arrays against each other and flatten them to rows"""
+        if len(inputs) != self.n_inputs:
+            raise ValueError(f"Expected {self.n_inputs} input arrays, got {len(inputs)}")
+        inputs = np.broadcast_arrays(*[np.atleast_1d(np.asarray(x, dtype=np.float64)) for x in inputs])
+        return inputs[0].shape, [x.ravel() for x in inputs]
+
+    def infer(self, *inputs):
+        """Full inference trace for each row, from a single pass
+
+        Returns a dict with the input ``memberships`` (one (rows, terms) array
+        per input), rule firing ``strengths`` (rows, rules), output term
+        ``cuts`` (rows, terms), the ``aggregate`` output set as sorted (x, y)
+        point arrays and the crisp ``score`` (NaN where no rule fires). Meant
+        for explaining small numbers of rows; use evaluate() for bulk scoring.
+        """
+        _, inputs = self._as_rows(inputs)
+        memberships = self.fuzzify(inputs)
+        strengths = self.fire(memberships)
+        cuts = self.activate(strengths)
+        x, y = self.aggregate_set(cuts)
+        return {
+            'memberships': memberships,
+            'strengths': strengths,
+            'cuts': cuts,
+            'aggregate': (x, y),
+            'score': _DEFUZZIFY[self.defuzzifier](x, y),
+        }
+
+    def evaluate(self, *inputs, return_strength=False):
+        """Crisp output for each row of the input arrays; NaN where no rule fires
+
+        With ``return_strength`` also returns the strongest cut level per row,
+        i.e. how firmly the rule base covers that input. Only scoring_rules
+        are evaluated; the cut levels are the same as with every rule.
+        """
+        shape, inputs = self._as_rows(inputs)
+
+        scores = np.empty(inputs[0].size)
+        strength = np.empty(inputs[0].size)
+        for start in range(0, scores.size, self.chunk_size):
+            chunk = [x[start:start + self.chunk_size] for x in inputs]
+            cuts = self.activate(self.fire(self.fuzzify(chunk), self.scoring_rules), self.scoring_rules)
+            scores[start:start + self.chunk_size] = self.defuzzify(cuts)
+            strength[start:start + self.chunk_size] = cuts.max(axis=1, initial=0.0)
+        if return_strength:
+            return scores.reshape(shape), strength.reshape(shape)
+        return scores.reshape(shape)
+
+
+class SharedEngine:
+    """Several MamdaniEngines evaluated together over the same inputs
+
+    Meant for variants of one model that differ in rules, weights, output
+    terms or defuzzifier. Engines with the same input membership functions
+    fuzzify each chunk once, and every distinct rule antecedent among them is
+    AND-ed once. Engines with the same output set and defuzzifier only
+    defuzzify the rows whose cut levels differ from the first of them, which
+    for variants differing in a few rules is a small part. As in evaluate(),
+    only each engine's scoring_rules count and antecedents using a term no
+    row of the chunk has membership in are skipped. Scores equal each
+    engine's own evaluate().
+    """
+
+    def __init__(self, engines, chunk_size=None):
+        self.engines = list(engines)
+        if not self.engines:
+            raise ValueError("Need at least one engine")
+        if len({engine.n_inputs for engine in self.engines}) > 1:
+            raise ValueError("All engines need the same number of inputs")
+        self.chunk_size = chunk_size or min(engine.chunk_size for engine in self.engines)
+
+        # (engine positions, AntecedentIndex of the distinct antecedents, per engine the antecedent of each rule)
+        groups = {}
+        for position, engine in enumerate(self.engines):
+            groups.setdefault(engine.input_fingerprint(), []).append(position)
+        self.groups = []
+        for positions in groups.values():
+            engines = [self.engines[p] for p in positions]
+            antecedents, inverse = np.unique(np.concatenate([e.rule_antecedents[e.scoring_rules] for e in engines]),
+                                             axis=0, return_inverse=True)
+            bounds = np.cumsum([0] + [len(e.scoring_rules) for e in engines])
+            self.groups.append((positions, AntecedentIndex(antecedents, engines[0].term_counts),
+                                [inverse.ravel()[start:stop] for start, stop in zip(bounds[:-1], bounds[1:])]))
+        outputs = {}
+        for position, engine in enumerate(self.engines):
+            outputs.setdefault(engine.output_fingerprint(), []).append(position)
+        self.outputs = list(outputs.values())
+
+    @property
+    def n_antecedents(self):
+        """Distinct antecedents evaluated per row at most, against sum(engine.n_rules) for separate engines"""
+        return sum(len(index) for _, index, _ in self.groups)
+
+    def evaluate(self, *inputs, return_strength=False):
+        """Crisp output of every engine for each row, shape (engines, *inputs); NaN where no rule fires
+
+        With ``return_strength`` also returns each engine's strongest cut level
+        per row, as MamdaniEngine.evaluate() does.
+        """
+        shape, inputs = self.engines[0]._as_rows(inputs)
+
+        scores = np.empty((len(self.engines), inputs[0].size))
+        strength = np.empty((len(self.engines), inputs[0].size))
+        for start in range(0, inputs[0].size, self.chunk_size):
+            rows = slice(start, start + self.chunk_size)
+            chunk = [x[rows] for x in inputs]
+            cuts = {}
+            for positions, antecedent_index, indices in self.groups:
+                degrees = antecedent_index.strengths(self.engines[positions[0]].fuzzify(chunk))
+                for position, index in zip(positions, indices):
+                    engine = self.engines[position]
+                    rules = engine.scoring_rules
+                    cuts[position] = engine.activate(degrees[:, index] * engine.rule_weights[rules], rules)
+                    strength[position, rows] = cuts[position].max(axis=1, initial=0.0)
+
+            for reference, *others in self.outputs:
+                engine = self.engines[reference]
+                scores[reference, rows] = engine.defuzzify(cuts[reference])
+                differing = [(position, (cuts[position] != cuts[reference]).any(axis=1)) for position in others]
+                for position, differs in differing:
+                    scores[position, rows] = scores[reference, rows]
+                # Rows whose cuts differ, of all engines in one call
+                pending = np.concatenate([cuts[position][differs] for position, differs in differing]
+                                         or [np.empty((0, len(engine.output_mfs)))])
+                if len(pending):
+                    values = engine.defuzzify(pending)
+                    offset = 0
+                    for position, differs in differing:
+                        count = int(differs.sum())
+                        scores[position, rows][differs] = values[offset:offset + count]
+                        offset += count
+        shape = (len(self.engines),) + shape
+        if return_strength:
+            return scores.reshape(shape), strength.reshape(shape)
+        return scores.reshape(shape)
+
+
+class AntecedentIndex:
+    """Rule antecedents indexed by the input terms they use
+
+    strengths() is antecedent_strengths(), except that an antecedent using a
+    term no row has membership in is zero without being evaluated. For one
+    row, or rows close together, only the antecedents around the inputs cost
+    anything, however many there are.
+    """
+
+    def __init__(self, antecedents, term_counts):
+        self.antecedents = np.asarray(antecedents, dtype=np.intp).reshape(-1, len(term_counts))
+        offsets = np.cumsum([0] + list(term_counts))
+        # Column of each used term among all inputs' terms; "input not used" is the extra last column
+        self.columns = np.where(self.antecedents >= 0, self.antecedents + offsets[:-1], offsets[-1])
+
+    def __len__(self):
+        return len(self.antecedents)
+
+    def strengths(self, memberships):
+        """(rows, antecedents) min of the input memberships each antecedent uses"""
+        rows = len(memberships[0])
+        mu = np.concatenate(memberships + [np.ones((rows, 1))], axis=1)
+        # An antecedent is live if every term it uses is non-zero on some row
+        live = (mu > 0).any(axis=0)[self.columns].all(axis=1)
+        columns = self.columns if live.all() else self.columns[live]
+        degrees = mu[:, columns[:, 0]]
+        for i in range(1, columns.shape[1]):
+            np.minimum(degrees, mu[:, columns[:, i]], out=degrees)
+        if len(columns) == len(self.columns):
+            return degrees
+        strengths = np.zeros((rows, len(self.columns)))
+        strengths[:, live] = degrees
+        return strengths
+
+
+def _hash_arrays(arrays, suffix=b''):
+    """SHA-1 hex digest of the shapes and contents of ``arrays``, then the bytes ``suffix``"""
+    digest = hashlib.sha1()
+    for array in arrays:
+        array = np.ascontiguousarray(array)
+        digest.update(str(array.shape).encode())
+        digest.update(array.tobytes())
+    digest.update(suffix)
+    return digest.hexdigest()
+
+
+def antecedent_strengths(memberships, antecedents):
+    """(rows, antecedents) min of the input memberships each antecedent uses
+
+    ``antecedents[r, i]`` is the term index of input ``i`` in antecedent ``r``,
+    ``-1`` when it does not use that input.
+    """
+    strengths = None
+    for i, mu in enumerate(memberships):
+        # Extra column of ones so that index -1 ("input not used") is neutral for min
+        mu = np.concatenate([mu, np.ones((len(mu), 1))], axis=1)
+        degrees = mu[:, antecedents[:, i]]
+        strengths = degrees if strengths is None else np.minimum(strengths, degrees)
+    return strengths
+
+
+def redundant_rules(antecedents, consequents, weights, input_mfs):
+    """Rules that can never change a score, as (rule, reason, other rule) in rule order
+
+    Reasons are 'unreachable' for rules using a term whose membership
+    function is zero over its whole universe (or with weight 0), 'duplicate'
+    for a repeat of the earlier rule ``other``, and 'dominated' when rule
+    ``other`` has the same consequent, a subset of the terms and at least the
+    same weight: its firing strength is then never lower, so under max
+    accumulation the dominated rule never raises the cut level. ``other`` is
+    None for unreachable rules and is never itself redundant.
+    """
+    antecedents = np.asarray(antecedents).reshape(len(consequents), len(input_mfs))
+    consequents, weights = np.asarray(consequents), np.asarray(weights)
+    # Extra False so that index -1 ("input not used") never makes a rule unreachable
+    dead = np.zeros(len(consequents), dtype=bool)
+    for i, mfs in enumerate(input_mfs):
+        dead |= np.append(~(np.asarray(mfs) > 0).any(axis=1), False)[antecedents[:, i]]
+    dead |= weights <= 0
+
+    # covers[b, a]: rule b uses at most the terms of rule a, so it fires at least as strongly
+    covers = np.all((antecedents[:, None, :] == -1) | (antecedents[:, None, :] == antecedents[None, :, :]), axis=2)
+    covers &= (consequents[:, None] == consequents[None, :]) & (weights[:, None] >= weights[None, :])
+    covers &= ~dead[:, None] & ~dead[None, :]
+    np.fill_diagonal(covers, False)
+    # Rules covering each other are duplicates; the first of them is kept
+    earlier = np.arange(len(consequents))[:, None] < np.arange(len(consequents))[None, :]
+    dominates = covers & (~covers.T | earlier)
+
+    redundant = []
+    removed = dead | dominates.any(axis=0)
+    for rule in np.nonzero(removed)[0].tolist():
+        if dead[rule]:
+            redundant.append((rule, 'unreachable', None))
+            continue
+        # Dominance is transitive, so some kept rule dominates every removed one
+        other = int(np.nonzero(dominates[:, rule] & ~removed)[0][0])
+        redundant.append((rule, 'duplicate' if covers[rule, other] else 'dominated', other))
+    return redundant
+
+
+def trimf(x, abc):
+    """Triangular membership function over ``x``; same values as skfuzzy.trimf"""
+    a, b, c = abc
+    if not a <= b <= c:
+        raise ValueError("Triangle parameters require a <= b <= c")
+    x = np.asarray(x)
+    y = np.zeros(len(x))
+    if a != b:
+        left = (a < x) & (x < b)
+        y[left] = (x[left] - a) / float(b - a)
+    if b != c:
+        right = (b < x) & (x < c)
+        y[right] = (c - x[right]) / float(c - b)
+    y[x == b] = 1
+    return y
+
+
+def _centroid(x, y):
+    """Exact centroid of piecewise-linear sets given as (rows, points) arrays; NaN if empty"""
+    x1, x2 = x[:, :-1], x[:, 1:]
+    y1, y2 = y[:, :-1], y[:, 1:]
+    width = x2 - x1
+    area = (0.5 * width * (y1 + y2)).sum(axis=1)
+    moment = (width * (x1 * (2 * y1 + y2) + x2 * (y1 + 2 * y2)) / 6.0).sum(axis=1)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(area > 0, moment / area, np.nan)
+
+
+def _bisector(x, y):
+    """Point splitting the area of piecewise-linear sets in two equal halves; NaN if empty"""
+    x1, x2 = x[:, :-1], x[:, 1:]
+    y1, y2 = y[:, :-1], y[:, 1:]
+    width = x2 - x1
+    cumulative = np.cumsum(0.5 * width * (y1 + y2), axis=1)
+    area = cumulative[:, -1]
+
+    # Segment holding the half-way point, and the area still needed inside it
+    segment = np.argmax(cumulative >= area[:, None] / 2, axis=1)[:, None]
+    before = np.take_along_axis(cumulative - 0.5 * width * (y1 + y2), segment, axis=1)[:, 0]
+    remaining = area / 2 - before
+    x1, y1, y2, width = [np.take_along_axis(v, segment, axis=1)[:, 0] for v in (x1, y1, y2, width)]
+
+    # Solve y1 * d + slope / 2 * d**2 = remaining for the offset d into the segment
+    # in the form that stays stable for flat segments
+    with np.errstate(invalid='ignore', divide='ignore'):
+        slope = np.where(width > 0, (y2 - y1) / width, 0.0)
+        denominator = y1 + np.sqrt(np.maximum(y1 * y1 + 2 * slope * remaining, 0.0))
+        offset = np.where(denominator > 0, 2 * remaining / denominator, 0.0)
+        return np.where(area > 0, x1 + offset, np.nan)
+
+
+def _maximum_mask(y):
+    """Per row: where the set reaches its height, and whether it is non-empty"""
+    height = y.max(axis=1, keepdims=True)
+    return (y >= height - 1e-12) & (height > 0), height[:, 0] > 0
+
+
+def _mean_of_maximum(x, y):
+    """Middle of the region where the sets reach their height; NaN if empty
+
+    Plateaus count by their length, so the result does not depend on how
+    densely the set is sampled (skfuzzy averages its sample points instead).
+    """
+    top, valid = _maximum_mask(y)
+    plateau = top[:, :-1] & top[:, 1:]
+    width = np.where(plateau, x[:, 1:] - x[:, :-1], 0.0)
+    length = width.sum(axis=1)
+    middle = (width * (x[:, 1:] + x[:, :-1]) / 2).sum(axis=1)
+    points = np.where(top, x, 0.0).sum(axis=1) / np.maximum(top.sum(axis=1), 1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        result = np.where(length > 0, middle / length, points)
+    return np.where(valid, result, np.nan)
+
+
+def _smallest_of_maximum(x, y):
+    """Smallest x where the sets reach their height; NaN if empty"""
+    top, valid = _maximum_mask(y)
+    return np.where(valid, np.where(top, x, np.inf).min(axis=1), np.nan)
+
+
+def _largest_of_maximum(x, y):
+    """Largest x where the sets reach their height; NaN if empty"""
+    top, valid = _maximum_mask(y)
+    return np.where(valid, np.where(top, x, -np.inf).max(axis=1), np.nan)
+
+
+_DEFUZZIFY = {
+    'centroid': _centroid,
+    'bisector': _bisector,
+    'mom': _mean_of_maximum,
+    'som': _smallest_of_maximum,
+    'lom': _largest_of_maximum,
+}
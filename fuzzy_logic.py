@@ -1,130 +1,668 @@
 import numpy as np
-import skfuzzy as fuzz
-from skfuzzy import control as ctrl
-import matplotlib.pyplot as plt
 import io
+import copy
+import os
 import base64
-from matplotlib.backends.backend_agg import FigureCanvasAgg as FigureCanvas
+import functools
+import operator
+import threading
+import itertools
+import time
+from fuzzy_delta import ModelDelta, same_structure
+from fuzzy_model import (compile_definition, compile_model, load_definition, universe_array,
+                         validate_definition)
+from fuzzy_sensitivity import nearest_reaching, sweep, threshold_crossings
+from fuzzy_surface import ScoreSurface
+from model_registry import DEFAULT_VARIANT, ModelRegistry
+from score_cache import ScoreCache
+
+# skfuzzy (which imports matplotlib.pyplot) and matplotlib are imported on
+# first use: scoring only needs numpy and the compiled MamdaniEngine.
+
+# The model scored when no other definition file is given
+DEFAULT_MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fuzzy_model.json')
 
 class UMKMFuzzyLogic:
-    def __init__(self):
-        self.setup_fuzzy_variables()
-        self.setup_rules()
-        self.setup_control_system()
+    # (minimum score, category, color), highest first
+    APPROVAL_CATEGORIES = [
+        (80, "Sangat Disetujui", "#10b981"),  # Green
+        (60, "Disetujui", "#3b82f6"),  # Blue
+        (40, "Pertimbangan", "#f59e0b"),  # Orange
+        (20, "Ditolak Rendah", "#ef4444"),  # Red
+        (float('-inf'), "Ditolak", "#dc2626"),  # Dark Red
+    ]
+    
+    # Variables every model definition must have: the inputs in this order, and the output
+    INPUT_LABELS = ('business_scale', 'risk_level', 'usage_priority')
+    OUTPUT_LABEL = 'approval_score'
+    
+    # skfuzzy objects, built by load_control_system() when first accessed
+    CONTROL_ATTRIBUTES = ('business_scale', 'risk_level', 'usage_priority', 'approval_score',
+                          'rules', 'approval_system', 'approval_simulation')
+    
+    # Visualization panels: (variable label, title, xlabel, marker, [(term, color, label)])
+    VISUALIZATION_PANELS = [
+        ('business_scale', 'Variabel Input: Skala Usaha', 'Nilai Skala (0-100)', 'Input',
+         [('mikro', 'b', 'Mikro'), ('kecil', 'g', 'Kecil'), ('menengah', 'r', 'Menengah')]),
+        ('risk_level', 'Variabel Input: Tingkat Risiko', 'Nilai Risiko (0-100)', 'Input',
+         [('rendah', 'b', 'Rendah'), ('sedang', 'g', 'Sedang'), ('tinggi', 'r', 'Tinggi')]),
+        ('usage_priority', 'Variabel Input: Prioritas Penggunaan', 'Nilai Prioritas (0-100)', 'Input',
+         [('rendah', 'b', 'Rendah'), ('sedang', 'g', 'Sedang'), ('tinggi', 'r', 'Tinggi')]),
+        ('approval_score', 'Variabel Output: Skor Persetujuan', 'Skor Persetujuan (0-100)', 'Output',
+         [('sangat_rendah', 'darkred', 'Sangat Rendah'), ('rendah', 'red', 'Rendah'),
+          ('sedang', 'orange', 'Sedang'), ('tinggi', 'lightgreen', 'Tinggi'),
+          ('sangat_tinggi', 'green', 'Sangat Tinggi')]),
+    ]
+    
+    def __init__(self, cache_size=1024, cache_ttl=None, inference_only=False, model_path=None):
+        """Compile the rule base for scoring
+        
+        The model is read from the definition file ``model_path`` (JSON or
+        YAML, see fuzzy_model.py), the bundled fuzzy_model.json by default.
+        
+        skfuzzy and matplotlib are loaded the first time the skfuzzy objects,
+        the reference simulation or the visualization are used. With
+        ``inference_only`` they are never loaded and those paths raise
+        RuntimeError instead.
+        """
+        self.inference_only = inference_only
+        self.model_path = model_path = model_path or DEFAULT_MODEL_PATH
+        self.surface = None
+        self.last_update = None
+        # The current model is variant DEFAULT_VARIANT; challengers are added with load_variant()
+        self.variants = ModelRegistry()
+        self.cache = ScoreCache(maxsize=cache_size, ttl=cache_ttl)
+        self.image_cache = ScoreCache(maxsize=128)
+        self._visualization = None
+        self._render_lock = threading.Lock()
+        self._simulation_lock = threading.Lock()
+        self._control_lock = threading.RLock()
+        self._reload_lock = threading.Lock()
+        self._model_stat = None
+        self._model_checked = 0.0
+        self._model_stat = _file_stat(model_path)
+        self.definition = self.check_definition(load_definition(model_path))
+        self.setup_batch_engine()
+    
+    @classmethod
+    def default_definition(cls):
+        """The bundled model definition (fuzzy_model.json), validated"""
+        return cls.check_definition(load_definition(DEFAULT_MODEL_PATH))
+    
+    @classmethod
+    def check_definition(cls, definition):
+        """Return ``definition`` if it has the variables this class scores, else raise ValueError
+        
+        Terms, universes and rules are free; the input variables (in order) and
+        the output variable must keep the names INPUT_LABELS and OUTPUT_LABEL.
+        """
+        expected = list(cls.INPUT_LABELS)
+        found = [spec['name'] for spec in definition['inputs']]
+        if found != expected:
+            raise ValueError(f"Model inputs must be {expected}, got {found}")
+        if definition['output']['name'] != cls.OUTPUT_LABEL:
+            raise ValueError(f"Model output must be '{cls.OUTPUT_LABEL}', "
+                             f"got '{definition['output']['name']}'")
+        return definition
+    
+    # The compiled model is swapped as a whole; these read the current one
+    @property
+    def engine(self):
+        return self.model.engine
+    
+    @property
+    def variables(self):
+        """label -> (universe, {term: membership function}), in model order"""
+        return self.model.variables
+    
+    @property
+    def model_fingerprint(self):
+        return self.model.fingerprint
+    
+    def __getattr__(self, name):
+        # Only called for missing attributes: build the skfuzzy objects on demand
+        if name in type(self).CONTROL_ATTRIBUTES:
+            self.load_control_system()
+            return self.__dict__[name]
+        raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+    
+    def load_control_system(self):
+        """Build the skfuzzy variables, rules and simulation from the model definition"""
+        if self.inference_only:
+            raise RuntimeError("skfuzzy is not available in inference-only mode")
+        with self._control_lock:
+            if 'approval_simulation' not in self.__dict__:
+                self.setup_fuzzy_variables()
+                self.setup_rules()
+                self.setup_control_system()
     
     def setup_fuzzy_variables(self):
         """Setup fuzzy variables for Mamdani inference"""
+        import skfuzzy as fuzz
+        from skfuzzy import control as ctrl
         
-        # Input variables
-        # Business Scale (0-100 points, where higher = larger scale)
-        self.business_scale = ctrl.Antecedent(np.arange(0, 101, 1), 'business_scale')
-        self.business_scale['mikro'] = fuzz.trimf(self.business_scale.universe, [0, 0, 40])
-        self.business_scale['kecil'] = fuzz.trimf(self.business_scale.universe, [20, 50, 80])
-        self.business_scale['menengah'] = fuzz.trimf(self.business_scale.universe, [60, 100, 100])
-        
-        # Risk Level (0-100, where higher = higher risk)
-        self.risk_level = ctrl.Antecedent(np.arange(0, 101, 1), 'risk_level')
-        self.risk_level['rendah'] = fuzz.trimf(self.risk_level.universe, [0, 0, 40])
-        self.risk_level['sedang'] = fuzz.trimf(self.risk_level.universe, [20, 50, 80])
-        self.risk_level['tinggi'] = fuzz.trimf(self.risk_level.universe, [60, 100, 100])
-        
-        # Usage Priority (0-100, where higher = higher priority)
-        self.usage_priority = ctrl.Antecedent(np.arange(0, 101, 1), 'usage_priority')
-        self.usage_priority['rendah'] = fuzz.trimf(self.usage_priority.universe, [0, 0, 40])
-        self.usage_priority['sedang'] = fuzz.trimf(self.usage_priority.universe, [20, 50, 80])
-        self.usage_priority['tinggi'] = fuzz.trimf(self.usage_priority.universe, [60, 100, 100])
-        
-        # Output variable: Credit Approval Score (0-100)
-        self.approval_score = ctrl.Consequent(np.arange(0, 101, 1), 'approval_score')
-        self.approval_score['sangat_rendah'] = fuzz.trimf(self.approval_score.universe, [0, 0, 20])
-        self.approval_score['rendah'] = fuzz.trimf(self.approval_score.universe, [10, 30, 50])
-        self.approval_score['sedang'] = fuzz.trimf(self.approval_score.universe, [40, 60, 80])
-        self.approval_score['tinggi'] = fuzz.trimf(self.approval_score.universe, [70, 90, 100])
-        self.approval_score['sangat_tinggi'] = fuzz.trimf(self.approval_score.universe, [90, 100, 100])
+        for spec in self.definition['inputs']:
+            variable = ctrl.Antecedent(universe_array(spec['universe']), spec['name'])
+            for term, abc in spec['terms'].items():
+                variable[term] = fuzz.trimf(variable.universe, abc)
+            setattr(self, spec['name'], variable)
+        
+        spec = self.definition['output']
+        variable = ctrl.Consequent(universe_array(spec['universe']), spec['name'],
+                                   defuzzify_method=self.definition['defuzzification']['method'])
+        for term, abc in spec['terms'].items():
+            variable[term] = fuzz.trimf(variable.universe, abc)
+        setattr(self, spec['name'], variable)
     
     def setup_rules(self):
         """Setup fuzzy rules for Mamdani inference"""
+        from skfuzzy import control as ctrl
         
-        rules = [
-            # Rules for high approval
-            ctrl.Rule(self.business_scale['menengah'] & self.risk_level['rendah'] & self.usage_priority['tinggi'], 
-                     self.approval_score['sangat_tinggi']),
-            ctrl.Rule(self.business_scale['menengah'] & self.risk_level['rendah'] & self.usage_priority['sedang'], 
-                     self.approval_score['tinggi']),
-            ctrl.Rule(self.business_scale['kecil'] & self.risk_level['rendah'] & self.usage_priority['tinggi'], 
-                     self.approval_score['tinggi']),
-            
-            # Rules for medium-high approval
-            ctrl.Rule(self.business_scale['menengah'] & self.risk_level['sedang'] & self.usage_priority['tinggi'], 
-                     self.approval_score['tinggi']),
-            ctrl.Rule(self.business_scale['kecil'] & self.risk_level['rendah'] & self.usage_priority['sedang'], 
-                     self.approval_score['sedang']),
-            ctrl.Rule(self.business_scale['menengah'] & self.risk_level['rendah'] & self.usage_priority['rendah'], 
-                     self.approval_score['sedang']),
-            
-            # Rules for medium approval
-            ctrl.Rule(self.business_scale['kecil'] & self.risk_level['sedang'] & self.usage_priority['sedang'], 
-                     self.approval_score['sedang']),
-            ctrl.Rule(self.business_scale['mikro'] & self.risk_level['rendah'] & self.usage_priority['tinggi'], 
-                     self.approval_score['sedang']),
-            ctrl.Rule(self.business_scale['kecil'] & self.risk_level['tinggi'] & self.usage_priority['tinggi'], 
-                     self.approval_score['sedang']),
-            
-            # Rules for medium-low approval
-            ctrl.Rule(self.business_scale['kecil'] & self.risk_level['sedang'] & self.usage_priority['rendah'], 
-                     self.approval_score['rendah']),
-            ctrl.Rule(self.business_scale['mikro'] & self.risk_level['sedang'] & self.usage_priority['sedang'], 
-                     self.approval_score['rendah']),
-            ctrl.Rule(self.business_scale['kecil'] & self.risk_level['tinggi'] & self.usage_priority['sedang'], 
-                     self.approval_score['rendah']),
-            
-            # Rules for low approval
-            ctrl.Rule(self.business_scale['mikro'] & self.risk_level['tinggi'] & self.usage_priority['rendah'], 
-                     self.approval_score['sangat_rendah']),
-            ctrl.Rule(self.business_scale['mikro'] & self.risk_level['tinggi'] & self.usage_priority['sedang'], 
-                     self.approval_score['rendah']),
-            ctrl.Rule(self.business_scale['mikro'] & self.risk_level['sedang'] & self.usage_priority['rendah'], 
-                     self.approval_score['rendah']),
-        ]
+        inputs = {spec['name']: getattr(self, spec['name']) for spec in self.definition['inputs']}
+        output = getattr(self, self.definition['output']['name'])
+        rules = []
+        for rule in self.definition['rules']:
+            terms = [inputs[label][term] for label, term in rule['if'].items()]
+            consequent = output[rule['then']]
+            if rule['weight'] != 1.0:
+                consequent = consequent % rule['weight']
+            rules.append(ctrl.Rule(functools.reduce(operator.and_, terms), consequent))
         
         self.rules = rules
     
     def setup_control_system(self):
         """Setup the control system"""
+        from skfuzzy import control as ctrl
+        
         self.approval_system = ctrl.ControlSystem(self.rules)
+        # skfuzzy keeps per-run state on the shared Term/Rule objects, so the
+        # simulation is only used as a reference, one caller at a time
         self.approval_simulation = ctrl.ControlSystemSimulation(self.approval_system)
     
+    def setup_batch_engine(self):
+        """Compile the rule base into index arrays for vectorized inference
+        
+        Compiles the skfuzzy objects when they have been built (they may have
+        been edited since), the model definition otherwise. skfuzzy objects
+        only hold sampled membership functions, so they always compile to a
+        sampled output set.
+        """
+        if 'rules' in self.__dict__:
+            variables, rules = self._control_system_model()
+            method = getattr(self, self.definition['output']['name']).defuzzify_method
+            self.install_model(compile_model(variables, rules, method))
+        else:
+            self.install_model(compile_definition(self.definition))
+    
+    def install_model(self, model):
+        """Make the CompiledModel ``model`` the one used for scoring
+        
+        The swap is a single assignment: calls already running keep the model
+        they started with, later calls get the new one.
+        
+        Cache keys carry the model fingerprint, so results of other models stay
+        cached (switching back to one is free). Results and images of inputs
+        the change cannot affect (see fuzzy_delta.py) are copied to the new
+        model, and a compiled surface is patched where it changed instead of
+        dropped. ``self.last_update`` tells what changed and what was kept.
+        """
+        previous = self.__dict__.get('model')
+        update = {'changes': None, 'cache_kept': 0, 'cache_dropped': 0, 'images_kept': 0, 'surface_nodes': None}
+        if previous is not None and previous.fingerprint != model.fingerprint:
+            delta = ModelDelta(previous, model)
+            update['changes'] = delta.summary()
+            if not delta.full:
+                surfaces = None
+                surface = self.surface
+                if surface is not None and surface.fingerprint == previous.fingerprint:
+                    self.surface, update['surface_nodes'] = surface.patch(model.engine, delta)
+                    surfaces = (surface, self.surface)
+                self._carry_over(delta, update, surfaces)
+        self.model = model
+        self.variants.register(DEFAULT_VARIANT, model)
+        
+        # A surface of another model no longer applies
+        if self.surface is not None and self.surface.fingerprint != model.fingerprint:
+            self.surface = None
+        self.last_update = update
+    
+    def _carry_over(self, delta, update, surfaces=None):
+        """Copy cached results and images of inputs ``delta`` does not affect to the new model's keys
+        
+        With ``surfaces``, the (old, patched) compiled surface scores are taken
+        from, inputs whose interpolated score changed count as affected too.
+        """
+        old, new = delta.old.fingerprint, delta.new.fingerprint
+        results = [(key, value) for key, value in self.cache.items() if key[0] == old]
+        # Images show the membership functions, so they only carry over when those are unchanged
+        images = [] if delta.variables_changed else [(key, png) for key, png in self.image_cache.items()
+                                                     if key[0] == old]
+        if not results and not images:
+            return
+        inputs = np.array([key[1:4] for key, _ in results + images], dtype=np.float64)
+        affected = delta.affected(inputs[:, 0], inputs[:, 1], inputs[:, 2])
+        if surfaces is not None:
+            # A patched node moves the score of every input in its cells
+            old_scores, new_scores = (surface.lookup(inputs[:, 0], inputs[:, 1], inputs[:, 2]) for surface in surfaces)
+            affected |= ~((old_scores == new_scores) | (np.isnan(old_scores) & np.isnan(new_scores)))
+        
+        for (key, value), changed in zip(results, affected[:len(results)]):
+            if changed:
+                update['cache_dropped'] += 1
+                continue
+            if len(key) == 4 and isinstance(value, dict) and not delta.analysis_compatible:
+                # Rule list or output terms changed: the score holds, the rule-by-rule analysis does not
+                value = {name: item for name, item in value.items() if name != 'detailed_analysis'}
+                key += ('summary',)
+            self.cache.put((new,) + key[1:], value)
+            update['cache_kept'] += 1
+        for (key, png), changed in zip(images, affected[len(results):]):
+            if not changed:
+                self.image_cache.put((new,) + key[1:], png)
+                update['images_kept'] += 1
+    
+    def load_model(self, path):
+        """Load, validate and compile a definition file, then swap it in atomically
+        
+        Raises ValueError (OSError if unreadable) and keeps the current model
+        when the definition is invalid. Returns the new CompiledModel.
+        """
+        stat = _file_stat(path)
+        definition = self.check_definition(load_definition(path))
+        model = compile_definition(definition)
+        with self._control_lock:
+            # skfuzzy objects of the old definition are rebuilt on next use
+            for name in self.CONTROL_ATTRIBUTES:
+                self.__dict__.pop(name, None)
+            self.definition = definition
+            self.model_path = path
+            self._model_stat = stat
+            self.install_model(model)
+        return model
+    
+    def update_definition(self, definition):
+        """Validate and compile an edited model definition, then swap it in
+        
+        Like load_model() for a definition changed in memory (see set_term(),
+        set_rule() and add_rule()): results, images and surface nodes the edit
+        cannot affect are kept. Raises ValueError and keeps the current model
+        when the definition is invalid. Returns ``self.last_update``.
+        """
+        definition = self.check_definition(validate_definition(definition))
+        model = compile_definition(definition)
+        with self._control_lock:
+            for name in self.CONTROL_ATTRIBUTES:
+                self.__dict__.pop(name, None)
+            self.definition = definition
+            self.install_model(model)
+            return self.last_update
+    
+    def set_term(self, variable, term, abc):
+        """Set the triangle [a, b, c] of one term of a variable (a new term is appended)"""
+        with self._control_lock:
+            definition = copy.deepcopy(self.definition)
+            specs = {spec['name']: spec for spec in definition['inputs'] + [definition['output']]}
+            if variable not in specs:
+                raise ValueError(f"Unknown variable '{variable}'")
+            specs[variable]['terms'][term] = list(abc)
+            return self.update_definition(definition)
+    
+    def set_rule(self, index, rule):
+        """Replace the rule at ``index`` (0-based, in definition order), or remove it when ``rule`` is None"""
+        with self._control_lock:
+            definition = copy.deepcopy(self.definition)
+            if not 0 <= index < len(definition['rules']):
+                raise ValueError(f"No rule at index {index}; the model has {len(definition['rules'])}")
+            if rule is None:
+                del definition['rules'][index]
+            else:
+                definition['rules'][index] = rule
+            return self.update_definition(definition)
+    
+    def add_rule(self, rule):
+        """Append a rule ({'if': {variable: term}, 'then': term}, optional 'weight')"""
+        with self._control_lock:
+            definition = copy.deepcopy(self.definition)
+            definition['rules'].append(rule)
+            return self.update_definition(definition)
+    
+    def reload_if_changed(self, min_interval=0.0):
+        """Reload the definition file if it changed since it was loaded
+        
+        Checks at most every ``min_interval`` seconds, and only in one thread
+        at a time; other callers carry on with the current model meanwhile.
+        Returns True when a new model was installed. A file that fails to load
+        raises ValueError once and is not retried until it changes again.
+        """
+        if not self.model_path or time.monotonic() - self._model_checked < min_interval:
+            return False
+        if not self._reload_lock.acquire(blocking=False):
+            return False
+        try:
+            self._model_checked = time.monotonic()
+            stat = _file_stat(self.model_path)
+            if stat == self._model_stat:
+                return False
+            self._model_stat = stat
+            self.load_model(self.model_path)
+            return True
+        finally:
+            self._reload_lock.release()
+    
+    def load_variant(self, name, path, active=True):
+        """Load, validate and compile a definition file as the model variant ``name``
+        
+        Variants are selected per call with ``variant`` (see evaluate()) and
+        scored side by side by calculate_variant_scores(). Raises ValueError
+        (OSError if unreadable). Returns the CompiledModel.
+        """
+        if name == DEFAULT_VARIANT:
+            raise ValueError(f"'{DEFAULT_VARIANT}' is the current model, use load_model() to replace it")
+        model = compile_definition(self.check_definition(load_definition(path)))
+        self.variants.register(name, model, active)
+        return model
+    
+    def variant_model(self, variant=None):
+        """CompiledModel of ``variant``, the current model for None; ValueError if unknown"""
+        if variant is None or variant == DEFAULT_VARIANT:
+            return self.model
+        return self.variants.get(variant)
+    
+    def calculate_variant_scores(self, scale_values, risk_values, priority_values, variants=None):
+        """{variant: scores} of every active model variant (or ``variants``), in one shared pass
+        
+        Variants share the fuzzified inputs and rule antecedents, see
+        fuzzy_engine.SharedEngine. NaN where none of a variant's rules fire.
+        The variant the compiled surface belongs to is scored from it, as in
+        calculate_approval_scores().
+        """
+        scores = self.variants.evaluate(scale_values, risk_values, priority_values, names=variants)
+        surface = self.surface
+        if surface is None:
+            return scores
+        for name, values in scores.items():
+            if self.variants.get(name).fingerprint == surface.fingerprint:
+                approx = surface.lookup(scale_values, risk_values, priority_values)
+                scores[name] = np.where(np.isnan(approx), values, approx)
+        return scores
+    
+    def _control_system_model(self):
+        """Variables and rules read from the skfuzzy objects, in definition_model()'s format"""
+        inputs = [getattr(self, spec['name']) for spec in self.definition['inputs']]
+        output = getattr(self, self.definition['output']['name'])
+        variables = [(var.label, var.universe, {term: var[term].mf for term in var.terms})
+                     for var in inputs + [output]]
+        input_labels = [var.label for var in inputs]
+        
+        rules = []
+        for rule_id, rule in enumerate(self.rules, start=1):
+            _check_and_only(rule.antecedent)
+            antecedent = [None] * len(inputs)
+            for term in rule.antecedent_terms:
+                antecedent[input_labels.index(term.parent.label)] = term.label
+            # A rule with several consequents fires each of them with the same strength
+            for weighted_term in rule.consequent:
+                rules.append((rule_id, antecedent, weighted_term.term.label, weighted_term.weight))
+        return variables, rules
+    
+    def rebuild(self):
+        """Recompile after rules or membership functions were changed"""
+        if 'rules' in self.__dict__:
+            self.setup_control_system()
+        self.setup_batch_engine()
+    
+    def compile_surface(self, resolution=101, path=None, min_strength=0.1):
+        """Switch scoring to a precomputed surface answered by trilinear interpolation
+        
+        The surface is evaluated on ``resolution`` points per input; its maximum
+        error against exact inference is available as ``self.surface.max_error``.
+        Inputs where the rule base fires weaker than ``min_strength`` are still
+        computed exactly. With ``path`` the surface is loaded from (or built and
+        saved to) an .npy file that is memory-mapped, so worker processes share
+        one copy.
+        """
+        if path:
+            self.surface = ScoreSurface.load_or_build(path, self.engine, resolution, min_strength)
+        else:
+            self.surface = ScoreSurface.build(self.engine, resolution, min_strength)
+        # Interpolated scores differ slightly from the exact ones already cached
+        self.cache.clear()
+        return self.surface
+    
+    def _surface_score(self, model, scale_value, risk_value, priority_value):
+        """Score of one input from the compiled surface of ``model``; NaN when there is none or it cannot answer"""
+        surface = self.surface
+        if surface is None or surface.fingerprint != model.fingerprint:
+            return float('nan')
+        return float(surface.lookup(scale_value, risk_value, priority_value)[0])
+    
     def calculate_approval_score(self, scale_value, risk_value, priority_value):
-        """Calculate approval score using Mamdani inference"""
+        """Calculate approval score using Mamdani inference
+        
+        Runs on the stateless batch engine, so any number of threads can score
+        concurrently. Raises ValueError when no rule fires, like skfuzzy.
+        """
+        
+        model = self.model
         
-        # Reset the simulation
-        self.approval_simulation.reset()
+        # Compiled surface answers in O(1); NaN means it touched a cell without
+        # firing rules, so fall through to exact inference
+        approval_score = self._surface_score(model, scale_value, risk_value, priority_value)
+        if not np.isnan(approval_score):
+            return approval_score
         
-        # Set input values
-        self.approval_simulation.input['business_scale'] = scale_value
-        self.approval_simulation.input['risk_level'] = risk_value
-        self.approval_simulation.input['usage_priority'] = priority_value
+        approval_score = model.engine.evaluate(scale_value, risk_value, priority_value)[0]
+        if np.isnan(approval_score):
+            raise _no_rule_fires(scale_value, risk_value, priority_value)
         
-        # Compute the result
-        self.approval_simulation.compute()
+        return float(approval_score)
+    
+    def reference_approval_score(self, scale_value, risk_value, priority_value):
+        """Calculate approval score with skfuzzy's ControlSystemSimulation
+        
+        Serialised behind a lock; used to verify the batch engine.
+        """
+        simulation = self.approval_simulation
+        with self._simulation_lock:
+            # Reset the simulation
+            simulation.reset()
+            
+            # Set input values
+            simulation.input['business_scale'] = scale_value
+            simulation.input['risk_level'] = risk_value
+            simulation.input['usage_priority'] = priority_value
+            
+            # Compute the result
+            simulation.compute()
+            
+            # Get the approval score
+            return simulation.output['approval_score']
+    
+    def calculate_approval_scores(self, scale_values, risk_values, priority_values):
+        """Calculate approval scores for arrays of applicants in one vectorized pass
+        
+        Matches reference_approval_score to within fuzzy_engine.SKFUZZY_TOLERANCE.
+        Rows for which no rule fires are NaN instead of raising ValueError.
+        With a compiled surface, rows it cannot answer fall back to the engine.
+        """
+        model = self.model
+        surface = self.surface
+        if surface is None or surface.fingerprint != model.fingerprint:
+            return model.engine.evaluate(scale_values, risk_values, priority_values)
+        
+        scores = surface.lookup(scale_values, risk_values, priority_values)
+        missing = np.isnan(scores)
+        if missing.any():
+            inputs = np.broadcast_arrays(*[np.asarray(x, dtype=np.float64)
+                                           for x in (scale_values, risk_values, priority_values)])
+            scores[missing] = model.engine.evaluate(*[np.broadcast_to(x, scores.shape)[missing] for x in inputs])
+        return scores
+    
+    def evaluate(self, scale_value, risk_value, priority_value, detailed=True, variant=None, model=None):
+        """Score, category, recommendations and detailed analysis for one input triple
+        
+        With ``detailed=False`` the rule-by-rule ``detailed_analysis`` is not
+        computed and the score comes from the compiled surface when there is
+        one; a detailed result is scored by the inference it explains. Results
+        are memoized per model in ``self.cache`` and shared between callers,
+        so treat them as read-only. ``variant`` scores with a model variant
+        instead of the current model, ``model`` with that CompiledModel (as
+        returned by variant_model()). Raises ValueError when no rule fires
+        or the variant is unknown.
+        """
+        model = model or self.variant_model(variant)
+        key = (model.fingerprint, float(scale_value), float(risk_value), float(priority_value))
+        if not detailed:
+            key += ('summary',)
+        result = self.cache.get(key)
+        if result is None:
+            try:
+                result = self._evaluate(scale_value, risk_value, priority_value, model, detailed)
+            except ValueError as e:
+                # Uncovered inputs are just as deterministic; remember the message
+                result = str(e)
+            self.cache.put(key, result)
+        if isinstance(result, str):
+            raise ValueError(result)
+        return result
+    
+    def _evaluate(self, scale_value, risk_value, priority_value, model=None, detailed=True):
+        """Uncached evaluate()
+        
+        A detailed result takes its score and analysis from one inference pass
+        of ``model``, so the explanation always matches the score. Otherwise the
+        score is the one calculate_approval_score() gives: from the compiled
+        surface when it belongs to ``model``.
+        """
+        model = model or self.model
+        if detailed:
+            inference = model.engine.infer(scale_value, risk_value, priority_value)
+            approval_score = float(inference['score'][0])
+        else:
+            approval_score = self._surface_score(model, scale_value, risk_value, priority_value)
+            if np.isnan(approval_score):
+                approval_score = float(model.engine.evaluate(scale_value, risk_value, priority_value)[0])
+        if np.isnan(approval_score):
+            raise _no_rule_fires(scale_value, risk_value, priority_value)
+        approval_category, approval_color = self.get_approval_category(approval_score)
+        result = {
+            'approval_score': approval_score,
+            'approval_category': approval_category,
+            'approval_color': approval_color,
+            'recommendations': self.get_recommendations(approval_score, scale_value, risk_value, priority_value),
+        }
+        if detailed:
+            result['detailed_analysis'] = self.get_detailed_analysis(scale_value, risk_value, priority_value,
+                                                                     approval_score, inference, model)
+        return result
+    
+    def warm_up(self, scale_values, risk_values, priority_values):
+        """Pre-fill the cache with every combination of the given input values
+        
+        Returns the number of combinations evaluated.
+        """
+        count = 0
+        for scale_value, risk_value, priority_value in itertools.product(
+                set(scale_values), set(risk_values), set(priority_values)):
+            try:
+                self.evaluate(scale_value, risk_value, priority_value)
+            except ValueError:
+                pass  # Cached as uncovered
+            count += 1
+        return count
+    
+    def sensitivity(self, scale_value, risk_value, priority_value, vary=('risk_level',), points=101,
+                    ranges=None):
+        """What-if sweep of one or two inputs around an application
+        
+        ``vary`` names the input labels to sweep, each over ``points`` values
+        spanning its universe or ``ranges[label] = (min, max)``. The grid is
+        scored exactly (not through the compiled surface) in one batched pass.
+        
+        Returns a JSON-ready dict with the ``base`` application, the swept
+        ``axes``, the ``scores`` and ``categories`` grids (None where no rule
+        fires), the partial ``derivatives`` of the score along each swept input
+        (score points per input point), every ``crossings`` of a category
+        threshold and, for each swept input, the ``targets``: the closest value
+        at which the score reaches each category.
+        """
+        model = self.model
+        labels = list(model.input_labels)
+        vary = [vary] if isinstance(vary, str) else list(vary)
+        if not 1 <= len(vary) <= 2 or len(set(vary)) != len(vary):
+            raise ValueError("Sweep one or two different inputs")
+        unknown = [label for label in vary if label not in labels]
+        if unknown:
+            raise ValueError(f"Unknown input {unknown[0]!r}, expected one of {labels}")
+        
+        ranges = ranges or {}
+        if any(label not in vary for label in ranges):
+            raise ValueError(f"Ranges given for inputs that are not swept: {sorted(set(ranges) - set(vary))}")
+        
+        base = [float(scale_value), float(risk_value), float(priority_value)]
+        bounds = model.engine.input_bounds
+        axes = {}
+        for label in vary:
+            lo, hi = ranges.get(label, bounds[labels.index(label)])
+            axes[labels.index(label)] = np.linspace(float(lo), float(hi), int(points))
+        result = sweep(model.engine, base, axes)
+        scores = result['scores']
         
-        # Get the approval score
-        approval_score = self.approval_simulation.output['approval_score']
+        thresholds = [minimum for minimum, _, _ in self.APPROVAL_CATEGORIES[:-1]]
+        names = [category for _, category, _ in self.APPROVAL_CATEGORIES]
+        crossings = []
+        for position, (index, values) in enumerate(axes.items()):
+            for node, t, value, rising in threshold_crossings(values, scores, thresholds, axis=position):
+                crossing = {
+                    'input': labels[index],
+                    'value': value,
+                    'threshold': thresholds[t],
+                    'direction': 'up' if rising else 'down',
+                    'from': names[t + 1] if rising else names[t],
+                    'to': names[t] if rising else names[t + 1],
+                }
+                others = [(i, n) for i, n in zip(axes, node) if i != index]
+                if others:
+                    crossing['at'] = {labels[i]: float(axes[i][n]) for i, n in others}
+                crossings.append(crossing)
         
-        return approval_score
+        targets = {}
+        if len(axes) == 1:
+            (index, values), = axes.items()
+            for threshold, category in zip(thresholds, names):
+                value = nearest_reaching(values, scores, threshold, base[index], result['base_score'])
+                targets[category] = None if value is None else {'value': value, 'change': value - base[index]}
+            targets = {labels[index]: targets}
+        
+        base_score = result['base_score']
+        return {
+            'base': {
+                **dict(zip(labels, base)),
+                model.output_label: None if np.isnan(base_score) else base_score,
+                'approval_category': None if np.isnan(base_score) else self.get_approval_category(base_score)[0],
+            },
+            'axes': {labels[index]: values.tolist() for index, values in axes.items()},
+            'scores': _nan_to_none(scores),
+            'categories': np.where(np.isnan(scores), None, self.get_approval_categories(scores)).tolist(),
+            'derivatives': {labels[index]: _nan_to_none(gradient)
+                            for index, gradient in zip(axes, result['gradients'])},
+            'crossings': crossings,
+            'targets': targets,
+        }
     
     def get_approval_category(self, score):
         """Get approval category based on score"""
-        if score >= 80:
-            return "Sangat Disetujui", "#10b981"  # Green
-        elif score >= 60:
-            return "Disetujui", "#3b82f6"  # Blue
-        elif score >= 40:
-            return "Pertimbangan", "#f59e0b"  # Orange
-        elif score >= 20:
-            return "Ditolak Rendah", "#ef4444"  # Red
-        else:
-            return "Ditolak", "#dc2626"  # Dark Red
+        for minimum, category, color in self.APPROVAL_CATEGORIES[:-1]:
+            if score >= minimum:
+                return category, color
+        return self.APPROVAL_CATEGORIES[-1][1:]
+    
+    def get_approval_categories(self, scores):
+        """Vectorized get_approval_category: category names for an array of scores, '' for NaN"""
+        scores = np.asarray(scores, dtype=np.float64)
+        conditions = [scores >= minimum for minimum, _, _ in self.APPROVAL_CATEGORIES]
+        names = [category for _, category, _ in self.APPROVAL_CATEGORIES]
+        return np.select(conditions, names, default='')
     
     def get_recommendations(self, score, scale, risk, priority):
         """Get recommendations based on fuzzy logic results"""
@@ -152,7 +690,13 @@ class UMKMFuzzyLogic:
         return recommendations
     
     def scale_to_fuzzy_value(self, scale):
-        """Convert business scale to fuzzy value (0-100)"""
+        """Convert business scale to fuzzy value (0-100)
+        
+        ``scale`` is a position (0-1) from UMKMDataProcessor.get_scale_level()
+        or a scale name, mapped to the middle of its range.
+        """
+        if not isinstance(scale, str):
+            return scale * 100
         scale_mapping = {
             "Mikro": 16.5,  # Middle of mikro range
             "Kecil": 50,    # Middle of kecil range  
@@ -168,115 +712,215 @@ class UMKMFuzzyLogic:
         """Convert priority (0-1) to fuzzy value (0-100)"""
         return priority * 100
     
-    def generate_fuzzy_visualization(self, scale_value, risk_value, priority_value, approval_score):
-        """Generate fuzzy logic visualization as base64 image"""
-        # Set matplotlib to use non-interactive backend
-        plt.switch_backend('Agg')
+    def get_visualization_panels(self, model=None):
+        """Variables shown in the visualization: (variable label, title, xlabel, marker, [(term, color, label)])
         
-        # Create figure with subplots
-        fig, axes = plt.subplots(2, 2, figsize=(14, 10))
+        Terms come from ``model`` (the current one by default); terms without a
+        style below get matplotlib's next color and their name as label.
+        """
+        model = model or self.model
+        panels = []
+        for variable, title, xlabel, marker, styles in self.VISUALIZATION_PANELS:
+            styles = {term: (color, label) for term, color, label in styles}
+            terms = [(term, *styles.get(term, (None, term.replace('_', ' ').title())))
+                     for term in model.variables[variable][1]]
+            panels.append((variable, title, xlabel, marker, terms))
+        return panels
+    
+    def get_membership_curves(self, model=None):
+        """Membership functions of every variable as plain lists, for client-side charts"""
+        model = model or self.model
+        curves = {}
+        for variable, title, xlabel, marker, terms in self.get_visualization_panels(model):
+            universe, mfs = model.variables[variable]
+            curves[variable] = {
+                'title': title,
+                'xlabel': xlabel,
+                'universe': universe.tolist(),
+                'terms': {term: {'label': label, 'color': color, 'membership': mfs[term].tolist()}
+                          for term, color, label in terms},
+            }
+        return curves
+    
+    def _build_visualization_background(self, model):
+        """Draw the static membership-function figure of ``model`` once and keep its pixels"""
+        if self.inference_only:
+            raise RuntimeError("Visualization is not available in inference-only mode")
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg as FigureCanvas
+        
+        fig = Figure(figsize=(14, 10), dpi=100)
+        canvas = FigureCanvas(fig)
+        axes = fig.subplots(2, 2)
         fig.suptitle('Visualisasi Logika Fuzzy - Evaluasi Kredit UMKM', fontsize=16, fontweight='bold', color='black')
         fig.patch.set_facecolor('#ffffff')
         
-        # Plot 1: Business Scale
-        ax1 = axes[0, 0]
-        ax1.set_facecolor('#ffffff')
-        ax1.plot(self.business_scale.universe, self.business_scale['mikro'].mf, 'b', linewidth=2, label='Mikro')
-        ax1.plot(self.business_scale.universe, self.business_scale['kecil'].mf, 'g', linewidth=2, label='Kecil')
-        ax1.plot(self.business_scale.universe, self.business_scale['menengah'].mf, 'r', linewidth=2, label='Menengah')
-        ax1.axvline(x=scale_value, color='black', linestyle='--', alpha=0.7, label=f'Input: {scale_value:.1f}')
-        ax1.set_title('Variabel Input: Skala Usaha')
-        ax1.set_xlabel('Nilai Skala (0-100)')
-        ax1.set_ylabel('Derajat Keanggotaan')
-        ax1.legend()
-        ax1.grid(True, alpha=0.3)
-        ax1.set_ylim([0, 1.1])
-        
-        # Plot 2: Risk Level
-        ax2 = axes[0, 1]
-        ax2.set_facecolor('#ffffff')
-        ax2.plot(self.risk_level.universe, self.risk_level['rendah'].mf, 'b', linewidth=2, label='Rendah')
-        ax2.plot(self.risk_level.universe, self.risk_level['sedang'].mf, 'g', linewidth=2, label='Sedang')
-        ax2.plot(self.risk_level.universe, self.risk_level['tinggi'].mf, 'r', linewidth=2, label='Tinggi')
-        ax2.axvline(x=risk_value, color='black', linestyle='--', alpha=0.7, label=f'Input: {risk_value:.1f}')
-        ax2.set_title('Variabel Input: Tingkat Risiko')
-        ax2.set_xlabel('Nilai Risiko (0-100)')
-        ax2.set_ylabel('Derajat Keanggotaan')
-        ax2.legend()
-        ax2.grid(True, alpha=0.3)
-        ax2.set_ylim([0, 1.1])
-        
-        # Plot 3: Usage Priority
-        ax3 = axes[1, 0]
-        ax3.set_facecolor('#ffffff')
-        ax3.plot(self.usage_priority.universe, self.usage_priority['rendah'].mf, 'b', linewidth=2, label='Rendah')
-        ax3.plot(self.usage_priority.universe, self.usage_priority['sedang'].mf, 'g', linewidth=2, label='Sedang')
-        ax3.plot(self.usage_priority.universe, self.usage_priority['tinggi'].mf, 'r', linewidth=2, label='Tinggi')
-        ax3.axvline(x=priority_value, color='black', linestyle='--', alpha=0.7, label=f'Input: {priority_value:.1f}')
-        ax3.set_title('Variabel Input: Prioritas Penggunaan')
-        ax3.set_xlabel('Nilai Prioritas (0-100)')
-        ax3.set_ylabel('Derajat Keanggotaan')
-        ax3.legend()
-        ax3.grid(True, alpha=0.3)
-        ax3.set_ylim([0, 1.1])
-        
-        # Plot 4: Approval Score Output
-        ax4 = axes[1, 1]
-        ax4.set_facecolor('#ffffff')
-        ax4.plot(self.approval_score.universe, self.approval_score['sangat_rendah'].mf, 'darkred', linewidth=2, label='Sangat Rendah')
-        ax4.plot(self.approval_score.universe, self.approval_score['rendah'].mf, 'red', linewidth=2, label='Rendah')
-        ax4.plot(self.approval_score.universe, self.approval_score['sedang'].mf, 'orange', linewidth=2, label='Sedang')
-        ax4.plot(self.approval_score.universe, self.approval_score['tinggi'].mf, 'lightgreen', linewidth=2, label='Tinggi')
-        ax4.plot(self.approval_score.universe, self.approval_score['sangat_tinggi'].mf, 'green', linewidth=2, label='Sangat Tinggi')
-        ax4.axvline(x=approval_score, color='black', linestyle='--', alpha=0.7, label=f'Output: {approval_score:.1f}')
-        ax4.set_title('Variabel Output: Skor Persetujuan')
-        ax4.set_xlabel('Skor Persetujuan (0-100)')
-        ax4.set_ylabel('Derajat Keanggotaan')
-        ax4.legend()
-        ax4.grid(True, alpha=0.3)
-        ax4.set_ylim([0, 1.1])
-        
-        plt.tight_layout()
-        
-        # Convert to base64
-        buffer = io.BytesIO()
-        plt.savefig(buffer, format='png', dpi=100, bbox_inches='tight')
-        buffer.seek(0)
-        image_base64 = base64.b64encode(buffer.getvalue()).decode()
-        plt.close()
+        markers = []
+        curves = {}
+        for ax, (variable, title, xlabel, marker, terms) in zip(axes.flat, self.get_visualization_panels(model)):
+            ax.set_facecolor('#ffffff')
+            universe, mfs = model.variables[variable]
+            for term, color, label in terms:
+                curves[variable, term], = ax.plot(universe, mfs[term], color=color, linewidth=2, label=label)
+            ax.set_title(title)
+            ax.set_xlabel(xlabel)
+            ax.set_ylabel('Derajat Keanggotaan')
+            ax.legend()
+            ax.grid(True, alpha=0.3)
+            ax.set_ylim([0, 1.1])
+            
+            # Marker line and value label, drawn over the background per request
+            line = ax.axvline(x=0, color='black', linestyle='--', alpha=0.7, animated=True)
+            text = ax.text(0, 1.05, '', ha='left', va='center', fontsize=9, animated=True,
+                           bbox={'facecolor': 'white', 'edgecolor': 'none', 'alpha': 0.8})
+            markers.append((line, text, marker))
+        
+        fig.tight_layout()
+        canvas.draw()
+        return canvas, canvas.copy_from_bbox(fig.bbox), markers, curves
+    
+    def _visualization_for(self, model):
+        """(canvas, background, markers) showing ``model``'s variables; call under the render lock
+        
+        Kept until the membership functions change. When the variables, terms
+        and universes stay the same only the curves are redrawn in place,
+        which skips building the figure and its layout.
+        """
+        visualization = self._visualization
+        if visualization is not None and visualization[0].variables_fingerprint == model.variables_fingerprint:
+            return visualization[1:4]
+        if visualization is not None and same_structure(visualization[0], model):
+            _, canvas, _, markers, curves = visualization
+            for (variable, term), curve in curves.items():
+                universe, mfs = model.variables[variable]
+                curve.set_data(universe, mfs[term])
+            canvas.draw()
+            background = canvas.copy_from_bbox(canvas.figure.bbox)
+        else:
+            canvas, background, markers, curves = self._build_visualization_background(model)
+        self._visualization = (model, canvas, background, markers, curves)
+        return canvas, background, markers
+    
+    def render_visualization_png(self, scale_value, risk_value, priority_value, approval_score, model=None):
+        """Render the fuzzy visualization of ``model`` (the current one by default) as PNG bytes
         
-        return image_base64
+        The membership-function background is drawn once per set of membership
+        functions (rule changes keep it); each call only blits the input/output
+        marker lines over it. Images are cached.
+        """
+        model = model or self.model
+        key = (model.fingerprint, float(scale_value), float(risk_value),
+               float(priority_value), float(approval_score))
+        png = self.image_cache.get(key)
+        if png is not None:
+            return png
+        
+        values = [scale_value, risk_value, priority_value, approval_score]
+        with self._render_lock:
+            canvas, background, markers = self._visualization_for(model)
+            
+            canvas.restore_region(background)
+            for (line, text, marker), value in zip(markers, values):
+                line.set_xdata([value, value])
+                # Keep the label inside the axes near the right edge
+                text.set_horizontalalignment('right' if value > 85 else 'left')
+                text.set_x(value - 1 if value > 85 else value + 1)
+                text.set_text(f'{marker}: {value:.1f}')
+                line.axes.draw_artist(line)
+                line.axes.draw_artist(text)
+            pixels = np.asarray(canvas.buffer_rgba()).copy()
+        
+        import matplotlib.image as mpimg
+        buffer = io.BytesIO()
+        mpimg.imsave(buffer, pixels, format='png')
+        png = buffer.getvalue()
+        self.image_cache.put(key, png)
+        return png
     
-    def get_detailed_analysis(self, scale_value, risk_value, priority_value, approval_score):
-        """Get detailed analysis of fuzzy logic results"""
+    def generate_fuzzy_visualization(self, scale_value, risk_value, priority_value, approval_score, model=None):
+        """Generate fuzzy logic visualization as base64 image"""
+        png = self.render_visualization_png(scale_value, risk_value, priority_value, approval_score, model)
+        return base64.b64encode(png).decode()
+    
+    def get_detailed_analysis(self, scale_value, risk_value, priority_value, approval_score, inference=None,
+                              model=None):
+        """Get detailed analysis of fuzzy logic results
+        
+        Pass the ``inference`` trace from engine.infer() that produced the score,
+        and the ``model`` whose engine ran it, to reuse its memberships and rule
+        strengths instead of recomputing them.
+        """
+        model = model or self.model
+        if inference is None:
+            inference = model.engine.infer(scale_value, risk_value, priority_value)
+        
         analysis = {
             'input_analysis': {},
             'rule_activation': [],
             'recommendations': []
         }
         
-        # Analyze input values
-        analysis['input_analysis']['scale'] = self._analyze_fuzzy_input(scale_value, self.business_scale)
-        analysis['input_analysis']['risk'] = self._analyze_fuzzy_input(risk_value, self.risk_level)
-        analysis['input_analysis']['priority'] = self._analyze_fuzzy_input(priority_value, self.usage_priority)
+        # Membership degree of each input term
+        for key, label, memberships in zip(['scale', 'risk', 'priority'], model.input_labels,
+                                           inference['memberships']):
+            analysis['input_analysis'][key] = dict(zip(model.variables[label][1], memberships[0].tolist()))
         
         # Analyze output
-        analysis['output_analysis'] = self._analyze_fuzzy_input(approval_score, self.approval_score)
+        output_label = model.output_label
+        analysis['output_analysis'] = self._analyze_fuzzy_input(approval_score, output_label, model)
         
-        # Generate rule activation analysis
-        for i, rule in enumerate(self.rules):
-            # This is a simplified version - in practice you'd need to analyze rule activation
+        # Cut level of each output term and the clipped aggregate set that was defuzzified
+        analysis['output_activation'] = dict(zip(model.variables[output_label][1], inference['cuts'][0].tolist()))
+        x, y = inference['aggregate']
+        keep = np.diff(x[0], prepend=-np.inf) > 0
+        analysis['aggregate_output'] = {
+            'universe': x[0][keep].tolist(),
+            'membership': y[0][keep].tolist()
+        }
+        
+        # Firing strength of every rule
+        for rule_id, description, strength in zip(model.rule_ids, model.rule_descriptions,
+                                                  inference['strengths'][0]):
             analysis['rule_activation'].append({
-                'rule_id': i + 1,
-                'description': f"Rule {i+1} activation",
-                'strength': 0.0  # Would need actual computation
+                'rule_id': rule_id,
+                'description': description,
+                'strength': float(strength)
             })
         
         return analysis
     
-    def _analyze_fuzzy_input(self, value, variable):
+    def _analyze_fuzzy_input(self, value, variable, model=None):
         """Analyze fuzzy input and return membership degrees"""
+        universe, mfs = (model or self.model).variables[variable]
         memberships = {}
-        for term in variable.terms:
-            memberships[term] = fuzz.interp_membership(variable.universe, variable[term].mf, value)
+        for term, mf in mfs.items():
+            # Same as skfuzzy.interp_membership: zero outside the universe
+            memberships[term] = np.interp(value, universe, mf, left=0.0, right=0.0)
         return memberships
+
+
+def _file_stat(path):
+    """(mtime, size) identifying a version of a definition file"""
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _nan_to_none(values):
+    """Nested lists of an array with NaN as None, for JSON"""
+    return np.where(np.isnan(values), None, values).tolist()
+
+
+def _no_rule_fires(scale_value, risk_value, priority_value):
+    """ValueError raised when the rule base does not cover an input"""
+    return ValueError("Crisp output cannot be calculated: no rule fires for "
+                      f"scale={scale_value}, risk={risk_value}, priority={priority_value}")
+
+
+def _check_and_only(antecedent):
+    """Raise ValueError unless the antecedent only combines terms with AND"""
+    from skfuzzy.control.term import TermAggregate
+    if isinstance(antecedent, TermAggregate):
+        if antecedent.kind != 'and':
+            raise ValueError(f"Cannot compile rule antecedent '{antecedent}': only AND is supported")
+        _check_and_only(antecedent.term1)
+        _check_and_only(antecedent.term2)
@@ -0,0 +1,408 @@
+#!/usr/bin/env python3
+"""
+Declarative fuzzy model definitions: loading, validation, coverage and compilation
+
+A definition is a JSON (or, with PyYAML installed, YAML) document:
+
+    {
+      "universe": {"min": 0, "max": 100, "step": 1},
+      "inputs": [
+        {"name": "business_scale", "terms": {"mikro": [0, 0, 40], ...}},
+        ...
+      ],
+      "output": {"name": "approval_score", "terms": {"sangat_rendah": [0, 0, 20], ...}},
+      "rules": [
+        {"if": {"business_scale": "menengah", "risk_level": "rendah"}, "then": "tinggi"},
+        ...
+      ],
+      "defuzzification": {"method": "centroid", "output_set": "sampled"}
+    }
+
+Terms are triangles [a, b, c] in the order they are listed. A variable may
+override the top-level "universe"; a rule may carry a "weight" in (0, 1] and
+leaves out the inputs it does not use. The optional "defuzzification" picks
+one of fuzzy_engine.DEFUZZIFIERS and whether the output set is built from
+the "sampled" membership functions (as skfuzzy does) or "analytic"-ally
+from the triangles, which is exact at any universe step.
+
+    python fuzzy_model.py fuzzy_model.json
+"""
+
+import hashlib
+import json
+import math
+import sys
+
+import numpy as np
+
+from fuzzy_engine import DEFUZZIFIERS, MamdaniEngine, trimf
+
+DEFINITION_KEYS = {'description', 'universe', 'inputs', 'output', 'rules', 'defuzzification'}
+VARIABLE_KEYS = {'name', 'universe', 'terms'}
+RULE_KEYS = {'if', 'then', 'weight'}
+OUTPUT_SETS = ('sampled', 'analytic')
+DEFAULT_DEFUZZIFICATION = {'method': 'centroid', 'output_set': 'sampled'}
+
+
+class CompiledModel:
+    """One version of the rule base, compiled for inference
+
+    Bundles the engine with the variables and rule descriptions that explain
+    its results. Never modified after construction: a reload installs a new
+    instance, so a caller holding a reference keeps a consistent model.
+    """
+
+    def __init__(self, engine, variables, rule_ids, rule_descriptions):
+        self.engine = engine
+        # label -> (universe, {term: membership function}), inputs first, output last
+        self.variables = variables
+        self.rule_ids = rule_ids
+        self.rule_descriptions = rule_descriptions
+        self.fingerprint = engine.fingerprint()
+        self.variables_fingerprint = variables_fingerprint(variables)
+        labels = list(variables)
+        self.input_labels = labels[:-1]
+        self.output_label = labels[-1]
+
+
+def variables_fingerprint(variables):
+    """Hash of universes and membership functions, by name: what the visualization plots, without rules"""
+    digest = hashlib.sha1()
+    for label, (universe, terms) in variables.items():
+        digest.update(label.encode())
+        digest.update(np.ascontiguousarray(universe, dtype=np.float64).tobytes())
+        for term, mf in terms.items():
+            digest.update(term.encode())
+            digest.update(np.ascontiguousarray(mf, dtype=np.float64).tobytes())
+    return digest.hexdigest()
+
+
+def load_definition(path):
+    """Read and validate a definition from a .json, .yaml or .yml file"""
+    with open(path, encoding='utf-8') as f:
+        if path.endswith(('.yaml', '.yml')):
+            try:
+                import yaml
+            except ImportError:
+                raise ValueError(f"Reading {path} requires PyYAML (pip install pyyaml)")
+            try:
+                definition = yaml.safe_load(f)
+            except yaml.YAMLError as e:
+                raise ValueError(f"{path} is not valid YAML: {e}")
+        else:
+            try:
+                definition = json.load(f)
+            except ValueError as e:
+                raise ValueError(f"{path} is not valid JSON: {e}")
+    return validate_definition(definition)
+
+
+def validate_definition(definition):
+    """Return the normalized definition, or raise ValueError listing every problem
+
+    In the normalized form every variable has its own universe, every rule a
+    weight, with the antecedent in input order, and defuzzification is set.
+    """
+    if not isinstance(definition, dict):
+        raise ValueError("Invalid model definition: expected an object")
+    problems = []
+    _check_keys(definition, DEFINITION_KEYS, {'inputs', 'output', 'rules'}, 'definition', problems)
+
+    default_universe = None
+    if 'universe' in definition:
+        default_universe = _check_universe(definition['universe'], 'universe', problems)
+
+    inputs = []
+    if not isinstance(definition.get('inputs', []), list) or not definition.get('inputs'):
+        problems.append("inputs: expected a non-empty list of variables")
+    else:
+        for i, spec in enumerate(definition['inputs'], start=1):
+            variable = _check_variable(spec, f"input {i}", default_universe, problems)
+            if variable is not None:
+                inputs.append(variable)
+    names = [variable['name'] for variable in inputs]
+    for name in sorted({name for name in names if names.count(name) > 1}):
+        problems.append(f"input '{name}': defined more than once")
+
+    output = None
+    if 'output' in definition:
+        output = _check_variable(definition['output'], 'output', default_universe, problems)
+
+    rules = []
+    if not isinstance(definition.get('rules', []), list) or not definition.get('rules'):
+        problems.append("rules: expected a non-empty list of rules")
+    else:
+        terms = {variable['name']: variable['terms'] for variable in inputs}
+        for i, rule in enumerate(definition['rules'], start=1):
+            rule = _check_rule(rule, f"rule {i}", terms, output, problems)
+            if rule is not None:
+                rules.append(rule)
+
+    defuzzification = dict(DEFAULT_DEFUZZIFICATION)
+    if 'defuzzification' in definition:
+        spec = definition['defuzzification']
+        if not isinstance(spec, dict):
+            problems.append("defuzzification: expected an object")
+        else:
+            _check_keys(spec, set(DEFAULT_DEFUZZIFICATION), set(), 'defuzzification', problems)
+            defuzzification.update(spec)
+            if defuzzification['method'] not in DEFUZZIFIERS:
+                problems.append(f"defuzzification: method must be one of {', '.join(DEFUZZIFIERS)}")
+            if defuzzification['output_set'] not in OUTPUT_SETS:
+                problems.append(f"defuzzification: output_set must be one of {', '.join(OUTPUT_SETS)}")
+
+    if problems:
+        raise ValueError("Invalid model definition:\n" + '\n'.join(f"- {p}" for p in problems))
+    return {'inputs': inputs, 'output': output, 'rules': rules, 'defuzzification': defuzzification}
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+
+
+def _check_keys(spec, allowed, required, where, problems):
+    for key in sorted(set(spec) - allowed):
+        problems.append(f"{where}: unknown key '{key}'")
+    for key in sorted(required - set(spec)):
+        problems.append(f"{where}: missing '{key}'")
+
+
+def _check_universe(spec, where, problems):
+    if (not isinstance(spec, dict) or set(spec) != {'min', 'max', 'step'}
+            or not all(_is_number(value) for value in spec.values())):
+        problems.append(f"{where}: universe must be {{\"min\", \"max\", \"step\"}} numbers")
+        return None
+    if spec['step'] <= 0 or spec['max'] <= spec['min']:
+        problems.append(f"{where}: universe needs min < max and step > 0")
+        return None
+    steps = (spec['max'] - spec['min']) / spec['step']
+    if abs(steps - round(steps)) > 1e-9:
+        problems.append(f"{where}: universe max - min must be a multiple of step")
+        return None
+    return {'min': spec['min'], 'max': spec['max'], 'step': spec['step']}
+
+
+def _check_variable(spec, where, default_universe, problems):
+    if not isinstance(spec, dict):
+        problems.append(f"{where}: expected an object")
+        return None
+    _check_keys(spec, VARIABLE_KEYS, {'name', 'terms'}, where, problems)
+    name = spec.get('name')
+    if not isinstance(name, str) or not name:
+        problems.append(f"{where}: name must be a non-empty string")
+        return None
+    where = f"{where} '{name}'"
+
+    if 'universe' in spec:
+        universe = _check_universe(spec['universe'], where, problems)
+    else:
+        universe = default_universe
+        if universe is None and not any(p.startswith('universe:') for p in problems):
+            problems.append(f"{where}: no universe given and no top-level universe")
+
+    terms = spec.get('terms')
+    if not isinstance(terms, dict) or not terms:
+        problems.append(f"{where}: terms must be a non-empty object of term -> [a, b, c]")
+        return None
+    for term, abc in terms.items():
+        if not isinstance(abc, list) or len(abc) != 3 or not all(_is_number(value) for value in abc):
+            problems.append(f"{where} term '{term}': expected a triangle [a, b, c]")
+        elif not abc[0] <= abc[1] <= abc[2]:
+            problems.append(f"{where} term '{term}': triangle needs a <= b <= c, got {abc}")
+        elif universe is not None and not universe['min'] <= abc[1] <= universe['max']:
+            problems.append(f"{where} term '{term}': peak {abc[1]} is outside the universe")
+    if universe is None:
+        return None
+    return {'name': name, 'universe': universe, 'terms': {term: list(abc) for term, abc in terms.items()}}
+
+
+def _check_rule(rule, where, input_terms, output, problems):
+    if not isinstance(rule, dict):
+        problems.append(f"{where}: expected an object")
+        return None
+    _check_keys(rule, RULE_KEYS, {'if', 'then'}, where, problems)
+    antecedent = rule.get('if')
+    consequent = rule.get('then')
+    weight = rule.get('weight', 1.0)
+    valid = True
+
+    if not isinstance(antecedent, dict) or not antecedent:
+        problems.append(f"{where}: 'if' must map at least one input to a term")
+        valid = False
+    else:
+        for label, term in antecedent.items():
+            if label not in input_terms:
+                problems.append(f"{where}: unknown input '{label}'")
+                valid = False
+            elif term not in input_terms[label]:
+                problems.append(f"{where}: input '{label}' has no term '{term}'")
+                valid = False
+    if output is not None and consequent not in output['terms']:
+        problems.append(f"{where}: output '{output['name']}' has no term '{consequent}'")
+        valid = False
+    if not _is_number(weight) or not 0 < weight <= 1:
+        problems.append(f"{where}: weight must be a number in (0, 1]")
+        valid = False
+    if not valid:
+        return None
+    return {'if': {label: antecedent[label] for label in input_terms if label in antecedent},
+            'then': consequent, 'weight': float(weight)}
+
+
+def universe_array(universe):
+    """Sample points of a normalized universe, both ends included"""
+    if all(isinstance(value, int) for value in universe.values()):
+        return np.arange(universe['min'], universe['max'] + 1, universe['step'])
+    steps = int(round((universe['max'] - universe['min']) / universe['step']))
+    return np.linspace(universe['min'], universe['max'], steps + 1)
+
+
+def definition_model(definition):
+    """Variables and rules of a normalized definition, in compile_model()'s format"""
+    variables = []
+    for spec in definition['inputs'] + [definition['output']]:
+        universe = universe_array(spec['universe'])
+        variables.append((spec['name'], universe,
+                          {term: trimf(universe, abc) for term, abc in spec['terms'].items()}))
+    labels = [spec['name'] for spec in definition['inputs']]
+    rules = [(rule_id, [rule['if'].get(label) for label in labels], rule['then'], rule['weight'])
+             for rule_id, rule in enumerate(definition['rules'], start=1)]
+    return variables, rules
+
+
+def compile_definition(definition):
+    """CompiledModel of a normalized definition"""
+    defuzzification = definition['defuzzification']
+    triangles = None
+    if defuzzification['output_set'] == 'analytic':
+        triangles = list(definition['output']['terms'].values())
+    return compile_model(*definition_model(definition), defuzzifier=defuzzification['method'],
+                         output_triangles=triangles)
+
+
+def compile_model(variables, rules, defuzzifier='centroid', output_triangles=None, prune=True):
+    """Compile variables and rules into index arrays for the MamdaniEngine
+
+    ``variables`` is [(label, universe, {term: mf})] with the output last and
+    ``rules`` is [(rule_id, antecedent terms in input order or None,
+    consequent term, weight)]. ``defuzzifier``, ``output_triangles`` and
+    ``prune`` are passed on to the engine.
+    """
+    input_variables, (output_label, output_universe, output_terms) = variables[:-1], variables[-1]
+
+    antecedents = []
+    consequents = []
+    weights = []
+    rule_ids = []
+    rule_descriptions = []
+    for rule_id, antecedent, consequent, weight in rules:
+        row = [-1 if term is None else list(terms).index(term)
+               for term, (_, _, terms) in zip(antecedent, input_variables)]
+        condition = ' AND '.join(f"{label}[{term}]"
+                                 for term, (label, _, _) in zip(antecedent, input_variables) if term is not None)
+        antecedents.append(row)
+        consequents.append(list(output_terms).index(consequent))
+        weights.append(weight)
+        rule_ids.append(rule_id)
+        rule_descriptions.append(f"IF {condition} THEN {output_label}[{consequent}]")
+
+    engine = MamdaniEngine(
+        input_universes=[universe for _, universe, _ in input_variables],
+        input_mfs=[list(terms.values()) for _, _, terms in input_variables],
+        output_universe=output_universe,
+        output_mfs=list(output_terms.values()),
+        rule_antecedents=antecedents,
+        rule_consequents=consequents,
+        rule_weights=weights,
+        defuzzifier=defuzzifier,
+        output_triangles=output_triangles,
+        prune=prune,
+    )
+    return CompiledModel(engine, {label: (universe, terms) for label, universe, terms in variables},
+                         rule_ids, rule_descriptions)
+
+
+def coverage_gaps(model):
+    """Input term combinations for which no rule fires at the terms' peaks
+
+    Returns a list of {input label: term} dicts, e.g. every combination of
+    business_scale 'menengah' with risk_level 'tinggi' in the bundled model.
+    """
+    peaks = []
+    for label in model.input_labels:
+        universe, terms = model.variables[label]
+        peaks.append([(term, universe[int(np.argmax(mf))]) for term, mf in terms.items()])
+    combinations = np.array(np.meshgrid(*[np.arange(len(p)) for p in peaks], indexing='ij')).reshape(len(peaks), -1)
+    values = [np.array([value for _, value in p])[index] for p, index in zip(peaks, combinations)]
+    _, strength = model.engine.evaluate(*values, return_strength=True)
+    return [{label: peaks[i][index][0] for i, (label, index) in enumerate(zip(model.input_labels, column))}
+            for column, fired in zip(combinations.T, strength) if fired == 0]
+
+
+def uncovered_fraction(model, resolution=21):
+    """Share of a regular input grid (``resolution`` points per input) where no rule fires"""
+    axes = [np.linspace(lo, hi, resolution) for lo, hi in model.engine.input_bounds]
+    _, strength = model.engine.evaluate(*np.meshgrid(*axes, indexing='ij'), return_strength=True)
+    return float(np.mean(strength == 0))
+
+
+def rule_warnings(model):
+    """Messages about rules that cannot change a score or contradict another rule
+
+    Lists the engine's redundant rules (never firing, duplicated or shadowed
+    by a more general rule, which evaluation skips) and pairs of rules with
+    the same conditions but different conclusions.
+    """
+    engine = model.engine
+    describe = [f"Rule {rule_id} ({description})"
+                for rule_id, description in zip(model.rule_ids, model.rule_descriptions)]
+    warnings = []
+    for rule, reason, other in engine.redundant:
+        if reason == 'unreachable':
+            warnings.append(f"{describe[rule]} never fires: one of its terms is zero over its whole universe")
+        elif reason == 'duplicate':
+            warnings.append(f"{describe[rule]} duplicates rule {model.rule_ids[other]}")
+        else:
+            warnings.append(f"{describe[rule]} is shadowed by {describe[other].lower()} "
+                            f"and never raises the output")
+    conditions = {}
+    for rule, antecedent in enumerate(engine.rule_antecedents.tolist()):
+        conditions.setdefault(tuple(antecedent), []).append(rule)
+    for rules in conditions.values():
+        for rule in rules[1:]:
+            if engine.rule_consequents[rule] != engine.rule_consequents[rules[0]]:
+                warnings.append(f"{describe[rule]} contradicts {describe[rules[0]].lower()}")
+    return warnings
+
+
+def main(argv=None):
+    paths = sys.argv[1:] if argv is None else argv
+    if not paths:
+        print("Usage: python fuzzy_model.py DEFINITION [DEFINITION ...]")
+        return 2
+    status = 0
+    for path in paths:
+        try:
+            model = compile_definition(load_definition(path))
+        except (OSError, ValueError) as e:
+            print(f"{path}: {e}")
+            status = 1
+            continue
+        gaps = coverage_gaps(model)
+        print(f"{path}: valid, {model.engine.n_rules} rules, {model.engine.defuzzifier} "
+              f"({'analytic' if model.engine.output_triangles is not None else 'sampled'}), "
+              f"fingerprint {model.fingerprint[:12]}")
+        print(f"  No rule fires on {uncovered_fraction(model):.1%} of the input grid "
+              f"and at {len(gaps)} term combinations:")
+        for gap in gaps:
+            print("    " + ', '.join(f"{label}={term}" for label, term in gap.items()))
+        warnings = rule_warnings(model)
+        if warnings:
+            print(f"  {len(warnings)} rule warnings, {len(model.engine.scoring_rules)} rules are evaluated:")
+            for warning in warnings:
+                print("    " + warning)
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,85 @@
+import numpy as np
+
+
+def sweep(engine, base, axes, decimals=9):
+    """Score ``engine`` on a grid that varies some inputs around ``base``
+
+    ``base`` holds one value per engine input; ``axes`` maps input index to
+    the increasing values that input takes. Every grid node and the base
+    point itself are scored in a single evaluate() call.
+
+    Returns a dict with the ``scores`` grid (one grid axis per entry of
+    ``axes``, in order; NaN where no rule fires), the ``base_score`` and the
+    partial derivatives ``gradients`` of the score along each grid axis.
+    Scores are rounded to ``decimals``: many inputs land exactly on a
+    category threshold (a centroid of 60.0 on a symmetric plateau), and the
+    last-bit noise around it would otherwise show up as crossings.
+    """
+    if not axes:
+        raise ValueError("Sweep needs at least one input to vary")
+    if len(base) != engine.n_inputs:
+        raise ValueError(f"Expected {engine.n_inputs} base values, got {len(base)}")
+    indices = list(axes)
+    values = [np.asarray(axes[i], dtype=np.float64) for i in indices]
+    for index, axis in zip(indices, values):
+        if axis.ndim != 1 or axis.size < 2 or np.any(np.diff(axis) <= 0):
+            raise ValueError(f"Values of input {index} must be at least two increasing numbers")
+
+    mesh = np.meshgrid(*values, indexing='ij')
+    shape = mesh[0].shape
+    columns = []
+    for i, value in enumerate(base):
+        column = mesh[indices.index(i)].ravel() if i in axes else np.full(mesh[0].size, float(value))
+        columns.append(np.append(column, float(value)))
+    scores = np.round(engine.evaluate(*columns), decimals)
+
+    grid = scores[:-1].reshape(shape)
+    if len(values) == 1:
+        gradients = [np.gradient(grid, values[0])]
+    else:
+        gradients = list(np.gradient(grid, *values))
+    return {'scores': grid, 'base_score': float(scores[-1]), 'gradients': gradients}
+
+
+def threshold_crossings(values, scores, thresholds, axis=0):
+    """Where the scores cross each threshold along one grid axis
+
+    Positions are interpolated linearly between the two neighbouring nodes,
+    so they are as accurate as the grid is fine. Segments touching a node
+    without a firing rule are skipped.
+
+    Returns a list of (node index of the crossing's left node, threshold
+    index, position, rising) tuples in grid order.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    thresholds = np.asarray(thresholds, dtype=np.float64)
+    scores = np.moveaxis(np.asarray(scores, dtype=np.float64), axis, -1)
+    left, right = scores[..., :-1, None], scores[..., 1:, None]
+    crossed = ((left >= thresholds) != (right >= thresholds)) & np.isfinite(left) & np.isfinite(right)
+
+    crossings = []
+    for *line, segment, t in zip(*np.nonzero(crossed)):
+        a, b = left[(*line, segment, 0)], right[(*line, segment, 0)]
+        x0, x1 = values[segment], values[segment + 1]
+        position = x0 + (thresholds[t] - a) / (b - a) * (x1 - x0)
+        node = list(line)
+        node.insert(axis, segment)
+        crossings.append((tuple(int(i) for i in node), int(t), float(position), bool(b > a)))
+    return crossings
+
+
+def nearest_reaching(values, scores, threshold, origin, origin_score):
+    """Value closest to ``origin`` along a 1-D sweep where the score is at least ``threshold``
+
+    Candidates are the grid nodes at or above the threshold and the
+    interpolated crossings; ``origin`` itself when ``origin_score`` already
+    reaches it. None when no swept value does.
+    """
+    if origin_score >= threshold:
+        return float(origin)
+    values = np.asarray(values, dtype=np.float64)
+    candidates = list(values[np.asarray(scores) >= threshold])
+    candidates += [position for _, _, position, _ in threshold_crossings(values, scores, [threshold])]
+    if not candidates:
+        return None
+    return float(min(candidates, key=lambda x: abs(x - origin)))
@@ -0,0 +1,243 @@
+import contextlib
+import json
+import os
+import uuid
+
+import numpy as np
+
+
+class ScoreSurface:
+    """Precomputed crisp output of a MamdaniEngine on a regular input grid
+
+    Queries are answered by trilinear (in general multilinear) interpolation
+    between the grid nodes, which costs the same no matter how large the rule
+    base is. Grid nodes where no rule fires hold NaN; any query whose
+    interpolation touches such a node returns NaN so the caller can fall back
+    to exact inference.
+
+    Near the edge of rule coverage every cut level is tiny and the centroid, a
+    ratio of small areas, changes steeply. Nodes whose strongest rule fires
+    below ``min_strength`` are therefore stored as NaN too, which bounds the
+    interpolation error at the cost of a few more exact fallbacks.
+    """
+
+    def __init__(self, bounds, values, fingerprint=None, max_error=None, error_p99=None, min_strength=0.1):
+        self.bounds = [(float(lo), float(hi)) for lo, hi in bounds]
+        self.values = values
+        self.fingerprint = fingerprint
+        self.max_error = max_error
+        self.error_p99 = error_p99
+        self.min_strength = min_strength
+
+        if len(self.bounds) != self.values.ndim:
+            raise ValueError("Surface needs one (min, max) bound per grid axis")
+        self._steps = np.array([(hi - lo) / (n - 1) for (lo, hi), n in zip(self.bounds, self.values.shape)])
+        self._lows = np.array([lo for lo, _ in self.bounds])
+
+    @property
+    def resolution(self):
+        return self.values.shape
+
+    @classmethod
+    def build(cls, engine, resolution=101, min_strength=0.1, error_samples=20000, seed=0):
+        """Evaluate the engine on a grid with ``resolution`` points per input"""
+        resolution = _grid_shape(resolution, engine.n_inputs)
+        bounds = engine.input_bounds
+        axes = [np.linspace(lo, hi, n) for (lo, hi), n in zip(bounds, resolution)]
+        mesh = np.meshgrid(*axes, indexing='ij')
+        values, strength = engine.evaluate(*mesh, return_strength=True)
+        values[strength < min_strength] = np.nan
+
+        surface = cls(bounds, values, fingerprint=engine.fingerprint(), min_strength=min_strength)
+        if error_samples:
+            surface.max_error, surface.error_p99 = surface.measure_error(engine, error_samples, seed)
+        return surface
+
+    def patch(self, engine, delta, error_samples=20000, seed=0):
+        """Surface of ``engine`` that re-evaluates only the nodes ``delta`` affects
+
+        ``delta`` is a fuzzy_delta.ModelDelta from this surface's model to
+        ``engine``'s; every other node keeps its value. Returns the new surface
+        (in memory) and the number of nodes evaluated.
+        """
+        axes = [np.linspace(lo, hi, n) for (lo, hi), n in zip(self.bounds, self.values.shape)]
+        mesh = np.meshgrid(*axes, indexing='ij')
+        affected = delta.affected(*mesh)
+        # A copy, also of a read-only memory-mapped grid
+        values = np.array(self.values)
+        if affected.any():
+            scores, strength = engine.evaluate(*[axis[affected] for axis in mesh], return_strength=True)
+            scores[strength < self.min_strength] = np.nan
+            values[affected] = scores
+
+        surface = type(self)(self.bounds, values, fingerprint=engine.fingerprint(), min_strength=self.min_strength)
+        if error_samples:
+            surface.max_error, surface.error_p99 = surface.measure_error(engine, error_samples, seed)
+        return surface, int(affected.sum())
+
+    def lookup(self, *inputs):
+        """Interpolated output for each row of the input arrays"""
+        inputs = np.broadcast_arrays(*[np.atleast_1d(np.asarray(x, dtype=np.float64)) for x in inputs])
+        shape = inputs[0].shape
+        n_axes = len(self.bounds)
+
+        # Fractional grid coordinates, clipped like the engine clips inputs
+        lower = []
+        fraction = []
+        for axis, values in enumerate(inputs):
+            size = self.values.shape[axis]
+            position = (values.ravel() - self._lows[axis]) / self._steps[axis]
+            position = np.clip(position, 0, size - 1)
+            index = np.minimum(np.floor(position).astype(np.intp), size - 2)
+            lower.append(index)
+            fraction.append(position - index)
+
+        result = np.zeros(lower[0].shape)
+        for corner in range(2 ** n_axes):
+            weight = np.ones(result.shape)
+            index = []
+            for axis in range(n_axes):
+                upper = (corner >> axis) & 1
+                weight *= fraction[axis] if upper else 1.0 - fraction[axis]
+                index.append(lower[axis] + upper)
+            # Skip zero-weight corners so NaN nodes only matter when actually used
+            corner_values = self.values[tuple(index)]
+            result += np.where(weight > 0, weight * corner_values, 0.0)
+        return result.reshape(shape)
+
+    def measure_error(self, engine, samples=20000, seed=0):
+        """Maximum and 99th percentile |surface - exact| over random points and cell centres
+
+        Points the surface leaves to exact inference (NaN) are not counted.
+        """
+        rng = np.random.default_rng(seed)
+        points = [rng.uniform(lo, hi, samples) for lo, hi in self.bounds]
+
+        # Cell centres are where interpolation error tends to peak
+        centres = [lo + step * (rng.integers(0, n - 1, samples) + 0.5)
+                   for (lo, _), step, n in zip(self.bounds, self._steps, self.values.shape)]
+        points = [np.concatenate([p, c]) for p, c in zip(points, centres)]
+
+        exact = engine.evaluate(*points)
+        approx = self.lookup(*points)
+        both = ~np.isnan(exact) & ~np.isnan(approx)
+        if not both.any():
+            return 0.0, 0.0
+        error = np.abs(exact[both] - approx[both])
+        return float(error.max()), float(np.percentile(error, 99))
+
+    def save(self, path):
+        """Write the grid and its metadata for load() under ``path`` (.npy)
+
+        The grid goes to a new file named after ``path`` with a version token,
+        and the metadata, which names that file, is renamed over
+        ``path + '.json'``. That rename switches grid and metadata together, so
+        a process loading the surface meanwhile gets either the old pair or
+        the new one. The grid it replaces is removed.
+        """
+        path = _npy_path(path)
+        values_path = f"{path[:-len('.npy')]}.{uuid.uuid4().hex[:12]}.npy"
+        meta = {
+            'values': os.path.basename(values_path),
+            'bounds': self.bounds,
+            'resolution': list(self.resolution),
+            'fingerprint': self.fingerprint,
+            'max_error': self.max_error,
+            'error_p99': self.error_p99,
+            'min_strength': self.min_strength,
+        }
+        previous = _read_meta(path).get('values') if os.path.exists(path + '.json') else None
+        with open(values_path, 'xb') as f:
+            np.save(f, np.ascontiguousarray(self.values))
+        try:
+            with _replacing(path + '.json', 'w') as f:
+                json.dump(meta, f)
+        except BaseException:
+            os.unlink(values_path)
+            raise
+        if previous and previous != meta['values']:
+            try:
+                os.unlink(os.path.join(os.path.dirname(path), previous))
+            except OSError:
+                pass  # Already gone, or still mapped on a platform that refuses to delete it
+
+    @classmethod
+    def load(cls, path, engine=None, mmap=True):
+        """Load a saved surface, memory-mapped so processes share one copy
+
+        If ``engine`` is given, a surface built for a different model raises
+        ValueError.
+        """
+        path = _npy_path(path)
+        previous = None
+        while True:
+            meta = _read_meta(path)
+            if engine is not None and meta['fingerprint'] != engine.fingerprint():
+                raise ValueError(f"Surface {path} was built for a different rule base")
+            # Surfaces saved before the metadata named the grid keep it at ``path``
+            values_path = os.path.join(os.path.dirname(path), meta['values']) if 'values' in meta else path
+            try:
+                values = np.load(values_path, mmap_mode='r' if mmap else None)
+            except FileNotFoundError:
+                if 'values' not in meta or meta == previous:
+                    raise
+                previous = meta  # Replaced by a newer save after the metadata was read
+                continue
+            break
+        if list(values.shape) != meta.get('resolution', list(values.shape)):
+            raise ValueError(f"Surface {path} does not match its metadata")
+        return cls(meta['bounds'], values, meta['fingerprint'], meta['max_error'], meta.get('error_p99'),
+                   meta.get('min_strength', 0.1))
+
+    @classmethod
+    def load_or_build(cls, path, engine, resolution=101, min_strength=0.1):
+        """Load the surface at ``path`` if it matches ``engine``, ``resolution`` and ``min_strength``
+
+        Otherwise build the surface and save it there.
+        """
+        path = _npy_path(path)
+        if os.path.exists(path + '.json'):
+            try:
+                surface = cls.load(path, engine)
+            except ValueError:
+                pass  # Stale surface from another model, rebuild below
+            else:
+                if (list(surface.resolution) == _grid_shape(resolution, engine.n_inputs)
+                        and surface.min_strength == min_strength):
+                    return surface
+        surface = cls.build(engine, resolution, min_strength)
+        surface.save(path)
+        return cls.load(path, engine)
+
+
+@contextlib.contextmanager
+def _replacing(path, mode):
+    """Open a temporary file in ``path``'s directory that replaces ``path`` once closed without error"""
+    # Not mkstemp: its files are private to the owner, whatever the umask
+    tmp = f"{path}.{os.getpid()}.{uuid.uuid4().hex}.tmp"
+    try:
+        with open(tmp, mode.replace('w', 'x')) as f:
+            yield f
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def _read_meta(path):
+    """Metadata saved with the surface at ``path``"""
+    with open(path + '.json') as f:
+        return json.load(f)
+
+
+def _grid_shape(resolution, n_inputs):
+    """Points per input of a grid built with ``resolution`` (one count, or one per input)"""
+    if np.isscalar(resolution):
+        return [int(resolution)] * n_inputs
+    return [int(n) for n in resolution]
+
+
+def _npy_path(path):
+    """np.save appends .npy when missing; apply the same rule everywhere"""
+    path = os.fspath(path)
+    return path if path.endswith('.npy') else path + '.npy'
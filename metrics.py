@@ -0,0 +1,201 @@
+import bisect
+import functools
+import threading
+import time
+
+# Latency buckets in seconds, from 100 us to 10 s
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# UMKMFuzzyLogic methods timed by instrument_fuzzy_logic(), as method -> stage
+FUZZY_LOGIC_STAGES = {
+    'evaluate': 'evaluate',
+    'calculate_approval_score': 'score',
+    'calculate_approval_scores': 'batch_score',
+    'get_detailed_analysis': 'analysis',
+    'render_visualization_png': 'visualization',
+    'reference_approval_score': 'reference',
+}
+
+# MamdaniEngine methods, re-instrumented whenever the engine is recompiled
+ENGINE_STAGES = {
+    'infer': 'inference',
+    'evaluate': 'batch_inference',
+}
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus sense; not locked itself"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Metrics:
+    """In-process counters and latency histograms, rendered in Prometheus text format
+
+    Nothing is timed until instrument_*() installs the hooks, so an app that
+    never creates a Metrics object pays no overhead at all.
+    """
+
+    def __init__(self, prefix='umkm', buckets=DEFAULT_BUCKETS):
+        self.prefix = prefix
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+        self._descriptions = {}
+        self._collectors = []
+        self.describe('stage_duration_seconds', 'histogram', 'Time spent in each scoring stage')
+        self.describe('request_duration_seconds', 'histogram', 'Time to produce the response, per endpoint')
+        self.describe('requests_total', 'counter', 'HTTP requests by endpoint and status')
+        self.describe('request_errors_total', 'counter', 'HTTP responses with status 400 or higher, per endpoint')
+
+    def describe(self, name, kind, help_text):
+        """Declare the type and help line of a metric"""
+        self._descriptions[name] = (kind, help_text)
+
+    def observe(self, name, value, **labels):
+        """Record ``value`` in the histogram ``name`` with ``labels``"""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(self.buckets)
+            histogram.observe(value)
+
+    def inc(self, name, amount=1, **labels):
+        """Add ``amount`` to the counter ``name`` with ``labels``"""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def add_collector(self, collector):
+        """Register a callable returning [(name, kind, help, [(labels dict, value)])] at render time"""
+        self._collectors.append(collector)
+
+    def timed(self, stage):
+        """Decorator recording each call's duration as ``stage``, including calls that raise"""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.observe('stage_duration_seconds', time.perf_counter() - start, stage=stage)
+            wrapper.__wrapped_stage__ = stage
+            return wrapper
+        return decorator
+
+    def instrument(self, obj, stages):
+        """Replace ``obj``'s methods named in ``stages`` (method -> stage) with timed wrappers"""
+        for method, stage in stages.items():
+            bound = getattr(obj, method)
+            if getattr(bound, '__wrapped_stage__', None) is None:
+                setattr(obj, method, self.timed(stage)(bound))
+
+    def instrument_fuzzy_logic(self, fuzzy):
+        """Time the scoring stages of a UMKMFuzzyLogic and its engine, across rebuilds and reloads"""
+        self.instrument(fuzzy, FUZZY_LOGIC_STAGES)
+        self.instrument(fuzzy.engine, ENGINE_STAGES)
+
+        install_model = fuzzy.install_model
+
+        @functools.wraps(install_model)
+        def instrumented_install(model):
+            # Before the swap, so the live engine is always timed
+            self.instrument(model.engine, ENGINE_STAGES)
+            install_model(model)
+        fuzzy.install_model = instrumented_install
+
+        self.add_collector(lambda: cache_metrics({'score': fuzzy.cache, 'image': fuzzy.image_cache}))
+
+    def instrument_app(self, app):
+        """Count and time every request of a Flask app
+
+        Streamed responses are timed until the response object is returned,
+        not until the last byte is sent.
+        """
+        from flask import g, request
+
+        @app.before_request
+        def start_timer():
+            g.metrics_start = time.perf_counter()
+
+        @app.after_request
+        def record_request(response):
+            endpoint = request.endpoint or 'unknown'
+            start = g.pop('metrics_start', None)
+            if start is not None:
+                self.observe('request_duration_seconds', time.perf_counter() - start, endpoint=endpoint)
+            self.inc('requests_total', endpoint=endpoint, status=str(response.status_code))
+            if response.status_code >= 400:
+                self.inc('request_errors_total', endpoint=endpoint)
+            return response
+
+    def render(self):
+        """All metrics in Prometheus text exposition format (version 0.0.4)"""
+        with self._lock:
+            histograms = {key: (list(h.counts), h.sum, h.count) for key, h in self._histograms.items()}
+            counters = dict(self._counters)
+
+        families = {}
+        for (name, labels), value in counters.items():
+            families.setdefault(name, []).append(_sample(self.prefix + '_' + name, dict(labels), value))
+        for (name, labels), (counts, total, count) in histograms.items():
+            full_name = self.prefix + '_' + name
+            lines = families.setdefault(name, [])
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                lines.append(_sample(full_name + '_bucket', dict(labels, le=_format_bound(bound)), cumulative))
+            lines.append(_sample(full_name + '_sum', dict(labels), total))
+            lines.append(_sample(full_name + '_count', dict(labels), count))
+
+        output = []
+        for name in sorted(families):
+            kind, help_text = self._descriptions.get(name, ('untyped', name))
+            output.append(f"# HELP {self.prefix}_{name} {help_text}")
+            output.append(f"# TYPE {self.prefix}_{name} {kind}")
+            output.extend(families[name])
+        for collector in self._collectors:
+            for name, kind, help_text, samples in collector():
+                output.append(f"# HELP {self.prefix}_{name} {help_text}")
+                output.append(f"# TYPE {self.prefix}_{name} {kind}")
+                output.extend(_sample(f"{self.prefix}_{name}", labels, value) for labels, value in samples)
+        return '\n'.join(output) + '\n'
+
+
+def cache_metrics(caches):
+    """Collector output for ScoreCache objects given as name -> cache"""
+    stats = {name: cache.stats() for name, cache in caches.items()}
+    return [
+        ('cache_hits_total', 'counter', 'Cache lookups answered from the cache',
+         [({'cache': name}, s['hits']) for name, s in stats.items()]),
+        ('cache_misses_total', 'counter', 'Cache lookups that had to compute',
+         [({'cache': name}, s['misses']) for name, s in stats.items()]),
+        ('cache_evictions_total', 'counter', 'Entries evicted to respect maxsize',
+         [({'cache': name}, s['evictions']) for name, s in stats.items()]),
+        ('cache_entries', 'gauge', 'Entries currently cached',
+         [({'cache': name}, s['size']) for name, s in stats.items()]),
+    ]
+
+
+def _format_bound(bound):
+    return '+Inf' if bound == float('inf') else repr(float(bound))
+
+
+def _sample(name, labels, value):
+    if labels:
+        escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for v in labels.values())
+        name += '{' + ','.join(f'{k}="{v}"' for k, v in zip(labels, escaped)) + '}'
+    return f"{name} {value}"
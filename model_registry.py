@@ -0,0 +1,98 @@
+"""
+Model variants scored side by side
+
+A ModelRegistry holds named CompiledModels: the current model of a
+UMKMFuzzyLogic as DEFAULT_VARIANT, and challengers loaded from their own
+definition files (other rules, weights, output terms or defuzzification).
+evaluate() scores inputs with every active variant in one SharedEngine
+pass, so variants share the fuzzified inputs and rule antecedents; the
+shared engine is rebuilt only when the set of scored models changes.
+"""
+
+import threading
+from collections import OrderedDict
+
+from fuzzy_engine import SharedEngine
+
+# Name of the model a UMKMFuzzyLogic scores with by default
+DEFAULT_VARIANT = 'default'
+
+
+class ModelRegistry:
+    """Named CompiledModels, each active (scored by evaluate()) or not"""
+
+    def __init__(self):
+        self._variants = OrderedDict()
+        self._shared = None
+        self._lock = threading.Lock()
+
+    def register(self, name, model, active=None):
+        """Add or replace variant ``name``
+
+        A replaced variant keeps its active state unless ``active`` is given;
+        new variants are active by default.
+        """
+        if not isinstance(name, str) or not name:
+            raise ValueError("Variant name must be a non-empty string")
+        with self._lock:
+            if active is None:
+                active = self._variants.get(name, (None, True))[1]
+            self._variants[name] = (model, bool(active))
+
+    def remove(self, name):
+        """Drop variant ``name``; ValueError if it is not registered"""
+        with self._lock:
+            if self._variants.pop(name, None) is None:
+                raise ValueError(f"Unknown model variant '{name}'")
+
+    def set_active(self, name, active=True):
+        """Include variant ``name`` in evaluate() or leave it out"""
+        self.register(name, self.get(name), active)
+
+    def get(self, name):
+        """The CompiledModel of variant ``name``; ValueError if it is not registered"""
+        variant = self._variants.get(name)
+        if variant is None:
+            raise ValueError(f"Unknown model variant '{name}'")
+        return variant[0]
+
+    def names(self, active_only=False):
+        """Registered variant names, in registration order"""
+        return [name for name, (_, active) in list(self._variants.items()) if active or not active_only]
+
+    def __contains__(self, name):
+        return name in self._variants
+
+    def __len__(self):
+        return len(self._variants)
+
+    def shared_engine(self, names):
+        """SharedEngine of the variants ``names``, in that order; reused while their models stay the same"""
+        models = [self.get(name) for name in names]
+        key = tuple(model.fingerprint for model in models)
+        with self._lock:
+            if self._shared is None or self._shared[0] != key:
+                self._shared = (key, SharedEngine([model.engine for model in models]))
+            return self._shared[1]
+
+    def evaluate(self, *inputs, names=None):
+        """{name: scores} of the active variants (or ``names``) for the input arrays, from one pass
+
+        Scores are NaN where none of a variant's rules fire, as with
+        MamdaniEngine.evaluate().
+        """
+        names = self.names(active_only=True) if names is None else list(names)
+        if not names:
+            return OrderedDict()
+        scores = self.shared_engine(names).evaluate(*inputs)
+        return OrderedDict(zip(names, scores))
+
+    def describe(self):
+        """Name, fingerprint, rule count and state of every variant, for listings"""
+        return [{
+            'name': name,
+            'fingerprint': model.fingerprint,
+            'rules': model.engine.n_rules,
+            'defuzzification': model.engine.defuzzifier,
+            'active': active,
+        } for name, (model, active) in list(self._variants.items())]
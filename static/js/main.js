@@ -411,7 +411,10 @@ document.addEventListener('DOMContentLoaded', function() {
         const formData = {
             business_field: businessFieldSelect.value,
             scale: scaleSelect.value,
-            usage_type: usageTypeSelect.value
+            usage_type: usageTypeSelect.value,
+            // The rule-by-rule analysis is only computed when asked for
+            fields: ['approval_score', 'approval_category', 'approval_color', 'recommendations',
+                     'input_values', 'analysis', 'visualization_url']
         };
         
         showLoading(true);
@@ -503,11 +506,16 @@ document.addEventListener('DOMContentLoaded', function() {
             recommendationsListEl.appendChild(li);
         });
         
-        // Display fuzzy visualization
-        if (result.visualization) {
-            fuzzyVisualizationEl.src = `data:image/png;base64,${result.visualization}`;
-            fuzzyVisualizationEl.classList.remove('hidden');
-            visualizationPlaceholder.classList.add('hidden');
+        // Display fuzzy visualization (inline if requested, otherwise loaded on demand)
+        const visualizationSrc = result.visualization
+            ? `data:image/png;base64,${result.visualization}`
+            : result.visualization_url;
+        if (visualizationSrc) {
+            fuzzyVisualizationEl.onload = () => {
+                fuzzyVisualizationEl.classList.remove('hidden');
+                visualizationPlaceholder.classList.add('hidden');
+            };
+            fuzzyVisualizationEl.src = visualizationSrc;
         }
         
         // Display detailed analysis
@@ -0,0 +1,100 @@
+"""
+Shared fixtures for the module tests
+"""
+
+import copy
+import json
+import os
+import shutil
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from batch_score import DEFAULT_DATA_FILE
+from data_processor import UMKMDataProcessor
+from fuzzy_logic import UMKMFuzzyLogic
+
+
+@pytest.fixture(scope='session', autouse=True)
+def repo_root():
+    """Run from the repository root, where app.py expects the bundled CSV"""
+    cwd = os.getcwd()
+    os.chdir(ROOT)
+    yield ROOT
+    os.chdir(cwd)
+
+
+@pytest.fixture
+def csv_file():
+    return DEFAULT_DATA_FILE
+
+
+@pytest.fixture
+def processor(csv_file):
+    return UMKMDataProcessor(csv_file)
+
+
+@pytest.fixture
+def fuzzy():
+    """A model of its own, free to edit"""
+    return UMKMFuzzyLogic()
+
+
+@pytest.fixture
+def definition():
+    """A copy of the bundled model definition"""
+    return copy.deepcopy(UMKMFuzzyLogic.default_definition())
+
+
+@pytest.fixture(scope='session')
+def app_module(repo_root):
+    import app
+    return app
+
+
+@pytest.fixture
+def client(app_module):
+    return app_module.app.test_client()
+
+
+@pytest.fixture
+def application(app_module):
+    return {'business_field': app_module.data_processor.get_all_business_fields()[0],
+            'scale': 'Kecil', 'usage_type': 'Modal Kerja'}
+
+
+@pytest.fixture
+def write_json(tmp_path):
+    """Write data as JSON into the test directory and return its path"""
+    def write(name, data):
+        path = str(tmp_path / name)
+        with open(path, 'w') as f:
+            json.dump(data, f)
+        return path
+    return write
+
+
+@pytest.fixture
+def manifest(tmp_path, csv_file, write_json):
+    """Dataset manifest over edited copies of the bundled CSV
+
+    Each dataset is (period, region, file name, (old, new) text replacement or None).
+    """
+    def build(datasets, default=None):
+        with open(csv_file, encoding='utf-8') as f:
+            text = f.read()
+        entries = []
+        for period, region, name, replace in datasets:
+            if replace is None:
+                shutil.copyfile(csv_file, tmp_path / name)
+            else:
+                (tmp_path / name).write_text(text.replace(*replace), encoding='utf-8')
+            entries.append({'period': period, 'region': region, 'path': name})
+        data = {'datasets': entries}
+        if default:
+            data['default'] = default
+        return write_json('datasets.json', data)
+    return build
@@ -0,0 +1,171 @@
+"""
+Tests for the Flask endpoints: payloads, field selection, batches, caching headers and startup
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+
+def test_visualization_on_demand(client):
+    application = {'business_field': 'Modal Kerja', 'scale': 'Kecil', 'usage_type': 'Investasi'}
+    result = client.post('/api/calculate', json=application).get_json()
+    assert 'visualization' not in result
+
+    image = client.get(result['visualization_url'])
+    assert image.status_code == 200 and image.mimetype == 'image/png'
+    assert image.data.startswith(b'\x89PNG')
+
+    curves = client.get(result['visualization_url'] + '&format=json').get_json()
+    assert set(curves['variables']) == {'business_scale', 'risk_level', 'usage_priority', 'approval_score'}
+    assert len(curves['variables']['business_scale']['terms']['mikro']['membership']) == 101
+    assert round(curves['markers']['approval_score'], 2) == result['approval_score']
+
+    inline = client.post('/api/calculate', json=dict(application, include_visualization=True)).get_json()
+    assert len(inline['visualization']) > 0
+    assert client.get('/api/visualization?scale=Kecil').status_code == 400
+
+
+@pytest.fixture
+def counted_analyses(app_module):
+    """Detailed analyses the app's model computes, uncached"""
+    fuzzy = app_module.fuzzy_logic
+    analyses = []
+    original = fuzzy.get_detailed_analysis
+    fuzzy.get_detailed_analysis = lambda *args: analyses.append(args) or original(*args)
+    fuzzy.cache.clear()
+    yield analyses
+    del fuzzy.get_detailed_analysis
+    fuzzy.cache.clear()
+
+
+def test_only_requested_fields_are_computed(app_module, client, counted_analyses):
+    application = {'business_field': app_module.data_processor.get_all_business_fields()[1],
+                   'scale': 'Menengah', 'usage_type': 'Modal Kerja'}
+    response = client.post('/api/calculate', json=dict(application, fields=['approval_score', 'approval_category']))
+    assert sorted(response.get_json()) == ['approval_category', 'approval_score']
+    response = client.post('/api/calculate?fields=approval_score,recommendations', json=application)
+    assert sorted(response.get_json()) == ['approval_score', 'recommendations']
+    assert not counted_analyses
+    response = client.post('/api/calculate', json=dict(application, include='analysis'))
+    assert list(response.get_json()) == ['analysis'] and len(counted_analyses) == 1
+
+    # The analysis is opt-in
+    app_module.fuzzy_logic.cache.clear()
+    default = client.post('/api/calculate', json=application).get_json()
+    assert 'timestamp' in default and 'analysis' not in default and 'visualization' not in default
+    assert len(counted_analyses) == 1
+
+
+@pytest.mark.parametrize('fields', [['score'], []])
+def test_unknown_fields_rejected(client, application, fields):
+    assert client.post('/api/calculate', json=dict(application, fields=fields)).status_code == 400
+
+
+@pytest.mark.parametrize('url', ['/api/get_options', '/api/statistics', '/api/chart_data'])
+def test_etags(client, url):
+    # Static data endpoints answer revalidations with 304
+    response = client.get(url)
+    assert response.status_code == 200 and response.headers['Cache-Control'] == 'no-cache'
+    assert client.get(url, headers={'If-None-Match': response.headers['ETag']}).status_code == 304
+    assert client.get(url, headers={'If-None-Match': '"stale"'}).status_code == 200
+
+
+def test_aggregates_served_as_same_bytes(app_module, client):
+    processor = app_module.data_processor
+    for url, build in (('/api/get_options', processor.get_options), ('/api/statistics', processor.get_statistics),
+                       ('/api/chart_data', processor.get_chart_data)):
+        first, second = client.get(url), client.get(url)
+        assert first.data == second.data and first.headers['ETag'] == second.headers['ETag']
+        assert first.get_json() == app_module.app.json.loads(app_module.app.json.dumps(build()))
+
+
+def test_aggregates_rebuilt_after_reload(app_module, client):
+    processor = app_module.data_processor
+    statistics = processor.get_statistics()
+    etag = client.get('/api/statistics').headers['ETag']
+    processor.process_data()
+    assert processor.get_statistics() is not statistics
+    # Same data, so the old ETag still matches
+    assert client.get('/api/statistics', headers={'If-None-Match': etag}).status_code == 304
+    assert app_module._serialized_payloads[('statistics', None)][0] is processor.get_statistics()
+
+
+BATCH = [
+    {'business_field': 'Modal Kerja', 'scale': 'Mikro', 'usage_type': 'Modal Kerja', 'id': 'A-1'},
+    {'business_field': 'Investasi', 'scale': 'Kecil', 'usage_type': 'Investasi'},
+    {'business_field': 'Modal Kerja', 'scale': 'Menengah', 'usage_type': 'Investasi'},  # No rule fires
+    {'business_field': 'Pertambangan', 'scale': 'Mikro', 'usage_type': 'Modal Kerja'},
+    {'scale': 'Kecil'},
+    'bukan objek',
+]
+
+
+@pytest.fixture
+def small_blocks(app_module):
+    """Blocks smaller than the batch exercise the index offsets"""
+    block_size, app_module.BATCH_BLOCK_SIZE = app_module.BATCH_BLOCK_SIZE, 4
+    yield
+    app_module.BATCH_BLOCK_SIZE = block_size
+
+
+def test_batch_endpoint(client, small_blocks):
+    # Streamed bodies must be read before the next request is made
+    as_array = client.post('/api/calculate_batch', json=BATCH)
+    assert as_array.status_code == 200 and as_array.mimetype == 'application/x-ndjson'
+    rows = [json.loads(line) for line in as_array.data.decode().splitlines()]
+    ndjson = '\n'.join(json.dumps(a) for a in BATCH) + '\n{rusak\n'
+    as_ndjson = client.post('/api/calculate_batch', data=ndjson, content_type='application/x-ndjson')
+    ndjson_rows = [json.loads(line) for line in as_ndjson.data.decode().splitlines()]
+
+    assert rows == ndjson_rows[:-1]
+    assert ndjson_rows[-1] == {'index': len(BATCH), 'error': 'Format data tidak valid'}
+    assert [row['index'] for row in rows] == list(range(len(BATCH)))
+    assert rows[0]['id'] == 'A-1'
+
+    # Every row matches what /api/calculate returns for the same application
+    for application, row in zip(BATCH, rows):
+        single = client.post('/api/calculate', json=application)
+        expected = single.get_json()
+        if single.status_code != 200:
+            assert row['error'] == expected['error'], (row, expected)
+            continue
+        for key in ('approval_score', 'approval_category', 'approval_color', 'recommendations', 'input_values'):
+            assert row[key] == expected[key], key
+
+    assert client.post('/api/calculate_batch', json={'business_field': 'Investasi'}).status_code == 400
+
+
+def import_report(repo_root, inference_only):
+    """Heavy modules loaded while serving one calculation in a fresh interpreter, with -X importtime"""
+    code = ("import sys, app; "
+            "response = app.app.test_client().post('/api/calculate', json={"
+            "'business_field': 'Investasi', 'scale': 'Kecil', 'usage_type': 'Investasi'}); "
+            "assert response.status_code == 200, response.get_json(); "
+            "print(sorted(m for m in ('pandas', 'matplotlib', 'skfuzzy', 'scipy') if m in sys.modules))")
+    env = dict(os.environ, FUZZY_INFERENCE_ONLY=inference_only)
+    process = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=repo_root, env=env,
+                             capture_output=True, text=True)
+    assert process.returncode == 0, process.stderr[-2000:]
+
+    # "import time: self [us] | cumulative | imported package", nesting shown by indentation
+    imports = []
+    for line in process.stderr.splitlines():
+        if line.startswith('import time:') and '|' in line:
+            _, cumulative, name = line.split('|')
+            if cumulative.strip().isdigit():
+                imports.append(((len(name) - len(name.lstrip()) - 1) // 2, int(cumulative), name.strip()))
+    total = sum(cumulative for depth, cumulative, _ in imports if depth == 0) / 1000
+    print(f"{total:.0f} ms importing, slowest direct imports of the application modules:")
+    for cumulative, name in sorted((c, n) for depth, c, n in imports if depth == 1)[::-1][:5]:
+        print(f"    {cumulative / 1000:8.1f} ms  {name}")
+    return process.stdout.strip()
+
+
+def test_import_time(repo_root):
+    # Scoring needs neither plotting nor CSV parsing libraries
+    assert import_report(repo_root, '1') == '[]'
+    assert 'pandas' not in import_report(repo_root, '')
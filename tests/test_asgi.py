@@ -0,0 +1,148 @@
+"""
+Tests for the ASGI entry point: same responses, load shedding and draining on shutdown
+"""
+
+import asyncio
+import json
+import threading
+
+import pytest
+
+from asgi import WorkerPoolASGI
+
+APPLICATION = {'business_field': 'Modal Kerja', 'scale': 'Kecil', 'usage_type': 'Modal Kerja',
+               'fields': 'approval_score,approval_category'}
+
+
+def scope(method='GET', path='/', content_type='application/json'):
+    return {'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': method,
+            'scheme': 'http', 'path': path, 'query_string': b'', 'root_path': '',
+            'headers': [(b'content-type', content_type.encode())], 'server': ('testserver', 80)}
+
+
+async def call(asgi_app, method, path, body=b''):
+    """Status, headers and body of one request"""
+    messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0) if messages else {'type': 'http.disconnect'}
+
+    async def send(message):
+        sent.append(message)
+
+    await asgi_app(scope(method, path), receive, send)
+    return sent[0]['status'], dict(sent[0]['headers']), b''.join(m.get('body', b'') for m in sent[1:])
+
+
+def test_same_routes_as_wsgi(app_module, client):
+    expected = client.post('/api/calculate', json=APPLICATION).get_json()
+
+    async def run():
+        asgi_app = WorkerPoolASGI(app_module.app, workers=2, queue_depth=2)
+        status, _, body = await call(asgi_app, 'POST', '/api/calculate', json.dumps(APPLICATION).encode())
+        assert status == 200 and json.loads(body) == expected
+        # Streamed responses included
+        status, headers, body = await call(asgi_app, 'POST', '/api/calculate_batch',
+                                           json.dumps([APPLICATION] * 3).encode())
+        assert status == 200 and headers[b'content-type'] == b'application/x-ndjson'
+        assert [json.loads(line)['approval_score'] for line in body.decode().splitlines()] == [
+            expected['approval_score']] * 3
+        assert (await call(asgi_app, 'GET', '/api/tidak-ada'))[0] == 404
+        await asgi_app.shutdown()
+
+    asyncio.run(run())
+
+
+def test_saturated_pool_sheds_load():
+    release = threading.Event()
+
+    def slow_app(environ, start_response):
+        release.wait(10)
+        start_response('200 OK', [('Content-Type', 'text/plain')])
+        return [b'ok']
+
+    async def run():
+        asgi_app = WorkerPoolASGI(slow_app, workers=1, queue_depth=1, shutdown_timeout=10)
+        running = [asyncio.ensure_future(call(asgi_app, 'GET', '/')) for _ in range(2)]
+        await asyncio.sleep(0.05)
+        assert asgi_app.in_flight == 2
+        status, headers, body = await call(asgi_app, 'GET', '/')
+        assert status == 503 and headers[b'retry-after'] == b'1' and 'sibuk' in json.loads(body)['error']
+        assert asgi_app.rejected == 1
+
+        # Shutdown refuses new requests but lets those in flight finish
+        shutdown = asyncio.ensure_future(asgi_app.shutdown())
+        await asyncio.sleep(0.05)
+        assert (await call(asgi_app, 'GET', '/'))[0] == 503 and not shutdown.done()
+        release.set()
+        assert [status for status, _, _ in await asyncio.gather(*running)] == [200, 200]
+        await shutdown
+        assert asgi_app.in_flight == 0 and asgi_app.completed == 2
+
+    asyncio.run(run())
+
+
+def test_client_going_away_frees_worker():
+    closed = threading.Event()
+
+    def endless_app(environ, start_response):
+        start_response('200 OK', [('Content-Type', 'text/plain')])
+
+        def chunks():
+            try:
+                while True:
+                    yield b'x' * 1024
+            finally:
+                closed.set()
+        return chunks()
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def failing_send(message):
+        if message['type'] == 'http.response.body':
+            raise ConnectionResetError()
+
+    async def stalled_send(message):
+        await asyncio.sleep(3600)
+
+    async def run():
+        asgi_app = WorkerPoolASGI(endless_app, workers=1, queue_depth=0)
+        loop = asyncio.get_running_loop()
+
+        # A send failing mid-stream
+        with pytest.raises(ConnectionResetError):
+            await asgi_app(scope(), receive, failing_send)
+        await loop.run_in_executor(None, closed.wait, 5)
+        assert closed.is_set() and asgi_app.in_flight == 0
+        closed.clear()
+
+        # A request cancelled while its client does not read
+        task = asyncio.ensure_future(asgi_app(scope(), receive, stalled_send))
+        await asyncio.sleep(0.1)
+        task.cancel()
+        await loop.run_in_executor(None, closed.wait, 5)
+        assert closed.is_set() and asgi_app.in_flight == 0
+
+        # The single worker is free again
+        assert await asyncio.wait_for(loop.run_in_executor(asgi_app.executor, lambda: 'free'), 5) == 'free'
+        await asgi_app.shutdown()
+
+    asyncio.run(run())
+
+
+def test_write_callable_and_oversized_body(app_module):
+    def writing_app(environ, start_response):
+        start_response('200 OK', [('Content-Type', 'text/plain')])(b'x')
+        return []
+
+    async def run():
+        asgi_app = WorkerPoolASGI(writing_app, workers=1, queue_depth=0)
+        assert (await call(asgi_app, 'GET', '/'))[0] == 500
+        await asgi_app.shutdown()
+        asgi_app = WorkerPoolASGI(app_module.app, workers=1, queue_depth=0, max_body=16)
+        assert (await call(asgi_app, 'POST', '/api/calculate', json.dumps(APPLICATION).encode()))[0] == 413
+        await asgi_app.shutdown()
+
+    asyncio.run(run())
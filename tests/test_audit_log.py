@@ -0,0 +1,164 @@
+"""
+Tests for the batched audit log: ordering, time-range queries, torn writes, backpressure and the endpoint
+"""
+
+import contextlib
+import io
+import sqlite3
+import threading
+import time
+
+import numpy as np
+import pytest
+
+import audit_log
+from audit_log import AuditLog, SegmentStore, read_audit
+
+
+@pytest.fixture
+def open_log(tmp_path):
+    """Create audit logs under the test directory, closed afterwards"""
+    logs = []
+
+    def create(name, **kwargs):
+        kwargs.setdefault('flush_interval', 0.01)
+        logs.append(AuditLog(str(tmp_path / name), **kwargs))
+        return logs[-1]
+    yield create
+    for log in logs:
+        log.close()
+
+
+@pytest.fixture
+def filled(open_log):
+    """1000 records from 4 concurrent writers over small batches and segments"""
+    log = open_log('audit', batch_size=50, flush_interval=0.05, segment_bytes=4096)
+    threads = [threading.Thread(target=lambda i=i: [log.record({'writer': i, 'n': n}) for n in range(250)])
+               for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert log.flush(timeout=10)
+    return log
+
+
+def test_concurrent_writers_keep_order(filled):
+    records = list(filled.query())
+    assert len(records) == 1000 and filled.stats()['written'] == 1000
+    assert all(a['ts'] < b['ts'] for a, b in zip(records, records[1:]))
+    for i in range(4):
+        assert [r['n'] for r in records if r['writer'] == i] == list(range(250))
+    assert len(SegmentStore(filled.path).segments()) > 3
+
+
+def test_range_queries_exact(filled):
+    # Time ranges seek through the batch index and cut exactly
+    records = list(filled.query())
+    assert list(filled.query(records[333]['ts'], records[777]['ts'])) == records[333:777]
+    assert list(read_audit(filled.path, end=records[10]['ts'])) == records[:10]
+
+
+def test_closed_log_rejects_records(filled):
+    filled.close()
+    with pytest.raises(RuntimeError):
+        filled.record({})
+
+
+def test_torn_write_and_restart(filled, open_log):
+    filled.close()
+    segments = SegmentStore(filled.path).segments()
+    # A torn last line from a crash is skipped
+    with open(segments[-1][2], 'ab') as f:
+        f.write(b'{"ts": 99999999999999999')
+    log = open_log('audit')
+    log.record({'writer': 'restart'})
+    records = list(log.query())
+    assert len(records) == 1001 and records[-1]['writer'] == 'restart'
+    log.close()
+    # A new log never appends to old segments
+    assert len(SegmentStore(filled.path).segments()) == len(segments) + 1
+
+
+@pytest.mark.parametrize('block_timeout', [0.0, 0.05])
+def test_full_queue_drops(open_log, block_timeout):
+    # At once, or after block_timeout; the writer catches up afterwards
+    release = threading.Event()
+    log = open_log('blocked', prepare=lambda records: release.wait(10), batch_size=2, max_queue=4,
+                   block_timeout=block_timeout)
+    start = time.perf_counter()
+    accepted = [log.record({'n': n}) for n in range(8)]
+    elapsed = time.perf_counter() - start
+    assert accepted.count(None) >= 1 and log.stats()['dropped'] == accepted.count(None)
+    assert elapsed < 0.04 if block_timeout == 0 else elapsed >= block_timeout
+    release.set()
+    assert log.flush(timeout=10)
+    assert len(list(log.query())) == 8 - accepted.count(None)
+
+
+def test_failed_write_retried(open_log, monkeypatch):
+    # A batch whose write failed part of the way is retried without duplicates
+    fsync, calls = audit_log.os.fsync, []
+
+    def failing_fsync(fd):
+        calls.append(fd)
+        if len(calls) == 1:
+            raise OSError("disk stalled")
+        fsync(fd)
+
+    monkeypatch.setattr(audit_log.os, 'fsync', failing_fsync)
+    log = open_log('retried', batch_size=10)
+    for n in range(10):
+        log.record({'n': n})
+    assert log.flush(timeout=10)
+    assert [r['n'] for r in log.query()] == list(range(10)) and log.stats()['write_errors'] == 1
+
+
+def test_unserializable_records_left_out(open_log):
+    # Only NumPy values are converted; other objects leave their record out instead of a repr
+    log = open_log('invalid')
+    log.record({'n': np.int64(1), 'memberships': np.array([0.5, 0.25])})
+    log.record({'n': 2, 'handle': object()})
+    log.record({'n': 3})
+    assert log.flush(timeout=10)
+    records = list(log.query())
+    assert [r['n'] for r in records] == [1, 3] and records[0]['memberships'] == [0.5, 0.25]
+    assert log.stats()['invalid'] == 1
+
+
+def test_sqlite_store(open_log):
+    log = open_log('audit.db', batch_size=10)
+    for n in range(25):
+        log.record({'n': n})
+    records = list(log.query())
+    assert [r['n'] for r in records] == list(range(25))
+    assert [r['n'] for r in log.query(records[5]['ts'], records[9]['ts'])] == [5, 6, 7, 8]
+    assert sqlite3.connect(log.path).execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+
+
+def test_calculate_decisions_audited(app_module, client, application, open_log, monkeypatch):
+    # With the model version and rule activations
+    log = open_log('decisions', prepare=audit_log.resolve_rule_activations)
+    monkeypatch.setattr(app_module, 'audit_log', log)
+    result = client.post('/api/calculate', json=dict(
+        application, include='input_values,approval_score,approval_category,analysis')).get_json()
+    client.post('/api/calculate', json=application)
+    monkeypatch.undo()
+
+    decisions = list(log.query())
+    assert len(decisions) == 2
+    decision = decisions[0]
+    assert decision['inputs'] == result['input_values']
+    assert decision['model'] == app_module.fuzzy_logic.model_fingerprint
+    assert round(decision['approval_score'], 2) == result['approval_score']
+    assert decision['approval_category'] == result['approval_category'] and '_model' not in decision
+    activations = result['analysis']['detailed_analysis']['rule_activation']
+    fired = {rule['rule_id']: rule['strength'] for rule in activations if rule['strength'] > 0}
+    assert {rule_id: strength for rule_id, strength in decision['rules']} == fired
+    assert decisions[1]['rules'] == decision['rules']
+
+    # The query CLI
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        assert audit_log.main([log.path, '--category', decision['approval_category'], '--count']) == 0
+    assert output.getvalue().strip() == '2'
@@ -0,0 +1,63 @@
+"""
+Tests for bulk file scoring against the single-application path
+"""
+
+import pandas as pd
+import pytest
+
+from batch_score import score_file
+
+ROWS = [
+    ('Modal Kerja', 'Mikro', 'Modal Kerja'),
+    ('Investasi', 'Kecil', 'Investasi'),
+    ('Investasi', 'Menengah', 'Investasi'),     # No rule fires
+    ('Pertambangan', 'Mikro', 'Modal Kerja'),   # Unknown business field
+    ('Investasi', 'Raksasa', 'Modal Kerja'),    # Unknown scale
+    ('Investasi', 'Kecil', ''),                 # Missing usage type
+] * 3
+
+
+@pytest.fixture
+def applicants(tmp_path):
+    path = tmp_path / 'applicants.csv'
+    path.write_text('business_field,scale,usage_type\n' + ''.join(','.join(row) + '\n' for row in ROWS))
+    return str(path)
+
+
+@pytest.fixture
+def scored(applicants, tmp_path):
+    output_path = str(tmp_path / 'scores.csv')
+    count, _ = score_file(applicants, output_path, chunksize=4)
+    assert count == len(ROWS)
+    return pd.read_csv(output_path, keep_default_na=False)
+
+
+def test_workers_do_not_change_output(applicants, tmp_path):
+    outputs = []
+    for workers in (1, 2):
+        output_path = tmp_path / f'scores_{workers}.csv'
+        score_file(applicants, str(output_path), chunksize=4, workers=workers)
+        outputs.append(output_path.read_text())
+    assert outputs[0] == outputs[1]
+
+
+def test_scores_match_evaluate(scored, processor, fuzzy):
+    for (field, scale, usage), (_, row) in zip(ROWS, scored.iterrows()):
+        assert (row['business_field'], row['scale'], row['usage_type']) == (field, scale, usage)
+        if row['error']:
+            assert row['approval_score'] == ''
+            continue
+        result = fuzzy.evaluate(fuzzy.scale_to_fuzzy_value(processor.get_scale_level(scale)),
+                                fuzzy.risk_to_fuzzy_value(processor.get_business_field_risk(field)),
+                                fuzzy.priority_to_fuzzy_value(processor.get_usage_priority(usage)))
+        assert abs(float(row['approval_score']) - round(result['approval_score'], 2)) < 1e-9
+        assert row['approval_category'] == result['approval_category']
+
+
+def test_errors_match_calculate(scored, client):
+    # Row errors are the messages /api/calculate returns
+    errors = list(scored['error'][:6])
+    assert errors[:2] == ['', ''] and all(errors[2:]), errors
+    for (field, scale, usage), error in zip(ROWS[2:6], errors[2:]):
+        response = client.post('/api/calculate', json={'business_field': field, 'scale': scale, 'usage_type': usage})
+        assert response.get_json()['error'] == error, (response.get_json(), error)
@@ -0,0 +1,42 @@
+"""
+Tests for the pipeline benchmark: JSON results and regression flagging
+"""
+
+import copy
+import importlib.util
+import json
+import os
+
+import pytest
+
+STAGES = ['data_processor_snapshot', 'calculate_approval_score', 'api_calculate']
+
+
+@pytest.fixture(scope='module')
+def pipeline(repo_root):
+    path = os.path.join(repo_root, 'benchmarks', 'pipeline.py')
+    spec = importlib.util.spec_from_file_location('pipeline_benchmark', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture(scope='module')
+def results(pipeline):
+    return json.loads(json.dumps(pipeline.run_suite(repeat=5, only=STAGES)))
+
+
+def test_stage_results(results):
+    assert list(results['stages']) == STAGES
+    for stage in results['stages'].values():
+        assert stage['min_ms'] <= stage['p50_ms'] <= stage['p90_ms'] <= stage['p99_ms'] <= stage['max_ms']
+        assert stage['peak_memory_kib'] > 0
+
+
+def test_regressions_flagged(pipeline, results):
+    # Identical results never regress; a much faster baseline does
+    assert pipeline.compare(results, results) == []
+    baseline = copy.deepcopy(results)
+    baseline['stages']['api_calculate']['p50_ms'] = results['stages']['api_calculate']['p50_ms'] / 10
+    regressions = pipeline.compare(results, baseline)
+    assert [(name, metric) for name, metric, _, _ in regressions] == [('api_calculate', 'p50_ms')]
@@ -0,0 +1,52 @@
+"""
+Tests for response compression and encoding negotiation
+"""
+
+import gzip
+import json
+
+import pytest
+from flask import Flask, jsonify, request
+from werkzeug.datastructures import Accept
+from werkzeug.http import parse_accept_header
+
+from compression import choose_encoding, install_compression
+
+
+@pytest.fixture
+def compressed_client():
+    app = Flask(__name__)
+    install_compression(app, min_size=100)
+
+    @app.route('/data')
+    def data():
+        response = jsonify({'values': list(range(int(request.args.get('n', 1000))))})
+        response.add_etag()
+        return response.make_conditional(request)
+
+    return app.test_client()
+
+
+def test_large_responses_compressed(compressed_client):
+    response = compressed_client.get('/data', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip' and 'Accept-Encoding' in response.headers['Vary']
+    assert json.loads(gzip.decompress(response.data)) == {'values': list(range(1000))}
+    assert response.headers['ETag'].startswith('W/')
+    assert compressed_client.get('/data', headers={'Accept-Encoding': 'gzip',
+                                                   'If-None-Match': response.headers['ETag']}).status_code == 304
+
+
+def test_uncompressed(compressed_client):
+    assert 'Content-Encoding' not in compressed_client.get('/data').headers
+    # Below the size threshold
+    assert 'Content-Encoding' not in compressed_client.get('/data?n=5', headers={'Accept-Encoding': 'gzip'}).headers
+
+
+@pytest.mark.parametrize('header, brotli_available, expected', [
+    ('gzip, deflate, br', True, 'br'),
+    ('gzip, deflate, br', False, 'gzip'),
+    ('br;q=0.5, gzip', True, 'gzip'),
+    ('identity', False, None),
+])
+def test_choose_encoding(header, brotli_available, expected):
+    assert choose_encoding(parse_accept_header(header, Accept), brotli_available=brotli_available) == expected
@@ -0,0 +1,90 @@
+"""
+Tests for BPS table parsing, the parsed-data snapshot and the precomputed aggregates
+"""
+
+import os
+import shutil
+import subprocess
+import sys
+
+import pytest
+
+from data_processor import UMKMDataProcessor
+
+
+def test_bundled_file_parsed(processor):
+    # The header test also matches "Bukan Lapangan Usaha Lainnya", so the
+    # business field section of the bundled file starts below it
+    assert processor.business_fields == {
+        'Jenis Penggunaan': 1457132, 'Modal Kerja': 1053972, 'Investasi': 403160,
+        ' Skala Usaha': 1457132, ' Mikro': 662293, 'Kecil': 460773, 'Menengah': 334066}
+    assert processor.usage_types == {
+        'Modal Kerja': 1053972, 'Investasi': 403160, 'Skala Usaha': 1457132,
+        'Mikro': 662293, 'Kecil': 460773, 'Menengah': 334066}
+    assert processor.scales == {'Mikro': 662293, 'Kecil': 460773, 'Menengah': 334066}
+    assert len(processor.data) == 30
+
+
+def test_edge_cases_parsed(tmp_path):
+    path = tmp_path / 'regional.csv'
+    path.write_text('Judul\nSubjudul\n'
+                    'Lapangan Usaha,100\n"Pertanian, Kehutanan",60\nPerikanan,-\nKonstruksi,40\n'
+                    'Jenis Penggunaan,\nModal Kerja, 70\nInvestasi,NA\n\n  \n'
+                    'Skala Usaha,\n Mikro ,50\n,\nKecil,30\n')
+    processor = UMKMDataProcessor(str(path))
+    # Header rows without an amount end the previous section
+    assert processor.business_fields == {'Pertanian, Kehutanan': 60, 'Konstruksi': 40}
+    assert processor.usage_types == {'Modal Kerja': 70}
+    assert processor.scales == {'Mikro': 50, 'Kecil': 30}
+
+
+@pytest.fixture
+def copied_csv(csv_file, tmp_path):
+    path = str(tmp_path / 'umkm.csv')
+    shutil.copyfile(csv_file, path)
+    return path
+
+
+def test_snapshot_reproduces_parsed_data(copied_csv):
+    parsed = UMKMDataProcessor(copied_csv)
+    assert not parsed.from_snapshot and os.path.exists(copied_csv + '.snapshot')
+    loaded = UMKMDataProcessor(copied_csv)
+    assert loaded.from_snapshot
+    for name in ('business_fields', 'usage_types', 'scales', 'risk_levels'):
+        assert list(getattr(loaded, name).items()) == list(getattr(parsed, name).items()), name
+
+
+def test_stale_snapshot_ignored(copied_csv):
+    UMKMDataProcessor(copied_csv)
+    # New mtime, same content: still valid through the hash
+    os.utime(copied_csv, ns=(0, 0))
+    assert UMKMDataProcessor(copied_csv).from_snapshot
+
+    with open(copied_csv, 'a') as f:
+        f.write('\nUsaha Baru,5\n')
+    changed = UMKMDataProcessor(copied_csv)
+    assert not changed.from_snapshot and changed.scales['Usaha Baru'] == 5
+    assert not UMKMDataProcessor(copied_csv, snapshot_path=False).from_snapshot
+
+
+def test_snapshot_loads_without_pandas(copied_csv, repo_root):
+    UMKMDataProcessor(copied_csv)
+    code = ("import sys; from data_processor import UMKMDataProcessor; "
+            "p = UMKMDataProcessor(sys.argv[1]); print(p.from_snapshot, 'pandas' in sys.modules)")
+    output = subprocess.run([sys.executable, '-c', code, copied_csv], capture_output=True, text=True,
+                            cwd=repo_root, check=True).stdout
+    assert output.split() == ['True', 'False'], output
+
+
+def test_aggregates_built_once(processor):
+    statistics = processor.get_statistics()
+    assert processor.get_statistics() is statistics
+    assert statistics['total_credit'] == f"{sum(processor.business_fields.values()):,} Miliar"
+    assert sum(statistics['risk_distribution'].values()) == len(processor.business_fields)
+    assert statistics['top_business_fields'][0][1] == max(processor.business_fields.values())
+    assert processor.get_chart_data()['scales'] == {'labels': list(processor.scales),
+                                                    'values': list(processor.scales.values())}
+    assert processor.get_options()['usage_types'] == processor.get_all_usage_types()
+
+    processor.process_data()
+    assert processor.get_statistics() is not statistics
@@ -0,0 +1,100 @@
+"""
+Tests for the dataset store: lazy loading, eviction and per-request selection
+"""
+
+import threading
+
+import pytest
+
+import data_store
+from data_processor import UMKMDataProcessor
+from data_store import DatasetStore
+
+
+@pytest.fixture
+def datasets(manifest):
+    # A region where working capital credit is far smaller
+    return manifest([('2023', 'Indonesia', 'nasional.csv', None),
+                     ('2023', 'Jawa Barat', 'jabar.csv', ('1053972', '53972'))], default='2023/Indonesia')
+
+
+def test_datasets_load_on_first_access(datasets, processor):
+    store = DatasetStore.from_manifest(datasets)
+    assert store.keys() == [('2023', 'Indonesia'), ('2023', 'Jawa Barat')]
+    assert store.stats()['loaded'] == [] and store.loads == 0
+    national = store.get()
+    assert national.key == ('2023', 'Indonesia') and store.get('2023/Indonesia') is national
+    for name in ('business_fields', 'usage_types', 'scales', 'risk_levels'):
+        assert getattr(national, name) == getattr(processor, name), name
+    assert national.get_statistics() == processor.get_statistics()
+    assert store.lookup('2023', 'Jawa Barat', 'Modal Kerja')[:2] == ('business_field', 53972)
+    assert store.loads == 2
+
+
+def test_eviction_reloads_from_snapshot(datasets, monkeypatch):
+    national = DatasetStore.from_manifest(datasets).get()
+    # A budget below two datasets keeps only the most recently used one
+    small = DatasetStore.from_manifest(datasets, memory_budget=national.nbytes + 1)
+    small.get()
+    small.get({'period': '2023', 'region': 'Jawa Barat'})
+    small.get(('2023', 'Indonesia'))
+    assert small.stats()['loaded'] == ['2023/Indonesia'] and small.evictions == 2
+
+    parsed = []
+    original = UMKMDataProcessor.process_data
+    monkeypatch.setattr(UMKMDataProcessor, 'process_data', lambda self: parsed.append(self) or original(self))
+    small.get('2023/Jawa Barat')
+    assert not parsed and small.loads == 4
+    assert national.nbytes > national.features.nbytes > 0
+
+
+def test_loading_does_not_block_readers(datasets, monkeypatch):
+    started, release = threading.Event(), threading.Event()
+
+    class SlowProcessor(UMKMDataProcessor):
+        def __init__(self, *args, **kwargs):
+            started.set()
+            release.wait(10)
+            super().__init__(*args, **kwargs)
+
+    store = DatasetStore.from_manifest(datasets)
+    loaded = store.get()
+    monkeypatch.setattr(data_store, 'UMKMDataProcessor', SlowProcessor)
+    loader = threading.Thread(target=store.get, args=('2023/Jawa Barat',))
+    try:
+        loader.start()
+        assert started.wait(10)
+        read = []
+        reader = threading.Thread(target=lambda: read.append(store.get()))
+        reader.start()
+        reader.join(5)
+        assert read == [loaded]
+    finally:
+        release.set()
+        loader.join()
+    assert store.stats()['loaded'] == ['2023/Indonesia', '2023/Jawa Barat']
+
+
+@pytest.mark.parametrize('key', ['2020/Indonesia', '2023', 42])
+def test_unknown_key_rejected(datasets, key):
+    with pytest.raises((TypeError, ValueError)):
+        DatasetStore.from_manifest(datasets).get(key)
+
+
+def test_requests_select_dataset(datasets, app_module, client, monkeypatch):
+    application = {'business_field': 'Modal Kerja', 'scale': 'Kecil', 'usage_type': 'Modal Kerja'}
+    response = client.post('/api/calculate', json=dict(application, dataset='2023/Jawa Barat'))
+    assert 'tidak diaktifkan' in response.get_json()['error']
+
+    monkeypatch.setattr(app_module, 'dataset_store', DatasetStore.from_manifest(datasets))
+    default = client.post('/api/calculate', json=application).get_json()
+    regional = client.post('/api/calculate', json=dict(application, dataset='2023/Jawa Barat')).get_json()
+    assert default['input_values']['dataset'] == '2023/Indonesia'
+    assert regional['input_values']['dataset'] == '2023/Jawa Barat'
+    assert regional['approval_score'] < default['approval_score']
+    assert 'dataset=2023/Jawa' in regional['visualization_url']
+    assert client.post('/api/calculate', json=dict(application, dataset='2019/Bali')).status_code == 400
+    statistics = client.get('/api/statistics?dataset=2023/Jawa Barat').get_json()
+    assert statistics['usage_distribution']['Modal Kerja'] == '53,972 Miliar'
+    assert [d['key'] for d in client.get('/api/datasets').get_json()['datasets']] == [
+        '2023/Indonesia', '2023/Jawa Barat']
@@ -0,0 +1,63 @@
+"""
+Tests for the input feature table: continuous levels, bucket compatibility, growth and the endpoint
+"""
+
+import pytest
+
+from data_processor import UMKMDataProcessor
+from data_store import DatasetStore
+from features import RISK_RANGE, FeatureTable, herfindahl
+
+SCALES = ('Mikro', 'Kecil', 'Menengah')
+
+
+@pytest.fixture
+def continuous(csv_file):
+    return UMKMDataProcessor(csv_file, feature_mode='continuous')
+
+
+def test_continuous_levels(continuous):
+    # Larger credit share, lower risk; distinct shares get distinct levels
+    fields = sorted(continuous.business_fields, key=continuous.business_fields.get)
+    risks = [continuous.get_business_field_risk(field) for field in fields]
+    assert all(a >= b for a, b in zip(risks, risks[1:])), risks
+    assert len(set(risks)) == len(set(continuous.business_fields.values())) > 4
+    assert RISK_RANGE[0] <= min(risks) and max(risks) <= RISK_RANGE[1]
+    levels = [continuous.get_scale_level(scale) for scale in SCALES]
+    assert levels == sorted(levels) and 0 < levels[0] and levels[-1] < 1
+    assert continuous.get_usage_priority('Modal Kerja') > continuous.get_usage_priority('Investasi')
+    assert continuous.get_usage_priority('Tidak Ada') == 0.3
+
+
+def test_buckets_are_the_fixed_lookups(processor):
+    assert set(processor.risk_levels.values()) <= {0.2, 0.4, 0.6, 0.8}
+    assert processor.get_usage_priority('Modal Kerja') == 0.7 and processor.get_usage_priority('Investasi') == 0.5
+    assert [processor.get_scale_level(scale) for scale in SCALES] == [0.165, 0.5, 0.835]
+
+
+def test_table_helpers(processor):
+    assert herfindahl({'a': 1, 'b': 1}) == 0.0 and herfindahl({'a': 1, 'b': 0}) == 1.0
+    with pytest.raises(ValueError):
+        FeatureTable.build(processor, mode='kuartil')
+
+
+def test_growth_lowers_risk(manifest, continuous):
+    # Investment credit a year earlier was half as large, working capital the same
+    path = manifest([('2023', 'Indonesia', '2023.csv', None),
+                     ('2022', 'Indonesia', '2022.csv', ('Investasi,403160', 'Investasi,201580'))])
+    store = DatasetStore.from_manifest(path, feature_mode='continuous')
+    assert store.history(('2023', 'Indonesia')) == [('2022', 'Indonesia')]
+    grown = store.get('2023/Indonesia')
+    rows = {row['name']: row for row in grown.get_features()['rows'] if row['section'] == 'business_field'}
+    assert rows['Investasi']['growth'] > 0 and rows['Modal Kerja']['growth'] == 0
+    assert grown.get_business_field_risk('Investasi') < continuous.get_business_field_risk('Investasi')
+    assert store.get('2022/Indonesia').features.rows[('business_field', 'Investasi')]['growth'] is None
+
+
+def test_features_endpoint(app_module, client):
+    features = client.get('/api/features').get_json()
+    # Bucket mode stays the default so existing scores do not change
+    assert features['mode'] == 'buckets'
+    assert set(features['concentration']) == {'business_field', 'usage_type', 'scale'}
+    assert {row['name']: row['level'] for row in features['rows'] if row['section'] == 'business_field'} == \
+        app_module.data_processor.risk_levels
@@ -0,0 +1,102 @@
+"""
+Tests for incremental model edits: what a term or rule change keeps
+"""
+
+import numpy as np
+import pytest
+
+from fuzzy_logic import UMKMFuzzyLogic
+from fuzzy_surface import ScoreSurface
+
+RESOLUTION = 21
+
+
+@pytest.fixture
+def warm(fuzzy):
+    """A model with a surface, cached results over a grid and one rendered image"""
+    fuzzy.compile_surface(resolution=RESOLUTION)
+    for s in range(0, 101, 10):
+        for r in range(0, 101, 10):
+            for p in (30, 50, 70):
+                try:
+                    fuzzy.evaluate(s, r, p)
+                except ValueError:
+                    pass
+    fuzzy.render_visualization_png(50, 20, 50, 40.0)
+    return fuzzy
+
+
+def check(fuzzy):
+    """Carried results and the patched surface equal those of a model built from scratch"""
+    fresh = UMKMFuzzyLogic()
+    fresh.update_definition(fuzzy.definition)
+    assert fresh.model_fingerprint == fuzzy.model_fingerprint
+    for key, result in fuzzy.cache.items():
+        if key[0] != fuzzy.model_fingerprint:
+            continue
+        try:
+            expected = fresh._evaluate(*key[1:4], detailed=len(key) == 4)
+        except ValueError as e:
+            expected = str(e)
+        # Uncovered inputs: the message quotes the values as first given
+        assert result == expected if isinstance(result, dict) else isinstance(expected, str), key
+    surface = ScoreSurface.build(fuzzy.engine, RESOLUTION)
+    assert np.array_equal(surface.values, fuzzy.surface.values, equal_nan=True)
+
+
+def test_rule_weight_edit(warm):
+    # Only where that rule fires
+    update = warm.set_rule(0, dict(warm.definition['rules'][0], weight=0.5))
+    assert len(update['changes']['removed_rules']) == len(update['changes']['added_rules']) == 1
+    assert update['cache_kept'] > 10 * update['cache_dropped'] > 0, update
+    assert update['images_kept'] == 1 and 0 < update['surface_nodes'] < RESOLUTION ** 3 / 2
+    check(warm)
+    hits = warm.image_cache.hits
+    warm.render_visualization_png(50, 20, 50, 40.0)
+    assert warm.image_cache.hits == hits + 1
+
+
+def test_term_edit(warm):
+    # Only where the membership function changes; images are redrawn on the same figure
+    canvas = warm._visualization[1]
+    update = warm.set_term('risk_level', 'tinggi', [55, 80, 100])
+    assert update['changes']['input_terms'] == ['risk_level[tinggi]'] and update['images_kept'] == 0
+    assert 0 < update['cache_dropped'] and 0 < update['cache_kept']
+    check(warm)
+    warm.render_visualization_png(50, 20, 50, 40.0)
+    assert warm._visualization[1] is canvas
+
+
+def test_rule_removal(warm):
+    # Removing a rule renumbers the rules: cached results keep their score, not their analysis
+    update = warm.set_rule(len(warm.definition['rules']) - 1, None)
+    assert not update['changes']['added_rules']
+    assert all(len(key) == 5 for key, result in warm.cache.items()
+               if key[0] == warm.model_fingerprint and isinstance(result, dict))
+    check(warm)
+
+
+def test_switching_back_reuses_cache(warm):
+    first = warm.model
+    warm.add_rule(dict(warm.definition['rules'][0], weight=0.5))
+    hits = warm.cache.hits
+    warm.install_model(first)
+    warm.evaluate(50, 20, 50, detailed=False)
+    assert warm.cache.hits == hits + 1
+
+
+def test_structural_edit_starts_over(warm):
+    update = warm.set_term('risk_level', 'ekstrem', [90, 100, 100])
+    assert update['changes'] == {'full': True} and update['cache_kept'] == 0 and warm.surface is None
+
+
+@pytest.mark.parametrize('edit', [
+    lambda fuzzy: fuzzy.set_term('risk_level', 'tinggi', [80, 50, 100]),
+    lambda fuzzy: fuzzy.set_rule(0, {'if': {'risk_level': 'sangat_tinggi'}, 'then': 'tinggi'}),
+    lambda fuzzy: fuzzy.set_rule(99, None),
+])
+def test_invalid_edit_rejected(fuzzy, edit):
+    fingerprint = fuzzy.model_fingerprint
+    with pytest.raises(ValueError):
+        edit(fuzzy)
+    assert fuzzy.model_fingerprint == fingerprint
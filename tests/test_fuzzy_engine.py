@@ -0,0 +1,158 @@
+"""
+Tests for the vectorized inference engine against skfuzzy
+"""
+
+import copy
+
+import numpy as np
+import pytest
+
+from fuzzy_engine import (DEFUZZIFIERS, SKFUZZY_TOLERANCE, AntecedentIndex, SharedEngine, antecedent_strengths,
+                          trimf)
+from fuzzy_logic import UMKMFuzzyLogic
+from fuzzy_model import compile_definition, compile_model, definition_model, rule_warnings, validate_definition
+
+
+def test_batch_scores_match_skfuzzy(fuzzy):
+    # Grid over the universes plus out-of-range values that must be clipped
+    grid = np.array([-10, 0, 10, 16.5, 25, 33.3, 50, 62.5, 70, 83.5, 95, 100, 120])
+    scale, risk, priority = [a.ravel() for a in np.meshgrid(grid, grid, grid, indexing='ij')]
+    scores = fuzzy.calculate_approval_scores(scale, risk, priority)
+    assert scores.shape == scale.shape
+
+    for s, r, p, batch in zip(scale, risk, priority, scores):
+        try:
+            exact = fuzzy.reference_approval_score(s, r, p)
+        except ValueError:
+            # No rule fires: the batch path reports NaN instead of raising
+            assert np.isnan(batch), (s, r, p, batch)
+            continue
+        assert abs(exact - batch) <= SKFUZZY_TOLERANCE, (s, r, p)
+
+
+def test_scalars_broadcast(fuzzy):
+    single = fuzzy.calculate_approval_scores(50, 50, [30, 70])
+    assert single.shape == (2,)
+    assert abs(single[1] - fuzzy.reference_approval_score(50, 50, 70)) <= SKFUZZY_TOLERANCE
+
+
+@pytest.mark.parametrize('inputs', [(50, 40, 70), (16.5, 60, 30), (83.5, 20, 50), (35, 45, 65)])
+def test_rule_activation(fuzzy, inputs):
+    """Detailed analysis reports the rule strengths and memberships skfuzzy computes"""
+    result = fuzzy.evaluate(*inputs)
+    analysis = result['detailed_analysis']
+
+    # skfuzzy keeps each rule's firing strength on the simulation after compute()
+    assert abs(fuzzy.reference_approval_score(*inputs) - result['approval_score']) <= SKFUZZY_TOLERANCE
+    assert len(analysis['rule_activation']) == len(fuzzy.rules)
+    for rule, activation in zip(fuzzy.rules, analysis['rule_activation']):
+        assert abs(activation['strength'] - rule.aggregate_firing[fuzzy.approval_simulation]) < 1e-12, activation
+
+    for variable, key in [(fuzzy.business_scale, 'scale'), (fuzzy.risk_level, 'risk'),
+                          (fuzzy.usage_priority, 'priority')]:
+        for term, degree in analysis['input_analysis'][key].items():
+            assert abs(degree - variable[term].membership_value[fuzzy.approval_simulation]) < 1e-12
+
+    # The aggregate set is the max of the clipped output terms
+    assert abs(max(analysis['aggregate_output']['membership']) - max(analysis['output_activation'].values())) < 1e-12
+
+
+def engine(method='centroid', output_set='sampled', step=1):
+    """The bundled model with the given defuzzification on universes of the given step"""
+    definition = copy.deepcopy(UMKMFuzzyLogic.default_definition())
+    for spec in definition['inputs'] + [definition['output']]:
+        spec['universe'] = {'min': 0.0, 'max': 100.0, 'step': float(step)}
+    definition['defuzzification'] = {'method': method, 'output_set': output_set}
+    return compile_definition(validate_definition(definition)).engine
+
+
+# Only 'sedang' [40, 60, 80] clipped at 0.5: a plateau from 50 to 70
+PLATEAU = {'centroid': 60, 'bisector': 60, 'mom': 60, 'som': 50, 'lom': 70}
+
+
+@pytest.mark.parametrize('output_set', ['sampled', 'analytic'])
+@pytest.mark.parametrize('method', DEFUZZIFIERS)
+def test_defuzzifiers_on_plateau(method, output_set):
+    assert abs(engine(method, output_set).defuzzify(np.array([[0, 0, 0.5, 0, 0]]))[0] - PLATEAU[method]) < 1e-9
+
+
+def test_empty_set_is_nan():
+    assert np.isnan(engine('mom', 'analytic').defuzzify(np.zeros((1, 5)))[0])
+
+
+def test_analytic_centroid_is_exact():
+    analytic = engine('centroid', 'analytic')
+    triangles = list(UMKMFuzzyLogic.default_definition()['output']['terms'].values())
+    fine = np.linspace(0, 100, 200001)
+    rng = np.random.default_rng(0)
+    for _ in range(20):
+        cuts = rng.uniform(0, 1, (1, 5)) * (rng.uniform(0, 1, 5) < 0.6)
+        if not cuts.any():
+            continue
+        membership = np.max([np.minimum(cut, trimf(fine, abc)) for cut, abc in zip(cuts[0], triangles)], axis=0)
+        assert abs(analytic.defuzzify(cuts)[0] - (fine * membership).sum() / membership.sum()) < 1e-3
+
+    # The same at any step, while sampling leaves a small error
+    scale, risk, priority = rng.uniform(0, 100, (3, 2000))
+    exact = analytic.evaluate(scale, risk, priority)
+    assert np.allclose(engine('centroid', 'analytic', step=0.25).evaluate(scale, risk, priority), exact,
+                       equal_nan=True, atol=1e-9)
+    assert np.array_equal(np.isnan(engine().evaluate(scale, risk, priority)), np.isnan(exact))
+
+
+def test_defuzzification_is_validated_and_fingerprinted():
+    assert engine('centroid', 'analytic').fingerprint() != engine().fingerprint() != engine('bisector').fingerprint()
+    assert engine().fingerprint() == UMKMFuzzyLogic().model_fingerprint
+    with pytest.raises(ValueError):
+        validate_definition(dict(UMKMFuzzyLogic.default_definition(), defuzzification={'method': 'median'}))
+
+
+@pytest.fixture
+def redundant(definition):
+    """The bundled definition plus duplicate, shadowed, unreachable and contradicting rules"""
+    first = definition['rules'][0]
+    # Between two grid points, so zero over the whole sampled universe
+    definition['inputs'][1]['terms']['kosong'] = [50.5, 50.5, 50.5]
+    definition['rules'] += [
+        copy.deepcopy(first),
+        # More general than rule 14 (index 13), same conclusion
+        {'if': {'business_scale': 'mikro', 'risk_level': 'tinggi'}, 'then': 'rendah'},
+        {'if': {'business_scale': 'kecil', 'risk_level': 'kosong'}, 'then': 'sedang'},
+        {'if': dict(first['if']), 'then': 'sangat_rendah'},
+    ]
+    return validate_definition(definition)
+
+
+def test_rule_pruning_warnings(redundant):
+    model = compile_definition(redundant)
+    reasons = {rule: (reason, other) for rule, reason, other in model.engine.redundant}
+    assert reasons == {13: ('dominated', 16), 15: ('duplicate', 0), 17: ('unreachable', None)}, reasons
+    assert len(model.engine.scoring_rules) == model.engine.n_rules - 3
+    warnings = rule_warnings(model)
+    assert len(warnings) == 4 and 'shadowed by rule 17' in warnings[0] and 'duplicates rule 1' in warnings[1]
+    assert 'never fires' in warnings[2] and 'contradicts rule 1' in warnings[3]
+
+
+def test_pruned_scores_unchanged(redundant):
+    pruned = compile_definition(redundant).engine
+    reference = compile_model(*definition_model(redundant), prune=False).engine
+    assert len(reference.scoring_rules) == reference.n_rules
+    inputs = np.random.default_rng(0).uniform(0, 100, size=(3, 5000))
+    scores, strength = pruned.evaluate(*inputs, return_strength=True)
+    expected, expected_strength = reference.evaluate(*inputs, return_strength=True)
+    assert np.array_equal(scores, expected, equal_nan=True) and np.array_equal(strength, expected_strength)
+    for row in inputs.T[:200]:
+        assert np.array_equal(pruned.evaluate(*row), reference.evaluate(*row), equal_nan=True)
+    shared = SharedEngine([pruned, reference])
+    assert np.array_equal(shared.evaluate(*inputs), np.stack([expected, expected]), equal_nan=True)
+    # The trace still lists every rule
+    assert np.array_equal(pruned.infer(*inputs)['strengths'], reference.infer(*inputs)['strengths'])
+
+
+def test_single_row_evaluates_live_antecedents(redundant):
+    pruned = compile_definition(redundant).engine
+    memberships = pruned.fuzzify([np.array([30.0]), np.array([20.0]), np.array([80.0])])
+    index = AntecedentIndex(pruned.rule_antecedents, pruned.term_counts)
+    live = (np.concatenate(memberships + [np.ones((1, 1))], axis=1) > 0).any(axis=0)[index.columns].all(axis=1)
+    assert 0 < live.sum() < pruned.n_rules
+    assert np.array_equal(index.strengths(memberships), antecedent_strengths(memberships, pruned.rule_antecedents))
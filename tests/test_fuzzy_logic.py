@@ -0,0 +1,69 @@
+"""
+Tests for UMKMFuzzyLogic: thread safety, visualizations and the inference-only mode
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from fuzzy_engine import SKFUZZY_TOLERANCE
+from fuzzy_logic import UMKMFuzzyLogic
+
+
+def test_concurrent_scoring_matches_serial(fuzzy):
+    inputs = [tuple(row) for row in np.random.default_rng(42).uniform(0, 100, size=(400, 3))]
+
+    def score(row):
+        try:
+            return fuzzy.calculate_approval_score(*row)
+        except ValueError:
+            return None
+
+    serial = [score(row) for row in inputs]
+
+    # Every thread scores the whole list, in a different order
+    def worker(seed):
+        results = [None] * len(inputs)
+        for i in np.random.default_rng(seed).permutation(len(inputs)):
+            results[i] = score(inputs[i])
+        return results
+
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        assert all(results == serial for results in pool.map(worker, range(16)))
+
+    # Serial results agree with skfuzzy, which is only safe under its lock
+    for row, value in zip(inputs[:50], serial[:50]):
+        if value is not None:
+            assert abs(value - fuzzy.reference_approval_score(*row)) <= SKFUZZY_TOLERANCE
+
+
+def test_concurrent_visualizations(fuzzy):
+    # Rendered from several threads without sharing pyplot state
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        images = list(pool.map(lambda v: fuzzy.generate_fuzzy_visualization(v, 50, 70, 60), [10, 30, 50, 70]))
+    assert all(len(image) > 0 for image in images)
+
+
+def test_visualization_image_cache(fuzzy):
+    # The background is rendered once; identical requests come from the image cache
+    first = fuzzy.render_visualization_png(50, 40, 50, 60)
+    assert fuzzy.render_visualization_png(50, 40, 50, 60) is first
+    assert fuzzy.render_visualization_png(16.5, 40, 50, 30) != first
+    assert fuzzy.image_cache.hits == 1
+
+
+def test_summary_result(fuzzy):
+    summary = fuzzy.evaluate(83.5, 20, 70, detailed=False)
+    assert 'detailed_analysis' not in summary
+    assert summary['approval_score'] == UMKMFuzzyLogic().evaluate(83.5, 20, 70)['approval_score']
+
+
+def test_inference_only(fuzzy):
+    lean = UMKMFuzzyLogic(inference_only=True)
+    assert lean.evaluate(50, 40, 50)['approval_score'] == fuzzy.evaluate(50, 40, 50)['approval_score']
+    # Neither skfuzzy nor matplotlib is loaded
+    with pytest.raises(RuntimeError):
+        lean.rules
+    with pytest.raises(RuntimeError):
+        lean.render_visualization_png(50, 40, 50, 60)
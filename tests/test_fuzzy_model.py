@@ -0,0 +1,125 @@
+"""
+Tests for the declarative model file: the default model, validation, coverage gaps and hot reload
+"""
+
+import copy
+import threading
+
+import pytest
+
+import fuzzy_logic as fuzzy_logic_module
+from batch_score import DEFAULT_DATA_FILE, ApplicationScorer
+from fuzzy_engine import SKFUZZY_TOLERANCE
+from fuzzy_logic import UMKMFuzzyLogic
+from fuzzy_model import coverage_gaps, load_definition, validate_definition
+
+
+def test_bundled_file_is_the_default(app_module, fuzzy):
+    # The one model the API, the library and the bulk CLI score with
+    assert load_definition(fuzzy_logic_module.DEFAULT_MODEL_PATH) == UMKMFuzzyLogic.default_definition()
+    assert app_module.fuzzy_logic.model_path == fuzzy_logic_module.DEFAULT_MODEL_PATH
+    assert fuzzy.model_fingerprint == app_module.fuzzy_logic.model_fingerprint
+
+
+def test_edited_default_used_everywhere(app_module, definition, write_json, monkeypatch):
+    definition['rules'][0]['then'] = 'sedang'
+    monkeypatch.setattr(fuzzy_logic_module, 'DEFAULT_MODEL_PATH', write_json('fuzzy_model.json', definition))
+    fingerprint = UMKMFuzzyLogic().model_fingerprint
+    assert fingerprint != app_module.fuzzy_logic.model_fingerprint
+    assert ApplicationScorer(DEFAULT_DATA_FILE).fuzzy.model_fingerprint == fingerprint
+
+
+def test_every_problem_reported(definition):
+    definition['inputs'][0]['terms']['kecil'] = [50, 20, 80]
+    definition['rules'][0]['if']['risk_level'] = 'ekstrem'
+    definition['rules'][1]['then'] = 'maksimal'
+    definition['rules'][2]['if']['omzet'] = 'besar'
+    definition['rules'][3]['weight'] = 2
+    with pytest.raises(ValueError) as error:
+        validate_definition(definition)
+    for expected in ("a <= b <= c", "no term 'ekstrem'", "no term 'maksimal'", "unknown input 'omzet'",
+                     "weight must be"):
+        assert expected in str(error.value), expected
+
+
+def test_renamed_input_rejected(definition):
+    definition['inputs'][0]['name'] = 'skala'
+    with pytest.raises(ValueError):
+        UMKMFuzzyLogic.check_definition(validate_definition(definition))
+
+
+def test_coverage_gaps(fuzzy):
+    gaps = coverage_gaps(fuzzy.model)
+    assert {'business_scale': 'menengah', 'risk_level': 'tinggi', 'usage_priority': 'tinggi'} in gaps
+    assert {'business_scale': 'menengah', 'risk_level': 'rendah', 'usage_priority': 'tinggi'} not in gaps
+
+
+def test_weighted_rules_match_skfuzzy(definition, write_json, fuzzy):
+    definition['rules'][0]['weight'] = 0.5
+    weighted = UMKMFuzzyLogic(model_path=write_json('weighted.json', definition))
+    assert weighted.model_fingerprint != fuzzy.model_fingerprint
+    assert abs(weighted.calculate_approval_score(83.5, 10, 90) -
+               weighted.reference_approval_score(83.5, 10, 90)) < SKFUZZY_TOLERANCE
+
+
+def test_yaml_definition(definition, tmp_path):
+    yaml = pytest.importorskip('yaml')
+    path = tmp_path / 'model.yaml'
+    with open(path, 'w') as f:
+        yaml.safe_dump(definition, f, sort_keys=False)
+    assert load_definition(str(path)) == UMKMFuzzyLogic.default_definition()
+
+
+@pytest.fixture
+def reloadable(definition, write_json):
+    """A model loaded from its own file, and a writer for that file"""
+    path = write_json('model.json', definition)
+    fuzzy = UMKMFuzzyLogic(model_path=path)
+    assert not fuzzy.reload_if_changed()
+    return fuzzy, lambda data: write_json('model.json', data)
+
+
+def test_hot_reload_under_load(reloadable, definition):
+    fuzzy, write = reloadable
+    old_fingerprint = fuzzy.model_fingerprint
+    failures = []
+    stop = threading.Event()
+
+    def score():
+        while not stop.is_set():
+            fuzzy.cache.clear()
+            try:
+                result = fuzzy.evaluate(83.5, 90, 90)
+            except ValueError:
+                continue  # Old model: no rule covers this input
+            except Exception as e:
+                failures.append(e)
+                continue
+            if len(result['detailed_analysis']['rule_activation']) != 16:
+                failures.append(result)
+
+    threads = [threading.Thread(target=score) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    covered = copy.deepcopy(definition)
+    covered['rules'].append({'if': {'business_scale': 'menengah', 'risk_level': 'tinggi',
+                                    'usage_priority': 'tinggi'}, 'then': 'sedang'})
+    write(covered)
+    assert fuzzy.reload_if_changed()
+    fuzzy.evaluate(83.5, 90, 90)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    assert not failures, failures[:3]
+    assert fuzzy.model_fingerprint != old_fingerprint and fuzzy.engine.n_rules == 16
+    assert not fuzzy.reload_if_changed(min_interval=3600)
+
+
+def test_failed_reload_keeps_model(reloadable):
+    fuzzy, _ = reloadable
+    with open(fuzzy.model_path, 'w') as f:
+        f.write('{"inputs": ')
+    # Reported once
+    with pytest.raises(ValueError):
+        fuzzy.reload_if_changed()
+    assert fuzzy.engine.n_rules == 15 and not fuzzy.reload_if_changed()
@@ -0,0 +1,63 @@
+"""
+Tests for what-if sweeps: score grid, derivatives, crossings and targets
+"""
+
+import numpy as np
+import pytest
+
+
+def test_one_input_sweep(fuzzy):
+    # Kecil, high priority: lowering the risk moves the score up through categories
+    result = fuzzy.sensitivity(50, 60, 30, vary='risk_level', points=1001)
+    risk = np.array(result['axes']['risk_level'])
+    scores = np.array(result['scores'], dtype=np.float64)
+    assert np.allclose(scores, fuzzy.calculate_approval_scores(50, risk, 30), equal_nan=True, atol=1e-8)
+    assert np.allclose(np.array(result['derivatives']['risk_level'], dtype=np.float64),
+                       np.gradient(scores, risk), equal_nan=True)
+    assert result['base']['approval_score'] == round(fuzzy.calculate_approval_score(50, 60, 30), 9)
+
+    crossings = result['crossings']
+    assert [(c['direction'], c['from'], c['to']) for c in crossings] == [
+        ('down', 'Disetujui', 'Pertimbangan'), ('down', 'Pertimbangan', 'Ditolak Rendah')]
+    for crossing in crossings:
+        # Linear interpolation on a 0.1 grid lands within a small fraction of a point
+        assert abs(fuzzy.calculate_approval_score(50, crossing['value'], 30) - crossing['threshold']) < 0.05
+
+    targets = result['targets']['risk_level']
+    assert targets['Pertimbangan'] == {'value': 60.0, 'change': 0.0}
+    assert abs(targets['Disetujui']['value'] - crossings[0]['value']) < 1e-9
+    assert targets['Disetujui']['change'] < -30
+    assert targets['Sangat Disetujui'] is None
+
+
+def test_two_input_sweep(fuzzy):
+    # One grid, one derivative per input, crossings located on grid lines
+    result = fuzzy.sensitivity(50, 50, 50, vary=('risk_level', 'usage_priority'), points=21,
+                               ranges={'usage_priority': (20, 80)})
+    assert np.array(result['scores'], dtype=np.float64).shape == (21, 21)
+    assert set(result['derivatives']) == {'risk_level', 'usage_priority'}
+    assert result['axes']['usage_priority'][0] == 20 and result['axes']['usage_priority'][-1] == 80
+    assert result['crossings'] and all(set(c['at']) == {'risk_level', 'usage_priority'} - {c['input']}
+                                       for c in result['crossings'])
+    assert result['targets'] == {}
+
+
+@pytest.mark.parametrize('vary, ranges', [
+    (('risk_level', 'risk_level'), None),
+    ('income', None),
+    (('risk_level', 'usage_priority', 'business_scale'), None),
+    ('risk_level', {'usage_priority': (0, 10)}),
+])
+def test_invalid_sweep_rejected(fuzzy, vary, ranges):
+    with pytest.raises(ValueError):
+        fuzzy.sensitivity(50, 50, 50, vary=vary, ranges=ranges)
+
+
+def test_sensitivity_endpoint(client, application):
+    response = client.post('/api/sensitivity', json=dict(application, vary=['risk_level'], points=51))
+    assert response.status_code == 200
+    data = response.get_json()
+    assert len(data['scores']) == 51 and data['input_values']['scale'] == 'Kecil'
+    for invalid in ({'points': 10000}, {'vary': 'income'}, {'range': {'risk_level': [50, 10]}}):
+        assert client.post('/api/sensitivity', json=dict(application, **invalid)).status_code == 400
+    assert client.post('/api/sensitivity', json={'vary': 'risk_level'}).status_code == 400
@@ -0,0 +1,117 @@
+"""
+Tests for the compiled score surface and its persistence
+"""
+
+import copy
+
+import numpy as np
+import pytest
+import skfuzzy as fuzz
+
+from fuzzy_surface import ScoreSurface
+
+
+@pytest.fixture
+def surface(fuzzy):
+    return fuzzy.compile_surface(resolution=51)
+
+
+@pytest.fixture
+def saved(surface, tmp_path):
+    path = str(tmp_path / 'surface.npy')
+    surface.save(path)
+    return path
+
+
+def test_surface_matches_inference(fuzzy, surface):
+    assert surface.error_p99 < 1.0
+    # Values on grid nodes are exact
+    assert abs(surface.lookup(50, 40, 70)[0] - fuzzy.engine.evaluate(50, 40, 70)[0]) < 1e-9
+
+    # Inputs without firing rules still raise through the scalar path
+    with pytest.raises(ValueError):
+        fuzzy.calculate_approval_score(83.5, 80, 50)
+
+
+def test_batch_fills_surface_gaps(fuzzy, surface):
+    scale, risk, priority = np.array([16.5, 50, 83.5, 83.5]), np.array([20, 40, 20, 80]), np.array([70, 30, 50, 50])
+    exact = fuzzy.engine.evaluate(scale, risk, priority)
+    approx = fuzzy.calculate_approval_scores(scale, risk, priority)
+    assert np.array_equal(np.isnan(exact), np.isnan(approx))
+    assert np.nanmax(np.abs(exact - approx)) <= surface.max_error
+
+
+def test_save_and_load(fuzzy, surface, saved, tmp_path):
+    first = ScoreSurface.load(saved)
+    surface.save(saved)  # Swaps in a new grid with its metadata, leaving no temporaries
+    files = sorted(p.name for p in tmp_path.iterdir())
+    assert len(files) == 2 and files[0].endswith('.npy') and files[1] == 'surface.npy.json', files
+    assert np.array_equal(first.values, surface.values, equal_nan=True)
+
+    # Saved surfaces load memory-mapped
+    loaded = fuzzy.compile_surface(resolution=51, path=saved)
+    assert isinstance(loaded.values, np.memmap)
+    assert loaded.max_error == surface.max_error
+
+
+def test_other_settings_are_rebuilt(fuzzy, saved, tmp_path):
+    assert ScoreSurface.load_or_build(saved, fuzzy.engine, resolution=11).resolution == (11, 11, 11)
+    assert ScoreSurface.load_or_build(saved, fuzzy.engine, resolution=11, min_strength=0.2).min_strength == 0.2
+    assert len(list(tmp_path.iterdir())) == 2
+
+
+def test_stale_surface_rejected(fuzzy, surface, saved):
+    stale = copy.copy(fuzzy.engine)
+    stale.rule_weights = fuzzy.engine.rule_weights * 0.5
+    with pytest.raises(ValueError):
+        ScoreSurface.load(saved, stale)
+    assert fuzzy.engine.fingerprint() == surface.fingerprint
+
+
+@pytest.fixture
+def app_surface(app_module):
+    """The app's model with a coarse surface, removed afterwards"""
+    fuzzy = app_module.fuzzy_logic
+    fuzzy.compile_surface(resolution=11)
+    yield fuzzy
+    fuzzy.surface = None
+    fuzzy.cache.clear()
+
+
+def test_score_paths_agree_with_surface(app_module, app_surface, client):
+    fuzzy = app_surface
+    processor = app_module.data_processor
+    checked = 0
+    for business_field in processor.get_all_business_fields()[:4]:
+        for scale in processor.get_all_scales():
+            application = {'business_field': business_field, 'scale': scale,
+                           'usage_type': processor.get_all_usage_types()[0]}
+            resolved, _ = app_module.resolve_application(application)
+            values = (resolved['scale_value'], resolved['risk_value'], resolved['priority_value'])
+            try:
+                expected = fuzzy.calculate_approval_score(*values)
+            except ValueError:
+                continue
+            response = client.post('/api/calculate', json=dict(application, fields=['approval_score']))
+            assert response.status_code == 200, response.get_json()
+            assert response.get_json()['approval_score'] == round(expected, 2)
+            # The analysis comes from an exact inference and so does its score
+            response = client.post('/api/calculate', json=dict(application, fields=['approval_score', 'analysis']))
+            assert response.get_json()['approval_score'] == round(fuzzy.engine.evaluate(*values)[0], 2)
+            assert fuzzy.evaluate(*values, detailed=False)['approval_score'] == expected
+            assert fuzzy.calculate_variant_scores(*values)['default'][0] == expected
+            assert fuzzy.calculate_approval_scores(*values)[0] == expected
+            checked += 1
+    assert checked > 0
+
+
+def test_detailed_score_is_its_aggregate(app_surface):
+    """A detailed result is scored by the aggregate it reports, wherever the surface is off"""
+    fuzzy = app_surface
+    values = (75.5, 48.5, 70.9)
+    result = fuzzy.evaluate(*values)
+    aggregate = result['detailed_analysis']['aggregate_output']
+    defuzzified = fuzz.defuzz(np.array(aggregate['universe']), np.array(aggregate['membership']), 'centroid')
+    assert abs(result['approval_score'] - defuzzified) < 1e-9
+    assert abs(fuzzy.calculate_approval_score(*values) - defuzzified) > 1
+    assert fuzzy.evaluate(*values, detailed=False)['approval_score'] == fuzzy.calculate_approval_score(*values)
@@ -0,0 +1,59 @@
+"""
+Tests for stage timing hooks, Prometheus rendering and the disabled default
+"""
+
+import os
+import subprocess
+import sys
+
+from metrics import Metrics
+
+
+def test_disabled_by_default(app_module, client):
+    # No endpoint and no wrapped methods
+    assert app_module.metrics is None
+    assert client.get('/metrics').status_code == 404
+    assert 'evaluate' not in vars(app_module.fuzzy_logic)
+
+
+def test_stage_histograms(fuzzy):
+    metrics = Metrics()
+    metrics.instrument_fuzzy_logic(fuzzy)
+    fuzzy.evaluate(50, 40, 50)
+    fuzzy.evaluate(50, 40, 50)
+    fuzzy.rebuild()  # The new engine is instrumented too
+    fuzzy.calculate_approval_score(16.5, 40, 70)
+    try:
+        fuzzy.calculate_approval_score(83.5, 40, 50)
+    except ValueError:
+        pass  # Failed calls are timed as well
+
+    lines = metrics.render().splitlines()
+    for expected in ('umkm_stage_duration_seconds_count{stage="evaluate"} 2',
+                     'umkm_stage_duration_seconds_count{stage="inference"} 1',
+                     'umkm_stage_duration_seconds_count{stage="analysis"} 1',
+                     'umkm_stage_duration_seconds_count{stage="score"} 2',
+                     'umkm_stage_duration_seconds_count{stage="batch_inference"} 2',
+                     'umkm_stage_duration_seconds_bucket{stage="score",le="+Inf"} 2',
+                     'umkm_cache_hits_total{cache="score"} 1'):
+        assert expected in lines, expected
+    buckets = [int(line.split()[-1]) for line in lines
+               if line.startswith('umkm_stage_duration_seconds_bucket{stage="evaluate"')]
+    assert buckets == sorted(buckets) and buckets[-1] == 2
+
+
+def test_enabled_endpoint(repo_root):
+    code = ("import app; client = app.app.test_client(); "
+            "client.post('/api/calculate', json={'business_field': 'Investasi', 'scale': 'Kecil', 'usage_type': 'Investasi'}); "
+            "client.post('/api/calculate', json={'scale': 'Kecil'}); "
+            "response = client.get('/metrics'); print(response.content_type); print(response.data.decode())")
+    env = dict(os.environ, FUZZY_METRICS='1')
+    output = subprocess.run([sys.executable, '-c', code], cwd=repo_root, env=env, capture_output=True, text=True,
+                            check=True).stdout.splitlines()
+    assert output[0].startswith('text/plain; version=0.0.4')
+    for expected in ('umkm_requests_total{endpoint="calculate",status="200"} 1',
+                     'umkm_requests_total{endpoint="calculate",status="400"} 1',
+                     'umkm_request_errors_total{endpoint="calculate"} 1',
+                     'umkm_stage_duration_seconds_count{stage="validation"} 2',
+                     'umkm_request_duration_seconds_count{endpoint="calculate"} 2'):
+        assert expected in output, expected
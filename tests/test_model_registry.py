@@ -0,0 +1,108 @@
+"""
+Tests for scoring many model variants in one shared pass and selecting one per request
+"""
+
+import copy
+
+import numpy as np
+import pytest
+
+from fuzzy_engine import SharedEngine
+from fuzzy_logic import UMKMFuzzyLogic
+from fuzzy_model import compile_definition
+from model_registry import ModelRegistry
+
+
+def variant(edit):
+    definition = copy.deepcopy(UMKMFuzzyLogic.default_definition())
+    edit(definition)
+    return compile_definition(definition)
+
+
+@pytest.fixture(scope='module')
+def models():
+    return {
+        'champion': variant(lambda d: None),
+        'weighted': variant(lambda d: d['rules'][0].update(weight=0.5)),
+        'covered': variant(lambda d: d['rules'].append({'if': {'business_scale': 'menengah', 'risk_level': 'tinggi'},
+                                                        'then': 'rendah', 'weight': 1.0})),
+        'output': variant(lambda d: d['output']['terms'].update(sedang=[35, 55, 75])),
+        'inputs': variant(lambda d: d['inputs'][1]['terms'].update(tinggi=[55, 80, 100])),
+        'bisector': variant(lambda d: d['defuzzification'].update(method='bisector')),
+        'analytic': variant(lambda d: d['defuzzification'].update(output_set='analytic')),
+    }
+
+
+INPUTS = np.random.default_rng(0).uniform(0, 100, size=(3, 5000))
+
+
+def test_shared_engine_matches_separate_engines(models):
+    shared = SharedEngine([model.engine for model in models.values()])
+    scores, strength = shared.evaluate(*INPUTS, return_strength=True)
+    for row, model in enumerate(models.values()):
+        expected, expected_strength = model.engine.evaluate(*INPUTS, return_strength=True)
+        assert np.array_equal(scores[row], expected, equal_nan=True)
+        assert np.array_equal(strength[row], expected_strength)
+    # With shared work
+    assert len(shared.groups) == 2 and [0, 1, 2, 4] in shared.outputs
+    assert shared.n_antecedents < sum(model.engine.n_rules for model in models.values())
+    assert shared.evaluate(50, 50, 50).shape == (len(models), 1)
+
+
+def test_registry_scores_active_variants(models):
+    registry = ModelRegistry()
+    for name, model in models.items():
+        registry.register(name, model)
+    registry.set_active('analytic', False)
+    results = registry.evaluate(*INPUTS)
+    assert list(results) == list(models)[:-1]
+    assert np.array_equal(results['covered'], models['covered'].engine.evaluate(*INPUTS), equal_nan=True)
+    engine = registry.shared_engine(list(results))
+    registry.evaluate(*INPUTS)
+    assert registry.shared_engine(list(results)) is engine
+    with pytest.raises(ValueError):
+        registry.get('missing')
+
+
+@pytest.fixture
+def challenger(app_module, definition, write_json):
+    """A variant of the app's model that covers medium businesses at high risk"""
+    fuzzy = app_module.fuzzy_logic
+    definition['rules'].append({'if': {'business_scale': 'menengah', 'risk_level': 'tinggi'}, 'then': 'rendah'})
+    path = write_json('challenger.json', definition)
+    fuzzy.load_variant('challenger', path)
+    yield path
+    fuzzy.variants.remove('challenger')
+
+
+def test_current_model_not_replaced(app_module, challenger):
+    with pytest.raises(ValueError):
+        app_module.fuzzy_logic.load_variant('default', challenger)
+
+
+def test_request_selects_variant(app_module, client, challenger):
+    fuzzy = app_module.fuzzy_logic
+    application = {'business_field': app_module.data_processor.get_all_business_fields()[0], 'scale': 'Menengah',
+                   'usage_type': 'Investasi'}
+    response = client.post('/api/calculate', json=dict(application, model='challenger',
+                                                       fields=['approval_score', 'input_values', 'variants']))
+    assert response.status_code == 200, response.get_json()
+    result = response.get_json()
+    resolved, _ = app_module.resolve_application(application)
+    values = (resolved['scale_value'], resolved['risk_value'], resolved['priority_value'])
+    expected = fuzzy.variant_model('challenger').engine.evaluate(*values)[0]
+    assert result['approval_score'] == round(expected, 2) and result['input_values']['model'] == 'challenger'
+    # Every active variant is compared
+    assert set(result['variants']) == {'default', 'challenger'}
+    assert result['variants']['challenger']['approval_score'] == result['approval_score']
+    default = fuzzy.engine.evaluate(*values)[0]
+    assert result['variants']['default']['approval_score'] == (None if np.isnan(default) else round(default, 2))
+
+    assert 'variants' not in client.post('/api/calculate', json=application).get_json()
+    response = client.post('/api/calculate', json=dict(application, model='missing'))
+    assert response.status_code == 400 and 'missing' in response.get_json()['error']
+    models = {model['name']: model for model in client.get('/api/models').get_json()['models']}
+    assert models['challenger']['rules'] == 16 and models['default']['fingerprint'] == fuzzy.model_fingerprint
+    if not fuzzy.inference_only:
+        url = client.post('/api/calculate', json=dict(application, model='challenger')).get_json()['visualization_url']
+        assert 'model=challenger' in url and client.get(url).status_code == 200
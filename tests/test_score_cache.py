@@ -0,0 +1,61 @@
+"""
+Tests for memoized scoring: eviction, expiry and invalidation
+"""
+
+import pytest
+import skfuzzy as fuzz
+
+from fuzzy_logic import UMKMFuzzyLogic
+from score_cache import ScoreCache
+
+
+def test_lru_eviction_and_expiry():
+    cache = ScoreCache(maxsize=2, ttl=None)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    cache.get('a')
+    cache.put('c', 3)
+    assert cache.get('b') is None and cache.get('a') == 1 and cache.evictions == 1
+    expiring = ScoreCache(maxsize=2, ttl=0)
+    expiring.put('a', 1)
+    assert expiring.get('a') is None
+
+
+@pytest.fixture
+def cached():
+    return UMKMFuzzyLogic(cache_size=64)
+
+
+def test_evaluate_is_memoized(cached):
+    first = cached.evaluate(50, 40, 70)
+    assert cached.evaluate(50, 40, 70) is first
+    assert abs(first['approval_score'] - cached.calculate_approval_score(50, 40, 70)) < 1e-12
+    assert set(first) == {'approval_score', 'approval_category', 'approval_color',
+                          'recommendations', 'detailed_analysis'}
+
+    # Uncovered inputs are cached too and keep raising
+    for _ in range(2):
+        with pytest.raises(ValueError):
+            cached.evaluate(83.5, 80, 50)
+    stats = cached.cache.stats()
+    assert stats['hits'] == 2 and stats['misses'] == 2
+
+
+def test_model_change_invalidates(cached):
+    first = cached.evaluate(50, 40, 70)
+    old_fingerprint = cached.model_fingerprint
+    cached.approval_score['sedang'].mf = fuzz.trimf(cached.approval_score.universe, [40, 65, 80])
+    cached.rebuild()
+    assert cached.model_fingerprint != old_fingerprint
+    # Results the change affects are not carried over to the new model
+    assert all(key[0] == old_fingerprint for key, _ in cached.cache.items() if key[1:4] == (50.0, 40.0, 70.0))
+    assert cached.evaluate(50, 40, 70)['approval_score'] != first['approval_score']
+
+
+def test_warm_up(fuzzy):
+    # Every combination of the selectable inputs
+    assert fuzzy.warm_up([16.5, 50, 83.5], [20, 40, 60, 50], [70, 50, 30]) == 36 and len(fuzzy.cache) == 36
+    misses = fuzzy.cache.misses
+    fuzzy.evaluate(16.5, 20, 70)
+    assert fuzzy.cache.misses == misses
+